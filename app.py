@@ -1,40 +1,56 @@
 # app.py
 import streamlit as st
 import pandas as pd
-import googlemaps
-import folium
-from folium.plugins import MarkerCluster
+import numpy as np
 from streamlit_folium import st_folium
-import matplotlib.pyplot as plt
-import time
 from simulator import generate_stops_for_school
-from utils import autofill_missing_fields, calculate_ses
+from preprocess import read_stops
+from consolidation import LOAD_COLUMN, WALK_RADIUS_M, consolidate_stops
+from incremental import ScoreCache, score_incremental
+from config import OSM_EXTRACT
+from safety_layers import get_safety_grid_for_stops
+from geocoding import default_geocoder
+from cost_model import CostModel
+from fleetlab_optimizer import FleetOptimizer
+from fleet_mix import pareto_frontier, solve_fleet_mix
+from routing import VehicleType
+from map_render import AGGREGATE_THRESHOLD, stops_map
+from projection import to_utm, utm_epsg
+from profiling import Profiler, profiler as default_profiler, span, use_profiler
 
 # === CONFIG ===
 st.set_page_config(page_title="FleetLab Optimizer Demo", layout="wide")
 st.title("🚌 FleetLab Routing & Cost Optimizer")
 
-# === GOOGLE MAPS CLIENT ===
-gmaps = googlemaps.Client(key=st.secrets["google"]["maps_api_key"])
+# Fleet defaults
+bus_capacity = 20
+van_capacity = 7
+bus_cost = 200
+van_cost = 120
+driver_cost = 150
+# Uploads are held in memory for routing and the map; bigger files belong in batch scoring.
+APP_MAX_STOPS = 50_000
+
+# One profiler per browser session, so concurrent sessions never toggle or wipe
+# each other's traces; each rerun starts a fresh trace.
+if "profiler" not in st.session_state:
+    st.session_state["profiler"] = Profiler(enabled=default_profiler.enabled)
+profiler = st.session_state["profiler"]
+use_profiler(profiler)
+profiler.enabled = st.sidebar.checkbox("⏱️ Profile this run", value=profiler.enabled)
+profiler.reset()
 
-# === GEOCODER FUNCTION (cached) ===
-@st.cache_data(show_spinner="📍 Geocoding addresses...")
+# === GEOCODER FUNCTION (disk-cached per address) ===
 def geocode_addresses(addresses):
-    latitudes, longitudes = [], []
-    for address in addresses:
-        try:
-            geocode = gmaps.geocode(address)
-            if geocode:
-                loc = geocode[0]["geometry"]["location"]
-                latitudes.append(loc["lat"])
-                longitudes.append(loc["lng"])
-            else:
-                latitudes.append(None)
-                longitudes.append(None)
-        except:
-            latitudes.append(None)
-            longitudes.append(None)
-        time.sleep(0.2)
+    geocoder = default_geocoder()
+    before = dict(geocoder.stats)
+    with st.spinner("📍 Geocoding addresses..."), span("app.geocode", n=len(addresses)):
+        coords = geocoder.geocode_many(addresses)
+    hits = geocoder.stats["hits"] - before["hits"]
+    misses = geocoder.stats["misses"] - before["misses"]
+    st.caption(f"📍 Geocoding cache: {hits} hits, {misses} misses")
+    latitudes = [c[0] if c else None for c in coords]
+    longitudes = [c[1] if c else None for c in coords]
     return latitudes, longitudes
 
 # === STEP 1: Load Stops ===
@@ -43,13 +59,19 @@ mode = st.sidebar.radio("Choose input mode:", ["Upload CSV", "Simulate from Scho
 df_stops = None
 
 if mode == "Upload CSV":
-    uploaded = st.sidebar.file_uploader("Upload stop CSV", type="csv")
+    uploaded = st.sidebar.file_uploader("Upload stop CSV or Parquet", type=["csv", "parquet"])
     if uploaded:
-        df_stops = pd.read_csv(uploaded)
+        try:
+            # Consolidation, routing and the map need every stop at once, so the app
+            # does not stream; large files go through preprocess.write_scored_stops.
+            df_stops = read_stops(uploaded, max_rows=APP_MAX_STOPS)
+        except ValueError as e:
+            st.error(str(e))
+            st.stop()
         st.success("✅ File uploaded!")
     else:
         try:
-            df_stops = pd.read_csv("sample_stops.csv")
+            df_stops = read_stops("sample_stops.csv")
             st.warning("📄 Using sample_stops.csv")
         except:
             st.error("❌ No file available.")
@@ -65,10 +87,13 @@ elif mode == "Simulate from School Name":
             st.error("❌Please enter a school name before simulating.")
             st.stop()
         try:
-            df_stops = generate_stops_for_school(school, n=n_stops)
+            with span("app.simulate", n=n_stops):
+                df_stops = generate_stops_for_school(school, n=n_stops)
             if df_stops.empty:
                 st.error("❌ Simulation returned no stops.")
                 st.stop()
+            if len(df_stops) < n_stops:
+                st.warning(f"⚠️ Only {len(df_stops)} stops available beyond walking distance.")
             st.success(f"✅ Simulated {len(df_stops)} stops for: {school}")
             st.dataframe(df_stops.head())
             st.session_state["df_stops"] = df_stops
@@ -99,67 +124,125 @@ if "lat" not in df_stops.columns or "lon" not in df_stops.columns:
         st.stop()
 
 # === STEP 3: Drop invalid coords (prevents map crash) ===
-df_stops = df_stops.dropna(subset=["lat", "lon"])
-df_stops = df_stops[df_stops["lat"].apply(lambda x: isinstance(x, (float, int)))]
+df_stops = df_stops.assign(
+    lat=pd.to_numeric(df_stops["lat"], errors="coerce"),
+    lon=pd.to_numeric(df_stops["lon"], errors="coerce"),
+).dropna(subset=["lat", "lon"])
+
+# === STEP 3b: Merge nearby addresses into shared stops ===
+st.sidebar.header("Stop Consolidation")
+# Students per stop: 1 unless stops were consolidated
+demands = None
+if st.sidebar.checkbox("Merge nearby addresses into shared stops", value=False):
+    walk_radius = st.sidebar.slider("Walk radius (m)", 100, 800, WALK_RADIUS_M, step=50)
+    # A stop larger than the biggest vehicle could never be routed.
+    max_load = st.sidebar.number_input("Max students per stop", 1, bus_capacity, bus_capacity)
+    with st.spinner("🚏 Consolidating stops..."), span("app.consolidate", addresses=len(df_stops)):
+        df_stops, _, report = consolidate_stops(df_stops, walk_radius_m=walk_radius,
+                                                max_load=int(max_load))
+    demands = df_stops[LOAD_COLUMN].to_numpy()
+    st.caption(f"🚏 {report['addresses']:,} addresses → {report['stops']:,} stops "
+               f"(saves {report['api_calls_saved']:,} API calls, "
+               f"~{report['route_minutes_saved']:,.0f} route minutes; "
+               f"average walk {report['mean_walk_m']:,.0f} m, "
+               f"longest {report['max_walk_m']:,.0f} m)")
+
+num_students = int(demands.sum()) if demands is not None else len(df_stops)
 
 # === STEP 4: Safety Scoring ===
-with st.spinner("🔍 Estimating safety scores..."):
-    df_stops = autofill_missing_fields(df_stops)
-    df_stops["SES Score"] = df_stops.apply(calculate_ses, axis=1)
-    df_stops["Safety Rating"] = df_stops["SES Score"].apply(
-        lambda s: "Safe" if s >= 0.7 else "Acceptable" if s >= 0.5 else "Unsafe"
-    )
+with st.spinner("🔍 Estimating safety scores..."), span("app.scoring", rows=len(df_stops)):
+    # Session-level cache (backed by disk): reruns only rescore new or edited stops
+    if "score_cache" not in st.session_state:
+        st.session_state["score_cache"] = ScoreCache()
+    score_cache = st.session_state["score_cache"]
+    # With a local OSM extract, safety factors come from precomputed layers instead
+    # of one Directions call per stop.
+    autofill_kwargs = {}
+    if OSM_EXTRACT:
+        try:
+            autofill_kwargs["safety_grid"] = get_safety_grid_for_stops(
+                df_stops["lat"].to_numpy(), df_stops["lon"].to_numpy())
+        except ValueError as e:
+            st.warning(f"⚠️ Safety layers unavailable, using the Directions API: {e}")
+    before = dict(score_cache.stats)
+    df_stops = score_incremental(df_stops, score_cache, **autofill_kwargs)
+    rescored = score_cache.stats["misses"] - before["misses"]
+    st.caption(f"🔁 Rescored {rescored:,} of {len(df_stops):,} stops "
+               f"({len(score_cache):,} cached results)")
 
 # === SAFETY MAP ===
 st.subheader("📍 Stop Safety Map")
 try:
-    m = folium.Map(location=[df_stops["lat"].mean(), df_stops["lon"].mean()], zoom_start=13)
-    cluster = MarkerCluster().add_to(m)
-    for _, row in df_stops.iterrows():
-        color = "green" if row["Safety Rating"] == "Safe" else "orange" if row["Safety Rating"] == "Acceptable" else "red"
-        folium.CircleMarker(
-            location=[row["lat"], row["lon"]],
-            radius=5,
-            color=color,
-            fill=True,
-            fill_opacity=0.7,
-            popup=f"{row.get('Stop Name', 'Stop')}: {row['Safety Rating']}"
-        ).add_to(cluster)
-    st_folium(m, width=900)
+    labels = df_stops["Stop Name"].astype(str) if "Stop Name" in df_stops.columns else None
+    with span("app.map", stops=len(df_stops)):
+        m = stops_map(
+            df_stops["lat"].to_numpy(), df_stops["lon"].to_numpy(),
+            ratings=df_stops["Safety Rating"].to_numpy(),
+            scores=df_stops["SES Score"].to_numpy(),
+            labels=None if labels is None else labels.to_numpy(),
+        )
+        if len(df_stops) > AGGREGATE_THRESHOLD:
+            st.caption(f"🗺️ {len(df_stops):,} stops shown as hex bins colored by mean SES score.")
+        st_folium(m, width=900)
 except Exception as e:
     st.error(f"❌ Map rendering failed: {e}")
 
 # === OPTIMIZE FLEET MIX ===
 st.subheader("🚐 Fleet Mix Optimizer")
-bus_capacity = 20
-van_capacity = 7
-bus_cost = 200
-van_cost = 120
-driver_cost = 150
+
+st.sidebar.header("2. Route Planning")
+school_address = st.sidebar.text_input("School address (enables real routes)", "")
+max_buses = st.sidebar.number_input("Buses available", 0, 500, 10)
+max_vans = st.sidebar.number_input("Vans available", 0, 500, 10)
+max_ride = st.sidebar.slider("Max ride time (minutes)", 15, 120, 60)
 
 if st.button("Optimize Fleet Mix"):
-    total_stops = len(df_stops)
-    best_mix = None
-    lowest_cost = float("inf")
-
-    for buses in range(0, 6):
-        for vans in range(1, 10):
-            capacity = buses * bus_capacity + vans * van_capacity
-            if capacity >= total_stops:
-                drivers = buses + vans
-                cost = (buses * bus_cost) + (vans * van_cost) + (drivers * driver_cost)
-                if cost < lowest_cost:
-                    lowest_cost = cost
-                    best_mix = (buses, vans, drivers)
-
-    if best_mix:
-        buses, vans, drivers = best_mix
-        st.success(f"✅ Optimal Fleet: {buses} Buses, {vans} Vans")
-        st.markdown(f"- **Drivers Needed:** {drivers}")
-        st.markdown(f"- **Estimated Daily Cost:** `${lowest_cost:,.2f}`")
-        st.markdown(f"- **Total Capacity:** {buses * bus_capacity + vans * van_capacity}")
+    if school_address.strip():
+        try:
+            school_lat, school_lon = default_geocoder().geocode(school_address)
+        except ValueError as e:
+            st.error(str(e))
+            st.stop()
+        epsg = utm_epsg(school_lon, school_lat)
+        stops_xy = np.column_stack(to_utm(df_stops["lon"].to_numpy(), df_stops["lat"].to_numpy(), epsg))
+        optimizer = FleetOptimizer(num_students, int(max_buses), int(max_vans), CostModel())
+        with span("app.optimize", stops=len(df_stops)):
+            plan = optimizer.plan_routes(stops_xy, to_utm(school_lon, school_lat, epsg),
+                                         demands=demands, max_ride_minutes=max_ride)
+        if "error" in plan:
+            st.error(plan["error"])
+        else:
+            st.success(f"✅ Optimal Fleet: {plan['assigned_buses']} Buses, {plan['assigned_vans']} Vans")
+            st.markdown(f"- **Drivers Needed:** {len(plan['routes'])}")
+            st.markdown(f"- **Estimated Daily Cost:** `${plan['total_cost']:,.2f}`")
+            st.markdown(f"- **Route Miles (one way):** {plan['total_miles']:,.1f}")
+            st.dataframe(pd.DataFrame([r.as_dict() for r in plan["routes"]]), use_container_width=True)
     else:
-        st.error("❌ No valid fleet mix found.")
+        # Without a school location only seat capacity can be checked.
+        vehicle_types = [
+            VehicleType("bus", bus_capacity, bus_cost, int(max_buses), driver_cost),
+            VehicleType("van", van_capacity, van_cost, int(max_vans), driver_cost),
+        ]
+        with span("app.optimize", students=num_students):
+            best_mix = solve_fleet_mix(num_students, vehicle_types)
+
+        if best_mix:
+            buses, vans = best_mix["counts"]["bus"], best_mix["counts"]["van"]
+            st.success(f"✅ Optimal Fleet: {buses} Buses, {vans} Vans")
+            st.markdown(f"- **Drivers Needed:** {best_mix['vehicles']}")
+            st.markdown(f"- **Estimated Daily Cost:** `${best_mix['total_cost']:,.2f}`")
+            st.markdown(f"- **Total Capacity:** {best_mix['seats']}")
+
+            frontier = pareto_frontier(num_students, vehicle_types)
+            if len(frontier) > 1:
+                st.markdown("**Cost vs. fleet size options**")
+                st.dataframe(pd.DataFrame([
+                    {"Vehicles": f["vehicles"], **f["counts"], "Seats": f["seats"],
+                     "Daily Cost": f["total_cost"]}
+                    for f in frontier
+                ]), use_container_width=True)
+        else:
+            st.error("❌ No valid fleet mix found.")
 
 # === SUMMARY ===
 st.subheader("🧭 Route Coverage Summary")
@@ -170,3 +253,16 @@ st.write(f"🟢 Safe Stops: {df_stops[df_stops['Safety Rating']=='Safe'].shape[0
 # === DATA TABLE ===
 st.subheader("📋 Stop Table")
 st.dataframe(df_stops, use_container_width=True)
+
+# === PERFORMANCE PANEL ===
+if profiler.enabled:
+    with st.expander("⏱️ Stage timings", expanded=True):
+        summary = pd.DataFrame(profiler.summary())
+        if not summary.empty:
+            summary["stage"] = ["· " * d + name for d, name in zip(summary["depth"], summary["stage"])]
+            st.dataframe(summary[["stage", "calls", "total_s", "mean_s", "max_s"]],
+                         use_container_width=True)
+        if profiler.counters:
+            st.json(dict(profiler.counters))
+        st.download_button("Download Chrome trace", profiler.to_chrome_trace(),
+                           file_name="fleetlab_trace.json", mime="application/json")
@@ -0,0 +1,201 @@
+# batch.py
+# Headless batch proposals: simulate -> score -> optimize -> cost for every school in a CSV.
+#
+#   python batch.py schools.csv --out results/ --stops 50 --workers 4
+#
+# The CSV needs a "School" column (name or address); an optional "Stops" column
+# overrides --stops per school. Finished schools are checkpointed under
+# <out>/done/, so re-running the same command resumes after a crash.
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+logger = logging.getLogger("batch")
+
+SCHOOL_COLUMNS = ("School", "school", "School Name", "Name", "name")
+
+# === HELPERS ===
+def slugify(name):
+    # The hash keeps names that differ only in case/punctuation (or share a long
+    # prefix) from sharing checkpoints and maps.
+    slug = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")[:64] or "school"
+    return f"{slug}-{hashlib.sha1(name.encode()).hexdigest()[:8]}"
+
+def _write_json(path, payload):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(payload, f, default=str)
+    os.replace(tmp, path)
+
+def read_schools(path, default_stops):
+    df = pd.read_csv(path)
+    df.columns = df.columns.str.strip()
+    column = next((c for c in SCHOOL_COLUMNS if c in df.columns), None)
+    if column is None:
+        raise ValueError(f"❌ Schools CSV needs one of these columns: {', '.join(SCHOOL_COLUMNS)}")
+    schools = df[column].dropna().astype(str).str.strip()
+    stops = df["Stops"] if "Stops" in df.columns else pd.Series(default_stops, index=df.index)
+    stops = stops.fillna(default_stops).astype(int)
+    # A school listed twice would run twice against the same checkpoint; keep the first.
+    seen, rows = set(), []
+    for i, name in schools.items():
+        if name and name not in seen:
+            seen.add(name)
+            rows.append((name, int(stops[i])))
+    return rows
+
+# === WORKER ===
+def process_school(school, n_stops, out_dir, detect_uturns=True, write_map=True,
+                   safety_layers=False):
+    """Run the full pipeline for one school and checkpoint the result row."""
+    # Imported here so the parent process stays light and workers load what they need.
+    from estimator import generate_proposal
+    from safety_layers import get_safety_grid
+    from simulator import simulate_district
+    from utils import autofill_missing_fields, score_stops
+
+    slug = slugify(school)
+    sim = simulate_district(school, n_stops=n_stops)
+    stops = pd.DataFrame({
+        "lat": sim["stops_lonlat"][:, 1],
+        "lon": sim["stops_lonlat"][:, 0],
+        "Address": school,
+    })
+    grid = None
+    if safety_layers:
+        grid = get_safety_grid(sim["district"], dcode=sim["metadata"]["district_code"])
+    stops = autofill_missing_fields(stops, detect_uturns=detect_uturns, safety_grid=grid)
+    stops["SES Score"], stops["Safety Rating"] = score_stops(stops)
+    proposal = generate_proposal(sim, include_map=write_map)
+
+    map_path = None
+    if write_map:
+        map_path = os.path.join(out_dir, "maps", f"{slug}.html")
+        proposal["map"].save(map_path)
+
+    ratings = stops["Safety Rating"].value_counts()
+    fleet = proposal["fleet_mix"]
+    row = {
+        "school": school,
+        "district": sim["metadata"]["district_name"],
+        "district_code": sim["metadata"]["district_code"],
+        "num_stops": len(stops),
+        "mean_ses": float(stops["SES Score"].mean()),
+        "safe_stops": int(ratings.get("Safe", 0)),
+        "acceptable_stops": int(ratings.get("Acceptable", 0)),
+        "unsafe_stops": int(ratings.get("Unsafe", 0)),
+        "buses": fleet["assigned_buses"],
+        "vans": fleet["assigned_vans"],
+        "routes": len(fleet["routes"]),
+        "route_miles": fleet["total_miles"],
+        "vehicle_cost": fleet["vehicle_cost"],
+        "driver_cost": fleet["driver_cost"],
+        "mileage_cost": fleet["mileage_cost"],
+        "total_cost": fleet["total_cost"],
+        "map_html": map_path,
+    }
+    _write_json(os.path.join(out_dir, "done", f"{slug}.json"), row)
+    return row
+
+# === DRIVER ===
+def run_batch(schools, out_dir, workers=None, detect_uturns=True, write_map=True, fmt="parquet",
+              safety_layers=False):
+    if safety_layers:
+        from config import OSM_EXTRACT
+
+        # Fail once here instead of once per school in the workers.
+        if not OSM_EXTRACT or not os.path.exists(OSM_EXTRACT):
+            raise ValueError("❌ --safety-layers needs FLEETLAB_OSM_EXTRACT set to an existing "
+                             "OSM extract.")
+    for sub in ("done", "failed", "maps"):
+        os.makedirs(os.path.join(out_dir, sub), exist_ok=True)
+
+    pending = [
+        (school, n) for school, n in schools
+        if not os.path.exists(os.path.join(out_dir, "done", f"{slugify(school)}.json"))
+    ]
+    logger.info("%d schools, %d already done, %d to run",
+                len(schools), len(schools) - len(pending), len(pending))
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(process_school, school, n, out_dir, detect_uturns, write_map,
+                        safety_layers): school
+            for school, n in pending
+        }
+        for future in as_completed(futures):
+            school = futures[future]
+            failed_path = os.path.join(out_dir, "failed", f"{slugify(school)}.json")
+            try:
+                future.result()
+                if os.path.exists(failed_path):
+                    os.remove(failed_path)
+                logger.info("✅ %s", school)
+            except Exception as e:
+                failures += 1
+                _write_json(failed_path, {"school": school, "error": str(e)})
+                logger.error("❌ %s: %s", school, e)
+
+    return consolidate(out_dir, fmt), failures
+
+def consolidate(out_dir, fmt="parquet"):
+    done_dir = os.path.join(out_dir, "done")
+    rows = []
+    for name in sorted(os.listdir(done_dir)):
+        if name.endswith(".json"):
+            with open(os.path.join(done_dir, name)) as f:
+                rows.append(json.load(f))
+    results = pd.DataFrame(rows)
+    if fmt == "parquet":
+        try:
+            path = os.path.join(out_dir, "results.parquet")
+            results.to_parquet(path, index=False)
+            return path
+        except ImportError:
+            logger.warning("pyarrow not installed; writing CSV instead of Parquet.")
+    path = os.path.join(out_dir, "results.csv")
+    results.to_csv(path, index=False)
+    return path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate fleet proposals for many schools.")
+    parser.add_argument("schools_csv")
+    parser.add_argument("--out", default="batch_results")
+    parser.add_argument("--stops", type=int, default=50, help="stops per school")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size")
+    parser.add_argument("--format", choices=["parquet", "csv"], default="parquet")
+    parser.add_argument("--no-maps", action="store_true", help="skip per-school map HTML")
+    parser.add_argument("--no-uturn-lookup", action="store_true",
+                        help="score U-turns as 0 instead of calling the Directions API")
+    parser.add_argument("--safety-layers", action="store_true",
+                        help="fill safety factors from layers built from FLEETLAB_OSM_EXTRACT")
+    args = parser.parse_args(argv)
+    if args.safety_layers:
+        from config import OSM_EXTRACT
+
+        if not OSM_EXTRACT or not os.path.exists(OSM_EXTRACT):
+            parser.error("--safety-layers needs FLEETLAB_OSM_EXTRACT set to an existing OSM extract")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    schools = read_schools(args.schools_csv, args.stops)
+    path, failures = run_batch(
+        schools, args.out, workers=args.workers, detect_uturns=not args.no_uturn_lookup,
+        write_map=not args.no_maps, fmt=args.format, safety_layers=args.safety_layers,
+    )
+    print(f"Results: {path}")
+    if failures:
+        print(f"{failures} school(s) failed; see {os.path.join(args.out, 'failed')}. "
+              f"Re-run the same command to retry them.")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
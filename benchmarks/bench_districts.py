@@ -0,0 +1,82 @@
+# benchmarks/bench_districts.py
+# Per-call GeoJSON read + sjoin vs. the cached STRtree DistrictIndex.
+#   python benchmarks/bench_districts.py --points 10000 --grid 20
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import Point
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from districts import DistrictIndex
+from synthetic import district_grid
+
+
+def make_districts(path, grid, lon0=-84.0, lat0=42.0, size=0.05):
+    district_grid(grid, lon0, lat0, size, buffer=0.002).to_file(path, driver="GeoJSON")
+    return (lon0, lat0, lon0 + grid * size, lat0 + grid * size)
+
+
+def old_lookup(lat, lon, path):
+    districts = gpd.read_file(path).to_crs(epsg=4326)
+    districts = districts[districts.geometry.type.isin(["Polygon", "MultiPolygon"])]
+    point_gdf = gpd.GeoDataFrame([{"geometry": Point(lon, lat)}], crs="EPSG:4326")
+    joined = gpd.sjoin(districts, point_gdf, how="inner", predicate="contains")
+    return None if joined.empty else joined.index[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=10_000)
+    parser.add_argument("--grid", type=int, default=20, help="districts per side")
+    parser.add_argument("--old-sample", type=int, default=100,
+                        help="lookups timed on the old path (extrapolated to --points)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        geojson = os.path.join(tmp, "districts.geojson")
+        minx, miny, maxx, maxy = make_districts(geojson, args.grid)
+        rng = np.random.default_rng(0)
+        lons = rng.uniform(minx, maxx, args.points)
+        lats = rng.uniform(miny, maxy, args.points)
+
+        start = time.perf_counter()
+        for lat, lon in zip(lats[:args.old_sample], lons[:args.old_sample]):
+            old_lookup(lat, lon, geojson)
+        t_old = (time.perf_counter() - start) / args.old_sample * args.points
+
+        start = time.perf_counter()
+        index = DistrictIndex.from_file(geojson)
+        t_build = time.perf_counter() - start
+
+        binary = os.path.join(tmp, "districts.npz")
+        index.save(binary)
+        start = time.perf_counter()
+        DistrictIndex.from_file(binary)
+        t_cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for lat, lon in zip(lats, lons):
+            index.lookup_many([lat], [lon])
+        t_single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index.lookup_many(lats, lons)
+        t_bulk = time.perf_counter() - start
+
+    n = f"{args.points:,}"
+    print(f"districts: {args.grid ** 2}, points: {n}")
+    print(f"old read+sjoin per point (extrapolated) {t_old:10.3f} s")
+    print(f"index build from GeoJSON                {t_build:10.3f} s")
+    print(f"index cold start from .npz              {t_cold:10.3f} s")
+    print(f"index, {n} single lookups          {t_single:10.3f} s")
+    print(f"index, one bulk lookup of {n}      {t_bulk:10.4f} s")
+
+
+if __name__ == "__main__":
+    main()
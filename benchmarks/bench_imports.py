@@ -0,0 +1,70 @@
+# benchmarks/bench_imports.py
+# Cold-start import latency: each module is imported in a fresh interpreter,
+# best of --repeat runs, along with which heavy dependencies it dragged in.
+# Runs are appended to benchmarks/results/imports.jsonl to track regressions.
+#   python benchmarks/bench_imports.py --repeat 5
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+HISTORY = os.path.join(HERE, "results", "imports.jsonl")
+
+MODULES = ["utils", "geo_utils", "simulator", "estimator", "batch", "preprocess",
+           "incremental", "consolidation", "map_render"]
+HEAVY = ["pandas", "shapely", "pyproj", "geopandas", "osmnx", "googlemaps", "requests",
+         "folium", "matplotlib", "streamlit"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, repeat):
+    best = None
+    for _ in range(repeat):
+        out = subprocess.check_output([sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY)],
+                                      cwd=ROOT, text=True)
+        result = json.loads(out.strip().splitlines()[-1])
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    return {"module": module, **best}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'module':<16} {'seconds':>8}  heavy dependencies loaded")
+    for module in args.modules:
+        r = measure(module, args.repeat)
+        results.append(r)
+        print(f"{module:<16} {r['seconds']:>8.3f}  {', '.join(r['loaded']) or '-'}")
+
+    if not args.no_save:
+        try:
+            revision = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                               text=True, stderr=subprocess.DEVNULL).strip()
+        except Exception:
+            revision = None
+        os.makedirs(os.path.dirname(HISTORY), exist_ok=True)
+        with open(HISTORY, "a") as f:
+            f.write(json.dumps({"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                                "revision": revision, "results": results}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# benchmarks/bench_maps.py
+# Per-stop CircleMarker loop vs. map_render layers: build time and HTML size.
+#   python benchmarks/bench_maps.py --sizes 1000 10000 100000
+
+import argparse
+import os
+import sys
+import time
+
+import folium
+import numpy as np
+from folium.plugins import MarkerCluster
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from map_render import add_stops
+from utils import classify_ses_batch
+
+
+def old_map(lats, lons, ratings):
+    m = folium.Map(location=[lats.mean(), lons.mean()], zoom_start=13)
+    cluster = MarkerCluster().add_to(m)
+    for lat, lon, rating in zip(lats, lons, ratings):
+        color = "green" if rating == "Safe" else "orange" if rating == "Acceptable" else "red"
+        folium.CircleMarker(location=[lat, lon], radius=5, color=color, fill=True,
+                            fill_opacity=0.7, popup=f"Stop: {rating}").add_to(cluster)
+    return m
+
+
+def new_map(lats, lons, ratings, scores, mode):
+    m = folium.Map(location=[lats.mean(), lons.mean()], zoom_start=13)
+    add_stops(m, lats, lons, ratings=ratings, scores=scores, mode=mode)
+    return m
+
+
+def build(fn, *args):
+    start = time.perf_counter()
+    html = fn(*args).get_root().render()
+    return time.perf_counter() - start, len(html.encode())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--old-max", type=int, default=10_000,
+                        help="skip the per-marker path above this many stops")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'stops':>8} {'layer':>10} {'build (s)':>10} {'HTML (KB)':>11}")
+    for n in args.sizes:
+        lats, lons = rng.uniform(42.2, 42.4, n), rng.uniform(-83.9, -83.6, n)
+        scores = rng.random(n)
+        ratings = classify_ses_batch(scores)
+        rows = []
+        if n <= args.old_max:
+            rows.append(("markers", build(old_map, lats, lons, ratings)))
+        for mode in ("points", "hexbin", "heatmap", "auto"):
+            rows.append((mode, build(new_map, lats, lons, ratings, scores, mode)))
+        for name, (t, size) in rows:
+            print(f"{n:>8,} {name:>10} {t:>10.3f} {size / 1024:>11,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# benchmarks/bench_ses.py
+# Row-wise calculate_ses vs. vectorized score_stops.
+#   python benchmarks/bench_ses.py --sizes 1000 100000 1000000
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import SES_FACTORS, calculate_ses, classify_ses, score_stops
+
+
+def make_stops(n, seed=0):
+    rng = np.random.default_rng(seed)
+    data = {column: rng.random(n) for column, _, _ in SES_FACTORS.values()}
+    data["U-Turn Required (U)"] = rng.integers(0, 2, n)
+    return pd.DataFrame(data)
+
+
+def rowwise(df):
+    scores = df.apply(calculate_ses, axis=1)
+    return scores, scores.apply(classify_ses)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'row-wise (s)':>14} {'vectorized (s)':>16} {'speedup':>9}")
+    for n in args.sizes:
+        df = make_stops(n)
+        t_row, (row_scores, row_ratings) = timed(rowwise, df)
+        t_vec, (vec_scores, vec_ratings) = timed(score_stops, df)
+        assert np.array_equal(row_scores.to_numpy(), vec_scores)
+        assert np.array_equal(row_ratings.to_numpy(), vec_ratings)
+        print(f"{n:>10,} {t_row:>14.3f} {t_vec:>16.4f} {t_row / t_vec:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# benchmarks/bench_stops.py
+# Memory per stop: scored DataFrame with object columns (+ shapely Points) vs. the
+# StopCollection record array, and the cost of its zero-copy DataFrame view.
+#   python benchmarks/bench_stops.py --stops 1000000
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stops import StopCollection
+from synthetic import stop_frame
+from utils import score_collection, score_stops
+
+
+def traced(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stops", type=int, default=1_000_000)
+    args = parser.parse_args()
+    n = args.stops
+
+    df = stop_frame(n)
+    df["SES Score"], df["Safety Rating"] = score_stops(df)
+    df["Route"] = np.full(n, -1)
+    frame_bytes = df.memory_usage(deep=True).sum()
+
+    import shapely
+
+    points, point_bytes, _ = traced(lambda: list(shapely.points(df["lon"].to_numpy(), df["lat"].to_numpy())))
+    del points
+
+    stops, _, _ = traced(lambda: StopCollection.from_frame(df, epsg=32617))
+    start = time.perf_counter()
+    score_collection(stops)
+    score_s = time.perf_counter() - start
+    _, view_bytes, view_s = traced(stops.to_frame)
+
+    print(f"{n:,} stops")
+    print(f"{'DataFrame (object name/address/rating)':<44} {frame_bytes / n:>8.1f} B/stop")
+    print(f"{'  + list of shapely Points':<44} {(frame_bytes + point_bytes) / n:>8.1f} B/stop")
+    print(f"{'StopCollection records':<44} {stops.nbytes / n:>8.1f} B/stop")
+    print(f"{'  + to_frame() view (rating labels only)':<44} {(stops.nbytes + view_bytes) / n:>8.1f} B/stop"
+          f"   ({view_s:.3f} s)")
+    print(f"{'score in place':<44} {score_s:>8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+# benchmarks/run_suite.py
+# Offline benchmark suite over synthetic districts. Times each hot path at
+# several sizes, records peak traced memory, and appends every run to
+# benchmarks/results/history.jsonl so regressions show up over time.
+#
+#   python benchmarks/run_suite.py                       # default sizes
+#   python benchmarks/run_suite.py --sizes 100 1000 1000000 --stages scoring projection
+#   python benchmarks/run_suite.py --history             # trend of earlier runs
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+HISTORY = os.path.join(HERE, "results", "history.jsonl")
+
+# Caches must point at a scratch directory before any project module is imported.
+os.environ.setdefault("FLEETLAB_CACHE_DIR", tempfile.mkdtemp(prefix="fleetlab-bench-"))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+import synthetic
+
+# Largest size each stage is run at (routing is O(n^2) in memory, etc.)
+STAGE_LIMITS = {
+    "scoring": None, "projection": None, "district_lookup": None,
+    "autofill": 100_000, "geocoding": 100_000, "fleet_mix": None, "cost_sweep": None, "consolidation": 100_000,
+    "routing": 2_000, "district_fleet": 10_000, "map_build": 100_000, "weighted_stops": 1_000_000,
+    "safety_layers": 1_000_000,
+}
+
+
+# === STAGES ===
+# Each setup(n) returns a zero-argument callable that performs the timed work.
+def setup_scoring(n):
+    from utils import score_stops
+
+    df = synthetic.stop_frame(n)
+    return lambda: score_stops(df)
+
+
+def setup_projection(n):
+    from projection import to_lonlat, to_utm, utm_epsg
+
+    df = synthetic.stop_frame(n, with_factors=False)
+    lons, lats = df["lon"].to_numpy(), df["lat"].to_numpy()
+    epsg = utm_epsg(lons[0], lats[0])
+
+    def run():
+        xs, ys = to_utm(lons, lats, epsg)
+        return to_lonlat(xs, ys, epsg)
+    return run
+
+
+def setup_district_lookup(n):
+    from districts import DistrictIndex
+
+    index = DistrictIndex.from_geodataframe(synthetic.district_grid(20))
+    minx, miny, maxx, maxy = (synthetic.ORIGIN[0], synthetic.ORIGIN[1],
+                              synthetic.ORIGIN[0] + 20 * synthetic.CELL_DEG,
+                              synthetic.ORIGIN[1] + 20 * synthetic.CELL_DEG)
+    rng = np.random.default_rng(0)
+    lons, lats = rng.uniform(minx, maxx, n), rng.uniform(miny, maxy, n)
+    return lambda: index.lookup_many(lats, lons)
+
+
+def setup_autofill(n):
+    from directions import DirectionsCache
+    from utils import autofill_missing_fields
+
+    df = synthetic.stop_frame(n, with_factors=False)
+    stub = synthetic.StubGmaps()
+    cache = DirectionsCache(os.path.join(tempfile.mkdtemp(), "directions.sqlite"))
+    # Cold: every destination goes through the pool (rate limit lifted for the stub).
+    return lambda: autofill_missing_fields(df.copy(), client=stub, cache=cache,
+                                           rate_per_sec=1e9, max_workers=8)
+
+
+def setup_geocoding(n):
+    from geocoding import GeocodeCache, Geocoder
+
+    addresses = synthetic.stop_frame(n, with_factors=False)["Address"].tolist()
+    cache = GeocodeCache(os.path.join(tempfile.mkdtemp(), "geocode.sqlite"))
+    return lambda: Geocoder(synthetic.StubGmaps(), cache=cache, rate_per_sec=1e9).geocode_many(addresses)
+
+
+def setup_consolidation(n):
+    from consolidation import consolidate_stops
+    from shapely.geometry import box
+
+    lons, lats = synthetic.building_points(box(*synthetic.ORIGIN, synthetic.ORIGIN[0] + 0.2,
+                                               synthetic.ORIGIN[1] + 0.2), n)
+    df = synthetic.stop_frame(n).assign(lat=lats, lon=lons)
+    return lambda: consolidate_stops(df, max_load=40)
+
+
+def setup_fleet_mix(n):
+    from fleet_mix import solve_fleet_mix
+    from routing import VehicleType
+
+    fleet = [VehicleType("bus", 72, 300, None, 150), VehicleType("mini", 30, 180, 40, 150),
+             VehicleType("van", 7, 120, 200, 150)]
+    return lambda: solve_fleet_mix(n, fleet)
+
+
+def setup_cost_sweep(n):
+    """n scenarios: 100 fleet mixes x n / 100 fuel prices."""
+    from cost_model import CostModel
+
+    mixes = np.arange(100)
+    fuel = np.linspace(0.5, 1.5, max(1, n // 100))
+    return lambda: CostModel().sweep(mixes % 12, mixes // 12, cost_per_mile=fuel, miles_per_trip=25)
+
+
+def setup_routing(n):
+    from routing import VehicleType, solve_routes
+
+    rng = np.random.default_rng(0)
+    stops = rng.uniform(0, 15_000, size=(n, 2))
+    fleet = [VehicleType("bus", 20, 200), VehicleType("van", 7, 120)]
+    return lambda: solve_routes(stops, (7_500, 7_500), fleet)
+
+
+def setup_district_fleet(n):
+    """n stops spread over n / 100 schools on three bell tiers."""
+    from cost_model import CostModel
+    from district_fleet import DistrictOptimizer, School
+    from routing import VehicleType
+
+    rng = np.random.default_rng(0)
+    schools = []
+    for i in range(max(1, n // 100)):
+        center = np.asarray(synthetic.ORIGIN) + rng.uniform(0, 0.3, 2)
+        stops = center + rng.normal(0, 0.02, (min(n, 100), 2))
+        schools.append(School(f"School {i}", stops, center, ("07:30", "08:15", "09:00")[i % 3]))
+    fleet = [VehicleType("bus", 20, 200), VehicleType("van", 7, 120)]
+    return lambda: DistrictOptimizer(schools, CostModel(), fleet, workers=1).optimize()
+
+
+def setup_map_build(n):
+    from map_render import stops_map
+    from utils import score_stops
+
+    df = synthetic.stop_frame(n)
+    scores, ratings = score_stops(df)
+    lats, lons = df["lat"].to_numpy(), df["lon"].to_numpy()
+    return lambda: stops_map(lats, lons, ratings=ratings, scores=scores).get_root().render()
+
+
+def setup_weighted_stops(n):
+    """n is the number of (stubbed OSM) buildings in the district."""
+    from utils import generate_weighted_stops
+
+    district = synthetic.district_grid(1).geometry.iloc[0]
+    school = (district.centroid.y, district.centroid.x)
+    synthetic.BUILDINGS_PER_DISTRICT = n
+    dcode = f"bench-{n}"
+    generate_weighted_stops(district, school, n=50, dcode=dcode, seed=0)  # fetch once via the stub
+    return lambda: generate_weighted_stops(district, school, n=50, dcode=dcode, seed=0)
+
+
+def setup_safety_layers(n):
+    from safety_layers import build_safety_grid
+    from utils import autofill_missing_fields
+
+    district = synthetic.district_grid(1).geometry.iloc[0]
+    grid = build_safety_grid(synthetic.road_features(district), district)
+    df = synthetic.stop_frame(n, with_factors=False, bounds=district.bounds)
+    # Every factor comes from the layers: no Directions calls at all.
+    return lambda: autofill_missing_fields(df.copy(), safety_grid=grid, detect_uturns=False)
+
+
+STAGES = {name[len("setup_"):]: fn for name, fn in globals().items() if name.startswith("setup_")}
+
+
+# === RUNNER ===
+def measure(stage, n, repeat):
+    run = STAGES[stage](n)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    # Separate pass for memory: tracemalloc slows the code it traces.
+    run = STAGES[stage](n)
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    best = min(times)
+    return {"stage": stage, "n": n, "seconds": best,
+            "rows_per_s": n / best if best > 0 else float("inf"),
+            "peak_mb": peak / 1e6}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def show_history(stages):
+    if not os.path.exists(HISTORY):
+        print("No history yet.")
+        return
+    with open(HISTORY) as f:
+        runs = [json.loads(line) for line in f if line.strip()]
+    print(f"{'when':<20} {'rev':<9} {'stage':<16} {'n':>10} {'seconds':>10} {'rows/s':>12} {'peak MB':>9}")
+    for run in runs:
+        for r in run["results"]:
+            if stages and r["stage"] not in stages:
+                continue
+            print(f"{run['timestamp']:<20} {str(run['revision']):<9} {r['stage']:<16} {r['n']:>10,} "
+                  f"{r['seconds']:>10.4f} {r['rows_per_s']:>12,.0f} {r['peak_mb']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000, 100_000])
+    parser.add_argument("--stages", nargs="+", choices=sorted(STAGES), default=sorted(STAGES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-save", action="store_true", help="do not append to history")
+    parser.add_argument("--history", action="store_true", help="print earlier runs and exit")
+    args = parser.parse_args()
+
+    if args.history:
+        show_history(set(args.stages) if args.stages != sorted(STAGES) else None)
+        return
+
+    synthetic.install_stubs()
+    results = []
+    print(f"{'stage':<16} {'n':>10} {'seconds':>10} {'rows/s':>12} {'peak MB':>9}")
+    for stage in args.stages:
+        for n in args.sizes:
+            limit = STAGE_LIMITS.get(stage)
+            if limit is not None and n > limit:
+                continue
+            r = measure(stage, n, args.repeat)
+            results.append(r)
+            print(f"{stage:<16} {n:>10,} {r['seconds']:>10.4f} {r['rows_per_s']:>12,.0f} {r['peak_mb']:>9.1f}")
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(HISTORY), exist_ok=True)
+        with open(HISTORY, "a") as f:
+            f.write(json.dumps({
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "revision": git_revision(),
+                "python": sys.version.split()[0],
+                "results": results,
+            }) + "\n")
+        print(f"Appended to {os.path.relpath(HISTORY, ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
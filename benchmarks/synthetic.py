@@ -0,0 +1,147 @@
+# benchmarks/synthetic.py
+# Synthetic districts, buildings and stops plus offline stand-ins for
+# googlemaps.Client and osmnx, so every hot path can run without network
+# access or School_District.geojson.
+
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ORIGIN = (-83.75, 42.25)  # lon, lat near Ann Arbor
+CELL_DEG = 0.05
+
+
+# === SYNTHETIC DATA ===
+def district_grid(grid=10, lon0=ORIGIN[0], lat0=ORIGIN[1], size=CELL_DEG, buffer=0.0):
+    """A grid x grid GeoDataFrame of square districts with Name/DCode columns.
+
+    A positive buffer rounds the corners, giving polygons a realistic vertex count.
+    """
+    import geopandas as gpd
+    from shapely.geometry import box
+
+    cells = [box(lon0 + i * size, lat0 + j * size, lon0 + (i + 1) * size, lat0 + (j + 1) * size)
+             for i in range(grid) for j in range(grid)]
+    if buffer:
+        cells = [c.buffer(buffer, quad_segs=16) for c in cells]
+    return gpd.GeoDataFrame(
+        {"Name": [f"District {k}" for k in range(len(cells))],
+         "DCode": [str(k) for k in range(len(cells))]},
+        geometry=cells, crs="EPSG:4326",
+    )
+
+
+def building_points(polygon, n, seed=0):
+    """n clustered building centroids inside polygon's bounds (lon, lat arrays)."""
+    rng = np.random.default_rng(seed)
+    minx, miny, maxx, maxy = polygon.bounds
+    centers = rng.uniform([minx, miny], [maxx, maxy], size=(max(1, n // 500), 2))
+    spread = 0.08 * min(maxx - minx, maxy - miny)
+    pts = centers[rng.integers(0, len(centers), n)] + rng.normal(0, spread, size=(n, 2))
+    pts[:, 0] = np.clip(pts[:, 0], minx, maxx)
+    pts[:, 1] = np.clip(pts[:, 1], miny, maxy)
+    return pts[:, 0], pts[:, 1]
+
+
+def stop_frame(n, seed=0, bounds=None, with_factors=True):
+    rng = np.random.default_rng(seed)
+    minx, miny, maxx, maxy = bounds or (ORIGIN[0], ORIGIN[1], ORIGIN[0] + 0.3, ORIGIN[1] + 0.3)
+    data = {
+        "Stop Name": [f"Stop {i + 1}" for i in range(n)],
+        "Address": [f"{i} Synthetic Rd" for i in range(n)],
+        "lat": rng.uniform(miny, maxy, n),
+        "lon": rng.uniform(minx, maxx, n),
+    }
+    if with_factors:
+        from utils import SES_FACTORS
+
+        for column, _, _ in SES_FACTORS.values():
+            data[column] = rng.random(n).round(2)
+        data["U-Turn Required (U)"] = rng.integers(0, 2, n)
+    return pd.DataFrame(data)
+
+
+def road_features(polygon, spacing=0.004, seed=0):
+    """OSM-like highway features over polygon's bounds: a street grid with mixed road
+    classes, speed limits, one-way arterials and sidewalks, plus lamps and crossings."""
+    import geopandas as gpd
+    from shapely.geometry import LineString, Point
+
+    rng = np.random.default_rng(seed)
+    minx, miny, maxx, maxy = polygon.bounds
+    rows = []
+    for k, x in enumerate(np.arange(minx, maxx, spacing)):
+        rows.append((LineString([(x, miny), (x, maxy)]), k))
+    for k, y in enumerate(np.arange(miny, maxy, spacing)):
+        rows.append((LineString([(minx, y), (maxx, y)]), k))
+    records = []
+    for line, k in rows:
+        major = k % 5 == 0
+        records.append({
+            "geometry": line,
+            "highway": "primary" if major else "residential",
+            "maxspeed": "45 mph" if major else rng.choice(["25 mph", None]),
+            "oneway": "yes" if major and k % 10 == 0 else None,
+            "sidewalk": rng.choice(["both", "no", None]),
+        })
+    for kind, n in (("street_lamp", 2000), ("crossing", 300)):
+        xs, ys = rng.uniform(minx, maxx, n), rng.uniform(miny, maxy, n)
+        records += [{"geometry": Point(x, y), "highway": kind} for x, y in zip(xs, ys)]
+    return gpd.GeoDataFrame(records, geometry="geometry", crs="EPSG:4326")
+
+
+# === OFFLINE STUBS ===
+def _unit_hash(text):
+    return int(hashlib.md5(text.encode()).hexdigest()[:8], 16) / 0xFFFFFFFF
+
+
+class StubGmaps:
+    """Deterministic googlemaps.Client stand-in: geocode() and directions()."""
+
+    def __init__(self, bounds=(ORIGIN[0], ORIGIN[1], ORIGIN[0] + 0.3, ORIGIN[1] + 0.3)):
+        self.bounds = bounds
+        self.calls = {"geocode": 0, "directions": 0}
+
+    def geocode(self, address):
+        self.calls["geocode"] += 1
+        minx, miny, maxx, maxy = self.bounds
+        u, v = _unit_hash(address), _unit_hash(address[::-1])
+        return [{"geometry": {"location": {"lat": miny + v * (maxy - miny),
+                                           "lng": minx + u * (maxx - minx)}}}]
+
+    def directions(self, origin, destination, mode="driving"):
+        self.calls["directions"] += 1
+        maneuver = "uturn-left" if _unit_hash(origin + destination) < 0.2 else "turn-right"
+        return [{"legs": [{"steps": [{"maneuver": "straight"}, {"maneuver": maneuver}]}]}]
+
+
+BUILDINGS_PER_DISTRICT = 20_000
+
+
+def install_stubs():
+    """Route clients.get_gmaps and osmnx.features_from_polygon to the offline stubs.
+
+    The fake osmnx returns BUILDINGS_PER_DISTRICT clustered building points.
+    """
+    import geopandas as gpd
+    import osmnx as ox
+
+    import clients
+
+    stub = StubGmaps()
+    clients.get_gmaps = lambda: stub
+    for module in ("utils", "geocoding"):
+        if module in sys.modules and hasattr(sys.modules[module], "get_gmaps"):
+            sys.modules[module].get_gmaps = clients.get_gmaps
+
+    def features_from_polygon(polygon, tags):
+        lons, lats = building_points(polygon, BUILDINGS_PER_DISTRICT)
+        return gpd.GeoDataFrame(geometry=gpd.points_from_xy(lons, lats), crs="EPSG:4326")
+
+    ox.features_from_polygon = features_from_polygon
+    return stub
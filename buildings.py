@@ -0,0 +1,108 @@
+# buildings.py
+
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from config import OSM_EXTRACT, cache_path
+from profiling import count, span
+
+BUILDING_TAGS = {"building": True}
+MEMORY_DISTRICTS = 16  # centroid sets kept in memory per process (least recently used dropped)
+
+_memory = OrderedDict()
+
+# === CACHE KEYS ===
+def polygon_hash(polygon):
+    import shapely
+
+    return hashlib.sha1(shapely.to_wkb(polygon, output_dimension=2)).hexdigest()[:16]
+
+def _cache_file(dcode, polygon):
+    os.makedirs(cache_path("buildings"), exist_ok=True)
+    return cache_path(os.path.join("buildings", f"{dcode or 'any'}-{polygon_hash(polygon)}.npz"))
+
+# === SOURCES ===
+def _centroids(geometries):
+    import shapely
+
+    points = shapely.centroid(np.asarray(geometries, dtype=object))
+    lons, lats = shapely.get_x(points), shapely.get_y(points)
+    ok = np.isfinite(lons) & np.isfinite(lats)
+    return lons[ok], lats[ok]
+
+def _features_from_extract(polygon, path):
+    import shapely
+
+    if path.endswith((".osm", ".xml")):
+        import osmnx as ox
+
+        return ox.features_from_xml(path, polygon=polygon, tags=BUILDING_TAGS).geometry.values
+    if path.endswith(".pbf"):
+        try:
+            from pyrosm import OSM
+        except ImportError:
+            raise ValueError("❌ Reading .osm.pbf extracts requires the optional 'pyrosm' package.")
+        minx, miny, maxx, maxy = polygon.bounds
+        buildings = OSM(path, bounding_box=[minx, miny, maxx, maxy]).get_buildings()
+        geoms = buildings.geometry.values if buildings is not None else []
+    else:
+        import geopandas as gpd
+
+        # GeoJSON / GeoPackage / Shapefile of building footprints
+        features = gpd.read_file(path, mask=polygon).to_crs(epsg=4326)
+        if "building" in features:
+            features = features[features["building"].notna()]
+        geoms = features.geometry.values
+    geoms = np.asarray(geoms, dtype=object)
+    return geoms[shapely.intersects(geoms, polygon)] if len(geoms) else geoms
+
+def _features_from_osm(polygon):
+    import osmnx as ox
+
+    try:
+        buildings = ox.features_from_polygon(polygon, BUILDING_TAGS)
+    except Exception as e:
+        raise ValueError(f"❌ Could not fetch buildings from OpenStreetMap: {e}")
+    return buildings.geometry.values
+
+# === PUBLIC API ===
+def get_building_centroids(district_poly, dcode=None, extract_path=None, refresh=False):
+    """(lons, lats) of building centroids in the district, cached per DCode + polygon."""
+    path = _cache_file(dcode, district_poly)
+    if not refresh:
+        if path in _memory:
+            count("osm.memory_hits")
+            _memory.move_to_end(path)
+            return _memory[path]
+        if os.path.exists(path):
+            count("osm.disk_hits")
+            data = np.load(path)
+            return _remember(path, (data["lon"], data["lat"]))
+
+    extract_path = extract_path or OSM_EXTRACT
+    with span("osm.fetch", source=extract_path or "overpass"):
+        count("osm.fetches")
+        if extract_path:
+            geometries = _features_from_extract(district_poly, extract_path)
+        else:
+            geometries = _features_from_osm(district_poly)
+        lons, lats = _centroids(geometries)
+    if len(lons) == 0:
+        raise ValueError("❌ No buildings found in selected district from OpenStreetMap.")
+
+    # Written atomically, so concurrent workers never load a partial file.
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, lon=lons, lat=lats)
+    os.replace(tmp, path)
+    return _remember(path, (lons, lats))
+
+def _remember(path, centroids):
+    _memory[path] = centroids
+    _memory.move_to_end(path)
+    while len(_memory) > MEMORY_DISTRICTS:
+        _memory.popitem(last=False)
+    return centroids
@@ -0,0 +1,36 @@
+# clients.py
+
+import os
+from functools import lru_cache
+
+from config import get_maps_api_key
+
+# Connections kept open per host; at least the largest lookup thread pool (8 by default).
+POOL_SIZE = 32
+
+# === HTTP SESSION ===
+@lru_cache(maxsize=None)
+def _session(pid, pool_size):
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def get_session(pool_size=POOL_SIZE):
+    """Shared keep-alive requests.Session for this process."""
+    # Keyed on the pid: a forked worker must not reuse its parent's sockets.
+    return _session(os.getpid(), pool_size)
+
+# === API CLIENTS (created on first use) ===
+@lru_cache(maxsize=None)
+def _gmaps(pid):
+    import googlemaps
+
+    return googlemaps.Client(key=get_maps_api_key(), requests_session=get_session())
+
+def get_gmaps():
+    return _gmaps(os.getpid())
@@ -0,0 +1,27 @@
+# config.py
+
+import os
+
+# === CACHE LOCATION ===
+CACHE_DIR = os.environ.get("FLEETLAB_CACHE_DIR", ".fleetlab_cache")
+
+def cache_path(name):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return os.path.join(CACHE_DIR, name)
+
+# === OFFLINE DATA ===
+# Optional pre-downloaded OSM extract (.osm/.xml, .osm.pbf, GeoJSON/GPKG of buildings)
+OSM_EXTRACT = os.environ.get("FLEETLAB_OSM_EXTRACT")
+
+# === API KEYS ===
+def get_maps_api_key():
+    # Environment first so scripts and workers never need Streamlit.
+    key = os.environ.get("GOOGLE_MAPS_API_KEY")
+    if key:
+        return key
+    try:
+        import streamlit as st
+
+        return st.secrets["google"]["maps_api_key"]
+    except Exception:
+        raise ValueError("❌ Set GOOGLE_MAPS_API_KEY or add [google] maps_api_key to Streamlit secrets.")
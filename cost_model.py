@@ -1,15 +1,120 @@
+import numpy as np
+
+# Parameters CostModel.sweep can vary, in output column order.
+SWEEP_PARAMS = ("bus_daily_cost", "van_daily_cost", "driver_hourly_rate", "hours_per_trip",
+                "miles_per_trip", "cost_per_mile", "trips_per_day")
+
 class CostModel:
     def __init__(self, 
                  bus_daily_cost=200, 
                  van_daily_cost=120, 
                  driver_hourly_rate=25,
-                 hours_per_trip=1):
+                 hours_per_trip=1,
+                 cost_per_mile=0.75,
+                 trips_per_day=2,
+                 idle_hourly_rate=10):
         self.bus_cost = bus_daily_cost
         self.van_cost = van_daily_cost
         self.driver_rate = driver_hourly_rate
         self.hours = hours_per_trip  # Per vehicle
+        self.cost_per_mile = cost_per_mile  # Fuel + maintenance
+        self.trips_per_day = trips_per_day  # Morning and afternoon runs
+        self.idle_rate = idle_hourly_rate  # Standby pay between chained trips
 
     def estimate(self, num_buses, num_vans):
+        # Original quick estimate: one trip of driver time per vehicle, no mileage.
+        # evaluate/sweep price every trip of the day (trips_per_day) instead.
         vehicle_cost = num_buses * self.bus_cost + num_vans * self.van_cost
         driver_cost = (num_buses + num_vans) * self.driver_rate * self.hours
         return vehicle_cost + driver_cost
+
+    def estimate_routes(self, routes):
+        # Routes come from routing.solve_routes and carry real miles and hours;
+        # district_fleet.VehicleBlocks also carry idle_hours between their trips.
+        vehicle_cost = sum(r.vehicle.daily_cost for r in routes)
+        driver_cost = sum(r.hours for r in routes) * self.trips_per_day * self.driver_rate
+        idle_cost = sum(getattr(r, "idle_hours", 0.0) for r in routes) \
+            * self.trips_per_day * self.idle_rate
+        mileage_cost = sum(r.miles for r in routes) * self.trips_per_day * self.cost_per_mile
+        return {
+            "vehicle_cost": vehicle_cost,
+            "driver_cost": driver_cost,
+            "idle_cost": idle_cost,
+            "mileage_cost": mileage_cost,
+            "total_cost": vehicle_cost + driver_cost + idle_cost + mileage_cost,
+        }
+
+    # === SCENARIO SWEEPS ===
+    def defaults(self):
+        return {
+            "bus_daily_cost": self.bus_cost,
+            "van_daily_cost": self.van_cost,
+            "driver_hourly_rate": self.driver_rate,
+            "hours_per_trip": self.hours,
+            "miles_per_trip": 0.0,
+            "cost_per_mile": self.cost_per_mile,
+            "trips_per_day": self.trips_per_day,
+        }
+
+    def operating_cost(self, miles_per_trip, hours_per_trip, idle_hours_per_trip=0):
+        # Daily driver + mileage cost of one vehicle running trips_per_day trips.
+        return self.trips_per_day * (self.driver_rate * hours_per_trip
+                                     + self.idle_rate * idle_hours_per_trip
+                                     + self.cost_per_mile * miles_per_trip)
+
+    def evaluate(self, num_buses, num_vans, **params):
+        """Cost breakdown for broadcastable arrays of fleet mixes and parameters.
+
+        Parameters not given fall back to this model's values; miles and hours are
+        per vehicle per trip, as in estimate_routes.
+        """
+        unknown = set(params) - set(SWEEP_PARAMS)
+        if unknown:
+            raise ValueError(f"❌ Unknown cost parameter(s): {', '.join(sorted(unknown))}")
+        p = {**self.defaults(), **params}
+        buses = np.asarray(num_buses, dtype=np.float64)
+        vans = np.asarray(num_vans, dtype=np.float64)
+        vehicles = buses + vans
+        trips = np.asarray(p["trips_per_day"], dtype=np.float64)
+        vehicle_cost = buses * p["bus_daily_cost"] + vans * p["van_daily_cost"]
+        driver_cost = vehicles * trips * p["driver_hourly_rate"] * p["hours_per_trip"]
+        mileage_cost = vehicles * trips * p["cost_per_mile"] * p["miles_per_trip"]
+        return {
+            "vehicle_cost": vehicle_cost,
+            "driver_cost": driver_cost,
+            "mileage_cost": mileage_cost,
+            "total_cost": vehicle_cost + driver_cost + mileage_cost,
+        }
+
+    def sweep(self, num_buses, num_vans, labels=None, **params):
+        """Tidy frame with one row per (fleet mix, parameter combination).
+
+        num_buses/num_vans are paired 1-D arrays of mixes (e.g. one per school,
+        named by labels). Every parameter passed as a scalar or 1-D array becomes
+        its own axis of the scenario grid.
+        """
+        import pandas as pd
+
+        buses, vans = np.broadcast_arrays(np.atleast_1d(num_buses).ravel(),
+                                          np.atleast_1d(num_vans).ravel())
+        axes = [name for name in SWEEP_PARAMS if name in params]
+        ndim = 1 + len(axes)
+        grid = {
+            name: np.atleast_1d(np.asarray(params.pop(name), dtype=np.float64)).ravel()
+                    .reshape([-1 if d == k else 1 for d in range(ndim)])
+            for k, name in enumerate(axes, start=1)
+        }
+        buses = buses.reshape([-1] + [1] * len(axes))
+        vans = vans.reshape(buses.shape)
+        costs = self.evaluate(buses, vans, **grid, **params)
+        shape = np.broadcast_shapes(buses.shape, *(g.shape for g in grid.values()))
+
+        columns = {}
+        if labels is not None:
+            codes = np.repeat(np.arange(len(buses), dtype=np.int32), int(np.prod(shape[1:])))
+            columns["label"] = pd.Categorical.from_codes(codes, categories=pd.Index(labels))
+        columns["num_buses"] = np.broadcast_to(buses, shape).ravel()
+        columns["num_vans"] = np.broadcast_to(vans, shape).ravel()
+        for name, values in {**grid, **costs}.items():
+            columns[name] = np.broadcast_to(values, shape).ravel()
+        return pd.DataFrame(columns)
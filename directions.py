@@ -0,0 +1,108 @@
+# directions.py
+
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from config import cache_path
+from profiling import count, span
+from ratelimit import TokenBucket
+
+UTURN_MANEUVERS = ("uturn-left", "uturn-right")
+
+# === ROUTE PARSING ===
+def has_uturn(directions):
+    return any(
+        step.get("maneuver") in UTURN_MANEUVERS
+        for route in directions
+        for step in route["legs"][0]["steps"]
+    )
+
+# === PERSISTENT CACHE ===
+class DirectionsCache:
+    """U-turn results keyed by (origin, destination), stored in SQLite."""
+
+    def __init__(self, path=None):
+        self.path = path or cache_path("directions.sqlite")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS uturns ("
+            "origin TEXT NOT NULL, destination TEXT NOT NULL, u_turn INTEGER NOT NULL, "
+            "PRIMARY KEY (origin, destination))"
+        )
+        self._conn.commit()
+
+    def get_many(self, origin, destinations):
+        found = {}
+        destinations = list(destinations)
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit.
+            for i in range(0, len(destinations), 500):
+                chunk = destinations[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT destination, u_turn FROM uturns WHERE origin = ? "
+                    f"AND destination IN ({','.join('?' * len(chunk))})",
+                    [origin, *chunk],
+                )
+                found.update(rows)
+        return found
+
+    def put_many(self, origin, results):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO uturns VALUES (?, ?, ?)",
+                [(origin, dest, int(u)) for dest, u in results.items()],
+            )
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+@lru_cache(maxsize=None)
+def _default_cache(pid):
+    return DirectionsCache()
+
+def default_cache():
+    # Keyed on the pid: a forked worker must not share its parent's SQLite connection.
+    return _default_cache(os.getpid())
+
+# === BATCHED U-TURN LOOKUP ===
+def lookup_uturns(client, origin, destinations, cache=None, max_workers=8, rate_per_sec=10,
+                  failed=None):
+    """Return {destination: 0/1}, hitting the API only for uncached destinations.
+
+    Destinations whose lookup failed map to 0 and are added to the `failed` set, if given.
+    """
+    unique = list(dict.fromkeys(destinations))
+    results = cache.get_many(origin, unique) if cache is not None else {}
+    misses = [d for d in unique if d not in results]
+    count("directions.cache_hits", len(unique) - len(misses))
+    count("directions.api_calls", len(misses))
+    if not misses:
+        return results
+
+    bucket = TokenBucket(rate_per_sec)
+
+    def fetch(destination):
+        bucket.acquire()
+        try:
+            return int(has_uturn(client.directions(origin, destination, mode="driving")))
+        except Exception:
+            return None
+
+    with span("directions.fetch", n=len(misses)), ThreadPoolExecutor(max_workers=max_workers) as pool:
+        fetched = dict(zip(misses, pool.map(fetch, misses)))
+
+    # Failed lookups count as "no U-turn" but are not cached, so they are retried next time.
+    ok = {d: u for d, u in fetched.items() if u is not None}
+    if cache is not None and ok:
+        cache.put_many(origin, ok)
+    results.update(ok)
+    errors = [d for d, u in fetched.items() if u is None]
+    results.update(dict.fromkeys(errors, 0))
+    if failed is not None:
+        failed.update(errors)
+    return results
@@ -0,0 +1,227 @@
+# distance_matrix.py
+
+import hashlib
+import heapq
+import os
+
+import numpy as np
+
+from config import cache_path
+
+EARTH_RADIUS_M = 6_371_008.8
+DEFAULT_BLOCK = 2048
+BLOCK_ELEMENTS = 2 ** 22          # cells per block (~32 MB per float64 temporary)
+# Road searches stop here by default: a 60-minute ride at 20 mph. Farther pairs
+# can never share a route, so they keep their straight-line value.
+DEFAULT_CUTOFF_M = 60 / 60 * 20 * 1609.344
+CACHE_MAX_BYTES = 2 * 1024 ** 3   # on-disk matrix cache; least recently used go first
+
+# === BLOCKED KERNELS ===
+def _haversine_block(lon1, lat1, lon2, lat2, dtype):
+    lon1, lat1, lon2, lat2 = (np.radians(a, dtype=np.float64) for a in (lon1, lat1, lon2, lat2))
+    dlat = lat2[None, :] - lat1[:, None]
+    dlon = lon2[None, :] - lon1[:, None]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1)[:, None] * np.cos(lat2)[None, :] * np.sin(dlon / 2) ** 2
+    return (2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))).astype(dtype, copy=False)
+
+def _euclidean_block(xy1, xy2, dtype):
+    diff = xy1[:, None, :] - xy2[None, :, :]
+    return np.sqrt((diff ** 2).sum(axis=-1)).astype(dtype, copy=False)
+
+def block_rows(n_cols, block=None):
+    """Rows per block so a (rows, n_cols) temporary stays near BLOCK_ELEMENTS cells."""
+    rows = max(1, BLOCK_ELEMENTS // max(1, n_cols))
+    return rows if block is None else max(1, min(block, rows))
+
+def iter_blocks(n, block=DEFAULT_BLOCK):
+    for start in range(0, n, block):
+        yield start, min(start + block, n)
+
+def haversine_matrix(lons, lats, dtype=np.float32, block=DEFAULT_BLOCK, out=None):
+    """Great-circle metres between every pair of points, filled block by block."""
+    lons, lats = np.asarray(lons, dtype=np.float64), np.asarray(lats, dtype=np.float64)
+    n = len(lons)
+    out = np.empty((n, n), dtype=dtype) if out is None else out
+    for a, b in iter_blocks(n, block_rows(n, block)):
+        out[a:b] = _haversine_block(lons[a:b], lats[a:b], lons, lats, out.dtype)
+    return out
+
+def euclidean_matrix(points, circuity=1.0, dtype=np.float32, block=DEFAULT_BLOCK, out=None):
+    """Straight-line metres between projected (UTM) points, scaled by a circuity factor."""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    n = len(points)
+    out = np.empty((n, n), dtype=dtype) if out is None else out
+    for a, b in iter_blocks(n, block_rows(2 * n, block)):
+        out[a:b] = _euclidean_block(points[a:b], points, out.dtype)
+        if circuity != 1.0:
+            out[a:b] *= circuity
+    return out
+
+# === ROAD NETWORK REFINEMENT ===
+def _nearest_nodes(graph, lons, lats):
+    """Nearest graph node and snap distance (m) per point, in projected metres.
+
+    Uses a KD-tree when scipy is installed; otherwise a blocked brute force whose
+    temporaries stay near BLOCK_ELEMENTS cells however large the graph is.
+    """
+    from projection import to_utm, utm_epsg
+
+    nodes = np.array(list(graph.nodes))
+    node_lon = np.array([graph.nodes[n]["x"] for n in nodes], dtype=np.float64)
+    node_lat = np.array([graph.nodes[n]["y"] for n in nodes], dtype=np.float64)
+    epsg = utm_epsg(float(np.mean(lons)), float(np.mean(lats)))
+    node_xy = np.column_stack(to_utm(node_lon, node_lat, epsg))
+    xy = np.column_stack(to_utm(lons, lats, epsg))
+    try:
+        from scipy.spatial import cKDTree
+    except ImportError:
+        cKDTree = None
+    if cKDTree is not None:
+        snap, nearest = cKDTree(node_xy).query(xy)
+        return nodes[nearest], snap
+
+    nearest = np.empty(len(xy), dtype=np.int64)
+    snap = np.empty(len(xy), dtype=np.float64)
+    for a, b in iter_blocks(len(xy), block_rows(2 * len(node_xy))):
+        d = ((xy[a:b, None, :] - node_xy[None, :, :]) ** 2).sum(axis=-1)
+        nearest[a:b] = d.argmin(axis=1)
+        snap[a:b] = np.sqrt(d[np.arange(b - a), nearest[a:b]])
+    return nodes[nearest], snap
+
+def _adjacency(graph, weight):
+    """{node: [(neighbour, weight)]}, keeping the lightest of parallel edges."""
+    adj = {}
+    for u, v, data in graph.edges(data=True):
+        w = float(data.get(weight, 1.0))
+        nbrs = adj.setdefault(u, {})
+        if w < nbrs.get(v, np.inf):
+            nbrs[v] = w
+    return {u: list(nbrs.items()) for u, nbrs in adj.items()}
+
+def _dijkstra_to_targets(adj, source, targets, cutoff):
+    """Shortest distances from source to the target nodes; stops once every target is
+    settled or the frontier passes cutoff."""
+    dist = {source: 0.0}
+    found = {}
+    remaining = set(targets)
+    heap = [(0.0, source)]
+    while heap and remaining:
+        d, u = heapq.heappop(heap)
+        if d > dist.get(u, np.inf):
+            continue
+        if u in remaining:
+            remaining.discard(u)
+            found[u] = d
+        for v, w in adj.get(u, ()):
+            nd = d + w
+            if nd <= cutoff and nd < dist.get(v, np.inf):
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return found
+
+def refine_with_road_network(matrix, graph, lons, lats, cutoff=DEFAULT_CUTOFF_M, weight="length"):
+    """Overwrite entries with shortest road-network distances where a path exists.
+
+    `graph` is an unprojected osmnx/networkx graph, e.g.
+    ox.graph_from_polygon(district_polygon, network_type="drive").
+    One search runs per distinct snapped source node; it ends once every stop's
+    node is reached or the distance passes `cutoff` (None = unbounded). Stops that
+    share a node share the run. Unreachable pairs keep their straight-line value.
+    """
+    lons, lats = np.asarray(lons, dtype=np.float64), np.asarray(lats, dtype=np.float64)
+    nodes, snap = _nearest_nodes(graph, lons, lats)
+    unique_nodes, inverse = np.unique(nodes, return_inverse=True)
+    adj = _adjacency(graph, weight)
+    targets = unique_nodes.tolist()
+    limit = np.inf if cutoff is None else float(cutoff)
+    for k, source in enumerate(targets):
+        lengths = _dijkstra_to_targets(adj, source, targets, limit)
+        road = np.array([lengths.get(t, np.nan) for t in targets], dtype=np.float64)[inverse]
+        rows = np.flatnonzero(inverse == k)
+        for i in rows:
+            row = road + snap + snap[i]
+            found = np.isfinite(row)
+            matrix[i, found] = row[found]
+            matrix[i, i] = 0
+    return matrix
+
+# === PERSISTENT MEMORY-MAPPED CACHE ===
+def matrix_key(coords, kind, **params):
+    coords = np.round(np.asarray(coords, dtype=np.float64), 7)
+    h = hashlib.sha1(coords.tobytes())
+    h.update(repr((kind, sorted(params.items()))).encode())
+    return h.hexdigest()[:20]
+
+def graph_key(graph, weight="length"):
+    """Content hash of a road graph: node ids and coordinates plus edge weights."""
+    nodes = np.array(sorted(graph.nodes), dtype=np.int64)
+    coords = np.array([(graph.nodes[n]["x"], graph.nodes[n]["y"]) for n in nodes], dtype=np.float64)
+    edges = np.array(sorted((u, v, float(d.get(weight, 1.0))) for u, v, d in graph.edges(data=True)),
+                     dtype=np.float64).reshape(-1, 3)
+    h = hashlib.sha1(nodes.tobytes())
+    h.update(np.round(coords, 7).tobytes())
+    h.update(np.round(edges, 3).tobytes())
+    return h.hexdigest()[:20]
+
+def _prune(directory, keep, max_bytes=None):
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.endswith(".npy") and path != keep:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries) + os.path.getsize(keep)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)  # open memmaps of it stay valid on POSIX
+        except FileNotFoundError:
+            pass
+        total -= size
+
+def cached_matrix(key, n, build, dtype=np.float32):
+    """Load a cached (n, n) matrix zero-copy, or build it into a fresh memmap.
+
+    `build(out)` fills the writable memmap in place. The cache directory is kept
+    under CACHE_MAX_BYTES by dropping the least recently used matrices.
+    """
+    directory = cache_path("matrices")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{key}.npy")
+    if os.path.exists(path):
+        os.utime(path)  # mark as recently used
+        return np.load(path, mmap_mode="r")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    out = np.lib.format.open_memmap(tmp, mode="w+", dtype=dtype, shape=(n, n))
+    build(out)
+    out.flush()
+    del out
+    os.replace(tmp, path)
+    _prune(directory, path)
+    return np.load(path, mmap_mode="r")
+
+def distance_matrix(lons, lats, graph=None, circuity=1.0, cache=True, dtype=np.float32,
+                    block=None, cutoff=DEFAULT_CUTOFF_M):
+    """Stop-to-stop metres: haversine (times circuity), optionally road-refined and cached."""
+    lons, lats = np.asarray(lons, dtype=np.float64), np.asarray(lats, dtype=np.float64)
+
+    def build(out):
+        haversine_matrix(lons, lats, block=block, out=out)
+        if circuity != 1.0:
+            for a, b in iter_blocks(len(lons), block_rows(len(lons), block)):
+                out[a:b] *= circuity
+        if graph is not None:
+            refine_with_road_network(out, graph, lons, lats, cutoff=cutoff)
+        return out
+
+    if not cache:
+        return build(np.empty((len(lons), len(lons)), dtype=dtype))
+    # Keyed on the graph's content: osmnx stamps a new created_date on every build.
+    kind = f"road:{graph_key(graph)}:{cutoff}" if graph is not None else "haversine"
+    key = matrix_key(np.column_stack([lons, lats]), kind, circuity=circuity, dtype=np.dtype(dtype).str)
+    return cached_matrix(key, len(lons), build, dtype=dtype)
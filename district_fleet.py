@@ -0,0 +1,266 @@
+# district_fleet.py
+# District-wide fleet planning: several schools with staggered bell times share
+# one fleet. Each school is routed independently (large schools are split into
+# angular sectors), the subproblems are solved in parallel, and the resulting
+# trips are chained into vehicle blocks so one vehicle serves an early-bell
+# school and then a later one.
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from cost_model import CostModel
+from projection import to_utm, utm_epsg
+from routing import METERS_PER_MILE, VehicleType, solve_routes
+
+CIRCUITY = 1.3              # road / straight-line distance, as in routing
+SECTOR_STOPS = 400          # largest routing subproblem before a school is split
+ARRIVAL_BUFFER_MINUTES = 10 # vehicles reach school this long before the bell
+LAYOVER_MINUTES = 5         # minimum turnaround between trips of one block
+
+def parse_bell_time(value):
+    """Minutes after midnight from "HH:MM" or a number of minutes."""
+    if isinstance(value, str):
+        hours, _, minutes = value.strip().partition(":")
+        try:
+            return int(hours) * 60 + int(minutes or 0)
+        except ValueError:
+            raise ValueError(f"❌ Bell time must look like 'HH:MM', got {value!r}.")
+    return float(value)
+
+def _format_time(minutes):
+    minutes = int(round(minutes))
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+# === INPUTS ===
+class School:
+    """One school's stops (lon/lat), location, bell time and students per stop."""
+
+    def __init__(self, name, stops_lonlat, school_lonlat, bell_time, demands=None):
+        self.name = name
+        self.stops_lonlat = np.asarray(stops_lonlat, dtype=np.float64).reshape(-1, 2)
+        self.school_lonlat = tuple(school_lonlat)
+        self.bell_minutes = parse_bell_time(bell_time)
+        self.demands = (np.ones(len(self.stops_lonlat), dtype=np.int64) if demands is None
+                        else np.asarray(demands, dtype=np.int64))
+
+    @classmethod
+    def from_simulation(cls, sim, bell_time, name=None):
+        stops = sim.get("stop_collection")
+        return cls(
+            name or sim["metadata"]["school_name"], sim["stops_lonlat"],
+            (sim["school"].x, sim["school"].y), bell_time,
+            demands=None if stops is None else stops["load"],
+        )
+
+# === TRIPS AND BLOCKS ===
+class Trip:
+    def __init__(self, school, route, start, end, start_xy, end_xy):
+        self.school = school      # index into the optimizer's schools
+        self.route = route
+        self.start = start        # minutes after midnight at the first stop
+        self.end = end            # minutes after midnight at the school
+        self.start_xy = start_xy
+        self.end_xy = end_xy
+
+class VehicleBlock:
+    """Trips one vehicle drives in sequence; exposes vehicle/miles/hours like a Route.
+
+    hours counts driving only (trips plus deadhead); the rest of the duty span is
+    idle_hours, which CostModel prices at its idle rate.
+    """
+
+    def __init__(self, vehicle):
+        self.vehicle = vehicle
+        self.trips = []
+        self.deadhead_meters = 0.0
+        self.deadhead_minutes = 0.0
+
+    @property
+    def meters(self):
+        return sum(t.route.meters for t in self.trips) + self.deadhead_meters
+
+    @property
+    def miles(self):
+        return self.meters / METERS_PER_MILE
+
+    @property
+    def duty_hours(self):
+        return (self.trips[-1].end - self.trips[0].start) / 60 if self.trips else 0.0
+
+    @property
+    def hours(self):
+        return sum(t.route.hours for t in self.trips) + self.deadhead_minutes / 60
+
+    @property
+    def idle_hours(self):
+        return max(self.duty_hours - self.hours, 0.0)
+
+    def as_dict(self, schools):
+        return {
+            "vehicle": self.vehicle.name,
+            "trips": [
+                {"school": schools[t.school].name, "stops": len(t.route.stops), "load": t.route.load,
+                 "start": _format_time(t.start), "arrive": _format_time(t.end)}
+                for t in self.trips
+            ],
+            "miles": round(self.miles, 2),
+            "deadhead_miles": round(self.deadhead_meters / METERS_PER_MILE, 2),
+            "driven_hours": round(self.hours, 2),
+            "idle_hours": round(self.idle_hours, 2),
+            "duty_hours": round(self.duty_hours, 2),
+        }
+
+def chain_trips(trips, speed_mph=20, layover_minutes=LAYOVER_MINUTES, cost_model=None):
+    """Greedy tiered chaining: trips in start order join the free vehicle that can
+    carry them and reach their first stop in time at the lowest added cost
+    (deadhead driving and mileage plus idle time, priced by cost_model), but only
+    when that is cheaper than a new block with the trip's own vehicle type."""
+    cost_model = CostModel() if cost_model is None else cost_model
+    speed_m_per_min = speed_mph * METERS_PER_MILE / 60
+    order = sorted(range(len(trips)), key=lambda k: trips[k].start)
+    blocks = []
+    ready = np.empty(len(trips))
+    end_xy = np.empty((len(trips), 2))
+    capacity = np.empty(len(trips))
+    for k in order:
+        trip = trips[k]
+        b = len(blocks)
+        chosen = None
+        if b:
+            deadhead = CIRCUITY * np.hypot(*(end_xy[:b] - trip.start_xy).T)
+            drive = deadhead / speed_m_per_min
+            arrival = ready[:b] + layover_minutes + drive
+            ok = np.flatnonzero((arrival <= trip.start) & (capacity[:b] >= trip.route.load))
+            if len(ok):
+                added = cost_model.operating_cost(deadhead[ok] / METERS_PER_MILE, drive[ok] / 60,
+                                                  (trip.start - ready[ok] - drive[ok]) / 60)
+                # Smallest vehicle among equally cheap options keeps big ones free.
+                best = np.lexsort((capacity[ok], added))[0]
+                if added[best] < trip.route.vehicle.daily_cost:
+                    chosen = ok[best]
+                    blocks[chosen].deadhead_meters += float(deadhead[chosen])
+                    blocks[chosen].deadhead_minutes += float(drive[chosen])
+        if chosen is None:
+            chosen = b
+            blocks.append(VehicleBlock(trip.route.vehicle))
+            capacity[chosen] = trip.route.vehicle.capacity
+        blocks[chosen].trips.append(trip)
+        ready[chosen] = trip.end
+        end_xy[chosen] = trip.end_xy
+    return blocks
+
+# === SUBPROBLEMS ===
+def _sectors(stops_xy, school_xy, max_stops):
+    """Split a school's stops into equal-count angular sectors around the school."""
+    n = len(stops_xy)
+    if n <= max_stops:
+        return [np.arange(n)]
+    angles = np.arctan2(stops_xy[:, 1] - school_xy[1], stops_xy[:, 0] - school_xy[0])
+    return np.array_split(np.argsort(angles, kind="stable"), math.ceil(n / max_stops))
+
+def _solve_subproblem(args):
+    school, stops, stops_xy, school_xy, demands, fleet, max_ride_minutes, speed_mph = args
+    routes = solve_routes(stops_xy, school_xy, fleet, demands=demands,
+                          max_ride_minutes=max_ride_minutes, speed_mph=speed_mph)
+    for route in routes:
+        route.stops = [int(stops[s]) for s in route.stops]  # back to the school's stop indices
+    return school, routes
+
+class DistrictOptimizer:
+    def __init__(self, schools, cost_model, fleet, max_ride_minutes=60, speed_mph=20,
+                 arrival_buffer_minutes=ARRIVAL_BUFFER_MINUTES, layover_minutes=LAYOVER_MINUTES,
+                 sector_stops=SECTOR_STOPS, workers=None):
+        self.schools = list(schools)
+        self.cost_model = cost_model
+        self.fleet = fleet            # VehicleTypes; `available` limits the shared fleet
+        self.max_ride_minutes = max_ride_minutes
+        self.speed_mph = speed_mph
+        self.arrival_buffer = arrival_buffer_minutes
+        self.layover = layover_minutes
+        self.sector_stops = sector_stops
+        self.workers = workers
+        self._projected = None
+
+    def _project(self):
+        # All schools share one UTM zone so deadhead between them is measured in metres.
+        if self._projected is not None:
+            return self._projected
+        points = np.vstack([s.stops_lonlat for s in self.schools] +
+                           [np.asarray([s.school_lonlat for s in self.schools])])
+        epsg = utm_epsg(*points.mean(axis=0))
+        projected = []
+        for s in self.schools:
+            xs, ys = to_utm(s.stops_lonlat[:, 0], s.stops_lonlat[:, 1], epsg)
+            sx, sy = to_utm(s.school_lonlat[0], s.school_lonlat[1], epsg)
+            projected.append((np.column_stack([xs, ys]), (float(sx), float(sy))))
+        self._projected = projected
+        return projected
+
+    def route_schools(self):
+        """Routes per school; every school and sector is an independent subproblem."""
+        # Vehicle limits apply to the shared fleet, not to each school's routes.
+        unlimited = [VehicleType(v.name, v.capacity, v.daily_cost, None, v.driver_cost)
+                     for v in self.fleet]
+        jobs = []
+        for i, (stops_xy, school_xy) in enumerate(self._project()):
+            for sector in _sectors(stops_xy, school_xy, self.sector_stops):
+                jobs.append((i, sector, stops_xy[sector], school_xy, self.schools[i].demands[sector],
+                             unlimited, self.max_ride_minutes, self.speed_mph))
+
+        routes = [[] for _ in self.schools]
+        workers = self.workers or os.cpu_count() or 1
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                results = list(pool.map(_solve_subproblem, jobs))
+        else:
+            results = [_solve_subproblem(job) for job in jobs]
+        for school, school_routes in results:
+            routes[school].extend(school_routes)
+        return routes
+
+    def trips(self, routes):
+        projected = self._project()
+        trips = []
+        for i, school_routes in enumerate(routes):
+            stops_xy, school_xy = projected[i]
+            arrive = self.schools[i].bell_minutes - self.arrival_buffer
+            for route in school_routes:
+                trips.append(Trip(i, route, arrive - route.seconds / 60, arrive,
+                                  stops_xy[route.stops[0]], np.asarray(school_xy)))
+        return trips
+
+    def optimize(self):
+        try:
+            routes = self.route_schools()
+        except ValueError as e:
+            return {"error": str(e)}
+        blocks = chain_trips(self.trips(routes), self.speed_mph, self.layover, self.cost_model)
+
+        counts = {v.name: 0 for v in self.fleet}
+        for block in blocks:
+            counts[block.vehicle.name] += 1
+        short = [f"{counts[v.name] - v.available} more {v.name}(s)" for v in self.fleet
+                 if v.available is not None and counts[v.name] > v.available]
+        if short:
+            return {"error": f"❌ The shared fleet needs {', '.join(short)} than available."}
+
+        # Blocks expose vehicle/miles/hours, so they are priced exactly like routes.
+        shared = self.cost_model.estimate_routes(blocks)
+        all_routes = [r for school_routes in routes for r in school_routes]
+        separate = self.cost_model.estimate_routes(all_routes)
+        return {
+            "blocks": blocks,
+            "routes": routes,
+            "vehicles": counts,
+            "total_vehicles": len(blocks),
+            "total_miles": sum(b.miles for b in blocks),
+            "deadhead_miles": sum(b.deadhead_meters for b in blocks) / METERS_PER_MILE,
+            **shared,
+            "separate_vehicles": len(all_routes),
+            "separate_cost": separate["total_cost"],
+            "vehicles_saved": len(all_routes) - len(blocks),
+            "cost_saved": separate["total_cost"] - shared["total_cost"],
+        }
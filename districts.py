@@ -0,0 +1,108 @@
+# districts.py
+
+import hashlib
+import os
+from functools import lru_cache
+
+import numpy as np
+import shapely
+
+from config import cache_path
+
+DISTRICT_GEOJSON = "School_District.geojson"
+
+# === DISTRICT INDEX ===
+class DistrictIndex:
+    """School district polygons behind an STRtree, loaded once and queried in bulk."""
+
+    def __init__(self, geometries, names, dcodes):
+        self.geometries = np.asarray(geometries, dtype=object)
+        self.names = np.asarray(names, dtype=object)
+        self.dcodes = np.asarray(dcodes, dtype=object)
+        shapely.prepare(self.geometries)
+        self.tree = shapely.STRtree(self.geometries)
+
+    @classmethod
+    def from_geodataframe(cls, districts):
+        districts = districts.to_crs(epsg=4326)
+        districts = districts[districts.geometry.type.isin(["Polygon", "MultiPolygon"])]
+        names = districts["Name"] if "Name" in districts else ["Unknown"] * len(districts)
+        if "DCode" in districts:
+            dcodes = districts["DCode"].astype(str).str.zfill(4)
+        else:
+            dcodes = ["0000"] * len(districts)
+        return cls(districts.geometry.values, list(names), list(dcodes))
+
+    @classmethod
+    def from_file(cls, path):
+        if path.endswith(".npz"):
+            data = np.load(path, allow_pickle=False)
+            blob, offsets = data["wkb"].tobytes(), data["offsets"]
+            wkb = [blob[a:b] for a, b in zip(offsets[:-1], offsets[1:])]
+            return cls(shapely.from_wkb(wkb), data["names"], data["dcodes"])
+        import geopandas as gpd
+
+        if path.endswith(".parquet"):
+            return cls.from_geodataframe(gpd.read_parquet(path))
+        return cls.from_geodataframe(gpd.read_file(path))
+
+    def save(self, path):
+        if path.endswith(".parquet"):
+            import geopandas as gpd
+
+            gpd.GeoDataFrame(
+                {"Name": self.names, "DCode": self.dcodes},
+                geometry=list(self.geometries), crs="EPSG:4326",
+            ).to_parquet(path)
+        else:
+            # WKB blobs are packed into one byte array so the file loads without pickle.
+            wkb = shapely.to_wkb(self.geometries)
+            offsets = np.cumsum([0] + [len(b) for b in wkb])
+            np.savez(
+                path,
+                wkb=np.frombuffer(b"".join(wkb), dtype=np.uint8),
+                offsets=offsets,
+                names=self.names.astype(str),
+                dcodes=self.dcodes.astype(str),
+            )
+
+    def __len__(self):
+        return len(self.geometries)
+
+    @property
+    def geom_types(self):
+        return sorted({geom.geom_type for geom in self.geometries})
+
+    def lookup_many(self, lats, lons):
+        """Index of the first district containing each point, or -1."""
+        points = shapely.points(np.asarray(lons, dtype=float), np.asarray(lats, dtype=float))
+        point_idx, district_idx = self.tree.query(points, predicate="within")
+        result = np.full(len(points), -1, dtype=np.int64)
+        # Match the old sjoin behaviour: lowest district index wins on overlap.
+        order = np.lexsort((district_idx, point_idx))
+        point_idx, district_idx = point_idx[order], district_idx[order]
+        first = np.ones(len(point_idx), dtype=bool)
+        first[1:] = point_idx[1:] != point_idx[:-1]
+        result[point_idx[first]] = district_idx[first]
+        return result
+
+    def lookup(self, lat, lon):
+        idx = self.lookup_many([lat], [lon])[0]
+        if idx < 0:
+            raise ValueError("❌ No matching school district found for the selected location.")
+        return self.geometries[idx], self.names[idx], self.dcodes[idx]
+
+# === SHARED INSTANCE ===
+@lru_cache(maxsize=4)
+def _load_index(path, mtime):
+    key = hashlib.sha1(f"{path}:{mtime}".encode()).hexdigest()[:16]
+    cached = cache_path(f"districts-{key}.npz")
+    if os.path.exists(cached):
+        return DistrictIndex.from_file(cached)
+    index = DistrictIndex.from_file(path)
+    index.save(cached)
+    return index
+
+def get_district_index(path=DISTRICT_GEOJSON):
+    path = os.path.abspath(path)
+    return _load_index(path, os.path.getmtime(path))
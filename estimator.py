@@ -1,27 +1,69 @@
 # estimator.py
 
 from cost_model import CostModel
-from fleet_optimizer import FleetOptimizer
-import folium
-from shapely.ops import transform
-import pyproj
+from fleetlab_optimizer import FleetOptimizer
+from distance_matrix import distance_matrix
+from profiling import span
+from projection import to_lonlat, to_utm
+from routing import METERS_PER_MILE
+import numpy as np
 
-def generate_proposal(sim):
+ROUTE_COLORS = ["blue", "green", "purple", "orange", "darkred", "cadetblue", "darkgreen", "black"]
+
+def generate_proposal(sim, num_buses=2, num_vans=5, max_ride_minutes=60, road_graph=None,
+                      include_map=True):
     cost_model = CostModel()
+    stops = sim.get("stop_collection")
     optimizer = FleetOptimizer(
-        num_students=len(sim["stops"]),
-        num_vans=5,
-        num_buses=2,
+        num_students=len(sim["stops"]) if stops is None else int(stops["load"].sum()),
+        num_vans=num_vans,
+        num_buses=num_buses,
         cost_model=cost_model
     )
 
-    result = optimizer.estimate_cost(miles_per_trip=20, hours_per_trip=1)
-
     # Convert stops to lat/lon
-    project_back = pyproj.Transformer.from_crs(sim["utm_crs"], "EPSG:4326", always_xy=True).transform
-    stops_latlon = [transform(project_back, pt) for pt in sim["stops"]]
+    if "stops_lonlat" in sim:
+        lons, lats = sim["stops_lonlat"][:, 0], sim["stops_lonlat"][:, 1]
+    else:
+        lons, lats = to_lonlat(sim["stops"][:, 0], sim["stops"][:, 1], sim["utm_crs"])
+
+    # School is node 0; the matrix is cached on disk per stop set
+    with span("proposal.matrix", n=len(lons)):
+        dist = distance_matrix(np.r_[sim["school"].x, lons], np.r_[sim["school"].y, lats],
+                               graph=road_graph, circuity=1.3 if road_graph is None else 1.0,
+                               cutoff=max_ride_minutes / 60 * 20 * METERS_PER_MILE)
+    with span("proposal.optimize"):
+        school_xy = to_utm(sim["school"].x, sim["school"].y, sim["utm_crs"])
+        result = optimizer.plan_routes(sim["stops"] if stops is None else stops, school_xy,
+                                       dist=dist, max_ride_minutes=max_ride_minutes)
+    if "error" in result:
+        raise ValueError(result["error"])
+
+    proposal = {
+        "fleet_mix": {
+            **{k: v for k, v in result.items() if k != "routes"},
+            "routes": [r.as_dict() for r in result["routes"]],
+        },
+        "summary": {
+            "Total Cost": f"${result['total_cost']:.2f}",
+            "Drivers Needed": result["assigned_vans"] + result["assigned_buses"],
+            "Fleet Mix": f"{result['assigned_buses']} Buses, {result['assigned_vans']} Vans",
+            "Route Miles": f"{result['total_miles']:.1f}",
+        },
+    }
+    if include_map:
+        with span("proposal.map"):
+            m = proposal_map(sim, lats, lons, proposal["fleet_mix"]["routes"])
+            proposal["map"] = m
+            proposal["map_html"] = m._repr_html_()
+    return proposal
+
+def proposal_map(sim, lats, lons, routes):
+    """Folium map of the school, stops and routes (dicts as in fleet_mix["routes"])."""
+    # folium is only loaded when a map is actually drawn (batch --no-maps skips it)
+    import folium
+    from map_render import add_stops
 
-    # Generate folium map
     m = folium.Map(location=[sim["school"].y, sim["school"].x], zoom_start=12)
     folium.Marker(
         location=[sim["school"].y, sim["school"].x],
@@ -29,15 +71,13 @@ def generate_proposal(sim):
         icon=folium.Icon(color="red", icon="graduation-cap", prefix="fa")
     ).add_to(m)
 
-    for pt in stops_latlon:
-        folium.CircleMarker(location=[pt.y, pt.x], radius=4, color='blue', fill=True).add_to(m)
+    add_stops(m, lats, lons, cluster=False)
 
-    return {
-        "fleet_mix": result,
-        "summary": {
-            "Total Cost": f"${result['total_cost']:.2f}",
-            "Drivers Needed": result["assigned_vans"] + result["assigned_buses"],
-            "Fleet Mix": f"{result['assigned_buses']} Buses, {result['assigned_vans']} Vans"
-        },
-        "map_html": m._repr_html_()
-    }
+    for k, route in enumerate(routes):
+        path = [[lats[i], lons[i]] for i in route["stops"]] + [[sim["school"].y, sim["school"].x]]
+        folium.PolyLine(
+            path, color=ROUTE_COLORS[k % len(ROUTE_COLORS)], weight=3,
+            tooltip=f"Route {k + 1} ({route['vehicle']}): {route['load']} students, "
+                    f"{route['miles']:.1f} mi, {route['ride_minutes']:.0f} min"
+        ).add_to(m)
+    return m
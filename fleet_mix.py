@@ -0,0 +1,99 @@
+# fleet_mix.py
+
+import numpy as np
+
+# Bounded covering knapsack: the cheapest set of vehicles whose seats cover every student.
+# Each type's availability is split into power-of-two bundles so the DP is 0/1 per bundle.
+
+def _bundles(vehicle_types, num_students):
+    bundles = []
+    for t, v in enumerate(vehicle_types):
+        if v.capacity <= 0:
+            continue
+        needed = -(-num_students // v.capacity)
+        remaining = needed if v.available is None else min(v.available, needed)
+        k = 1
+        while remaining > 0:
+            take = min(k, remaining)
+            bundles.append((t, take, v.capacity * take, v.total_cost * take))
+            remaining -= take
+            k *= 2
+    return bundles
+
+def _mix(vehicle_types, counts, num_students):
+    counts = {v.name: int(c) for v, c in zip(vehicle_types, counts)}
+    seats = sum(v.capacity * counts[v.name] for v in vehicle_types)
+    return {
+        "counts": counts,
+        "vehicles": sum(counts.values()),
+        "seats": seats,
+        "spare_seats": seats - num_students,
+        "total_cost": float(sum(v.total_cost * counts[v.name] for v in vehicle_types)),
+    }
+
+def solve_fleet_mix(num_students, vehicle_types):
+    """Cheapest mix covering num_students seats within availability limits, or None."""
+    n = int(num_students)
+    bundles = _bundles(vehicle_types, n)
+    seats = np.arange(n + 1)
+    dp = np.full(n + 1, np.inf)
+    dp[0] = 0.0
+    taken = []
+    for _, _, cap, cost in bundles:
+        cand = dp[np.maximum(0, seats - cap)] + cost
+        take = cand < dp
+        dp = np.where(take, cand, dp)
+        taken.append(take)
+
+    if not np.isfinite(dp[n]):
+        return None
+    counts = np.zeros(len(vehicle_types), dtype=np.int64)
+    s = n
+    for (t, k, cap, _), take in zip(reversed(bundles), reversed(taken)):
+        if take[s]:
+            counts[t] += k
+            s = max(0, s - cap)
+    return _mix(vehicle_types, counts, n)
+
+def pareto_frontier(num_students, vehicle_types, max_vehicles=None):
+    """Mixes that are cheapest for their vehicle count, fewest vehicles first.
+
+    Only counts up to the cost-optimal mix are explored (more vehicles can only
+    cost more), further capped by max_vehicles.
+    """
+    n = int(num_students)
+    best = solve_fleet_mix(n, vehicle_types)
+    if best is None:
+        return []
+    v_max = best["vehicles"] if max_vehicles is None else min(best["vehicles"], max_vehicles)
+    bundles = _bundles(vehicle_types, n)
+    seats = np.arange(n + 1)
+    dp = np.full((v_max + 1, n + 1), np.inf)
+    dp[0, 0] = 0.0
+    taken = []
+    for _, k, cap, cost in bundles:
+        if k > v_max:
+            taken.append(None)
+            continue
+        cand = np.full_like(dp, np.inf)
+        cand[k:] = dp[:-k, np.maximum(0, seats - cap)] + cost
+        take = cand < dp
+        dp = np.where(take, cand, dp)
+        taken.append(np.packbits(take, axis=None))
+
+    frontier = []
+    lowest = np.inf
+    for v in range(v_max + 1):
+        if dp[v, n] < lowest:
+            lowest = dp[v, n]
+            counts = np.zeros(len(vehicle_types), dtype=np.int64)
+            vv, s = v, n
+            for (t, k, cap, _), packed in zip(reversed(bundles), reversed(taken)):
+                if packed is None:
+                    continue
+                bit = vv * (n + 1) + s
+                if (packed[bit >> 3] >> (7 - (bit & 7))) & 1:
+                    counts[t] += k
+                    vv, s = vv - k, max(0, s - cap)
+            frontier.append(_mix(vehicle_types, counts, n))
+    return frontier
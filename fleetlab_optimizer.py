@@ -1,3 +1,6 @@
+from fleet_mix import pareto_frontier, solve_fleet_mix
+from routing import VehicleType, solve_routes
+
 class FleetOptimizer:
     def __init__(self, num_students, num_buses, num_vans, cost_model):
         self.num_students = num_students
@@ -7,24 +10,59 @@ class FleetOptimizer:
         self.bus_capacity = 20
         self.van_capacity = 7
 
+    def fleet(self, driver_cost=0):
+        return [
+            VehicleType("bus", self.bus_capacity, self.cost_model.bus_cost, self.num_buses, driver_cost),
+            VehicleType("van", self.van_capacity, self.cost_model.van_cost, self.num_vans, driver_cost),
+        ]
+
     def estimate_cost(self, miles_per_trip, hours_per_trip):
-        best = None
-        lowest_cost = float("inf")
-
-        for buses in range(self.num_buses + 1):
-            for vans in range(self.num_vans + 1):
-                capacity = buses * self.bus_capacity + vans * self.van_capacity
-                if capacity >= self.num_students:
-                    cost = self.cost_model.estimate(buses, vans)
-                    if cost < lowest_cost:
-                        lowest_cost = cost
-                        best = (buses, vans)
+        # Seat-count sizing: every vehicle drives miles_per_trip / hours_per_trip per run.
+        running_cost = self.cost_model.operating_cost(miles_per_trip, hours_per_trip)
+        best = solve_fleet_mix(self.num_students, self.fleet(running_cost))
 
         if best is None:
             return {"error": "No valid mix found"}
 
+        buses, vans = best["counts"]["bus"], best["counts"]["van"]
+        costs = self.cost_model.evaluate(buses, vans, miles_per_trip=miles_per_trip,
+                                         hours_per_trip=hours_per_trip)
+        return {
+            "assigned_buses": buses,
+            "assigned_vans": vans,
+            **{k: float(v) for k, v in costs.items()},
+        }
+
+    def fleet_frontier(self, max_vehicles=None):
+        running_cost = self.cost_model.operating_cost(0, self.cost_model.hours)
+        return pareto_frontier(self.num_students, self.fleet(running_cost), max_vehicles)
+
+    def plan_routes(self, stops_xy, school_xy, demands=None, max_ride_minutes=60, **kwargs):
+        # stops_xy / school_xy are projected metres (e.g. sim["stops"] and the school in UTM).
+        # A StopCollection supplies its own x/y and loads and gets its route ids filled in.
+        from stops import StopCollection
+
+        stops = None
+        if isinstance(stops_xy, StopCollection):
+            stops, stops_xy = stops_xy, stops_xy.xy
+            demands = stops["load"] if demands is None else demands
+        try:
+            routes = solve_routes(stops_xy, school_xy, self.fleet(), demands=demands,
+                                  max_ride_minutes=max_ride_minutes, **kwargs)
+        except ValueError as e:
+            return {"error": str(e)}
+
+        if stops is not None:
+            stops["route"][:] = -1
+            for k, route in enumerate(routes):
+                stops["route"][route.stops] = k
+
+        costs = self.cost_model.estimate_routes(routes)
         return {
-            "assigned_buses": best[0],
-            "assigned_vans": best[1],
-            "total_cost": lowest_cost
+            "assigned_buses": sum(r.vehicle.name == "bus" for r in routes),
+            "assigned_vans": sum(r.vehicle.name == "van" for r in routes),
+            "routes": routes,
+            "total_miles": sum(r.miles for r in routes),
+            "total_hours": sum(r.hours for r in routes),
+            **costs,
         }
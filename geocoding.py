@@ -0,0 +1,146 @@
+# geocoding.py
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from clients import get_gmaps
+from config import cache_path
+from profiling import count, span
+from ratelimit import TokenBucket
+
+DEFAULT_TTL = 30 * 24 * 3600  # seconds
+
+# === NORMALIZATION ===
+def normalize_address(address):
+    if address is None:
+        return ""
+    return re.sub(r"\s+", " ", str(address)).strip().casefold()
+
+# === PERSISTENT CACHE ===
+class GeocodeCache:
+    """Per-address geocode results in SQLite. Not-found results are cached as None."""
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL):
+        self.path = path or cache_path("geocode.sqlite")
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocodes ("
+            "address TEXT PRIMARY KEY, lat REAL, lon REAL, fetched_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, addresses):
+        found = {}
+        addresses = list(addresses)
+        cutoff = time.time() - self.ttl if self.ttl is not None else float("-inf")
+        with self._lock:
+            for i in range(0, len(addresses), 500):
+                chunk = addresses[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT address, lat, lon FROM geocodes WHERE fetched_at >= ? "
+                    f"AND address IN ({','.join('?' * len(chunk))})",
+                    [cutoff, *chunk],
+                )
+                for address, lat, lon in rows:
+                    found[address] = None if lat is None else (lat, lon)
+        return found
+
+    def put_many(self, results):
+        now = time.time()
+        rows = [
+            (address, *(loc if loc is not None else (None, None)), now)
+            for address, loc in results.items()
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def purge_expired(self):
+        if self.ttl is None:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM geocodes WHERE fetched_at < ?", (time.time() - self.ttl,))
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+# === GEOCODER ===
+class Geocoder:
+    """Deduplicating, cached, rate-limited geocoder around any client with .geocode()."""
+
+    def __init__(self, client, cache=None, rate_per_sec=10, max_workers=8):
+        self.client = client
+        self.cache = cache
+        self.rate_per_sec = rate_per_sec
+        self.max_workers = max_workers
+        self.stats = {"hits": 0, "misses": 0, "errors": 0}
+        self._bucket = TokenBucket(rate_per_sec)
+
+    def _fetch(self, address):
+        self._bucket.acquire()
+        result = self.client.geocode(address)
+        if not result:
+            return None
+        loc = result[0]["geometry"]["location"]
+        return loc["lat"], loc["lng"]
+
+    def geocode_many(self, addresses):
+        """Return a (lat, lon) tuple or None for each address, in input order."""
+        keys = [normalize_address(a) for a in addresses]
+        # Query the API with the first spelling seen for each normalized address.
+        originals = {}
+        for key, address in zip(keys, addresses):
+            if key:
+                originals.setdefault(key, str(address).strip())
+        unique = list(originals)
+        resolved = self.cache.get_many(unique) if self.cache is not None else {}
+        misses = [k for k in unique if k not in resolved]
+        self.stats["hits"] += len(unique) - len(misses)
+        self.stats["misses"] += len(misses)
+        count("geocode.cache_hits", len(unique) - len(misses))
+        count("geocode.api_calls", len(misses))
+
+        if misses:
+            def fetch(key):
+                try:
+                    return key, self._fetch(originals[key]), True
+                except Exception:
+                    return key, None, False
+
+            with span("geocode.fetch", n=len(misses)), \
+                    ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                fetched = list(pool.map(fetch, misses))
+
+            # Only definitive answers are cached; transient errors are retried next time.
+            ok = {key: loc for key, loc, success in fetched if success}
+            self.stats["errors"] += len(fetched) - len(ok)
+            if self.cache is not None and ok:
+                self.cache.put_many(ok)
+            resolved.update({key: loc for key, loc, _ in fetched})
+
+        return [resolved.get(k) for k in keys]
+
+    def geocode(self, address):
+        loc = self.geocode_many([address])[0]
+        if loc is None:
+            raise ValueError(f"❌ Could not geocode address: {address}")
+        return loc
+
+@lru_cache(maxsize=None)
+def _default_geocoder(pid):
+    return Geocoder(get_gmaps(), cache=GeocodeCache())
+
+def default_geocoder():
+    # Keyed on the pid: a forked worker must not share its parent's client or SQLite connection.
+    return _default_geocoder(os.getpid())
+
+def geocode_address(address):
+    return default_geocoder().geocode(address)
@@ -0,0 +1,125 @@
+# incremental.py
+
+import hashlib
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from config import cache_path
+from utils import (QUALITY_DEFAULTS, RISK_DEFAULTS, UTURN_COLUMN,
+                   autofill_missing_fields, score_stops)
+
+# Fields that determine a stop's autofill + SES result
+INPUT_COLUMNS = ["Address", "lat", "lon", *RISK_DEFAULTS, *QUALITY_DEFAULTS, UTURN_COLUMN]
+FACTOR_COLUMNS = [*RISK_DEFAULTS, *QUALITY_DEFAULTS, UTURN_COLUMN]
+OUTPUT_COLUMNS = [*FACTOR_COLUMNS, "SES Score", "Safety Rating"]
+
+# === FINGERPRINTS ===
+def fingerprint_rows(df, salt=""):
+    """One int64 content hash per row over the input fields present in df."""
+    present = [c for c in INPUT_COLUMNS if c in df.columns]
+    schema = hashlib.sha1(repr((present, salt)).encode()).digest()
+    schema_hash = np.frombuffer(schema[:8], dtype=np.uint64)[0]
+    if not present:
+        return np.full(len(df), schema_hash, dtype=np.uint64).view(np.int64)
+    rows = pd.util.hash_pandas_object(df[present], index=False).to_numpy()
+    return (rows ^ schema_hash).view(np.int64)
+
+# === TWO-LEVEL CACHE ===
+class ScoreCache:
+    """Scored outputs per fingerprint: an in-memory frame backed by SQLite."""
+
+    def __init__(self, path=None, persist=True):
+        self._memory = pd.DataFrame(columns=OUTPUT_COLUMNS, index=pd.Index([], dtype=np.int64))
+        self._lock = threading.Lock()
+        self._conn = None
+        if persist:
+            self._conn = sqlite3.connect(path or cache_path("scores.sqlite"), timeout=30,
+                                         check_same_thread=False)
+            cols = ", ".join(f'"{c}" REAL' for c in FACTOR_COLUMNS)
+            self._conn.execute(
+                f'CREATE TABLE IF NOT EXISTS scores (fp INTEGER PRIMARY KEY, {cols}, '
+                f'"SES Score" REAL, "Safety Rating" TEXT)'
+            )
+            self._conn.commit()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "rows": 0}
+
+    def _read_disk(self, fps):
+        if self._conn is None or len(fps) == 0:
+            return pd.DataFrame(columns=OUTPUT_COLUMNS)
+        frames = []
+        fps = [int(f) for f in fps]
+        with self._lock:
+            for i in range(0, len(fps), 500):
+                chunk = fps[i:i + 500]
+                frames.append(pd.read_sql_query(
+                    f"SELECT * FROM scores WHERE fp IN ({','.join('?' * len(chunk))})",
+                    self._conn, params=chunk, index_col="fp",
+                ))
+        return pd.concat(frames) if frames else pd.DataFrame(columns=OUTPUT_COLUMNS)
+
+    def get_many(self, fps):
+        """Cached outputs aligned to fps (NaN rows where missing) and a hit mask."""
+        unique = pd.unique(fps)
+        in_memory = self._memory.index.intersection(unique)
+        need_disk = np.setdiff1d(unique, in_memory.to_numpy())
+        from_disk = self._read_disk(need_disk)
+        if len(from_disk):
+            self._memory = pd.concat([self._memory, from_disk[OUTPUT_COLUMNS]])
+        found = self._memory.reindex(fps)
+        hit = found["SES Score"].notna().to_numpy()
+
+        disk_keys = set(from_disk.index)
+        from_disk_rows = np.fromiter((f in disk_keys for f in fps), dtype=bool, count=len(fps))
+        self.stats["disk_hits"] += int((hit & from_disk_rows).sum())
+        self.stats["memory_hits"] += int((hit & ~from_disk_rows).sum())
+        self.stats["misses"] += int((~hit).sum())
+        self.stats["rows"] += len(fps)
+        return found, hit
+
+    def put_many(self, fps, outputs):
+        outputs = outputs[OUTPUT_COLUMNS].copy()
+        outputs.index = pd.Index(fps, dtype=np.int64)
+        outputs = outputs[~outputs.index.duplicated()]
+        self._memory = pd.concat([self._memory.drop(outputs.index, errors="ignore"), outputs])
+        if self._conn is not None:
+            rows = [
+                (int(fp), *[None if pd.isna(v) else float(v) for v in values[:-2]],
+                 None if pd.isna(values[-2]) else float(values[-2]), str(values[-1]))
+                for fp, values in zip(outputs.index, outputs.itertuples(index=False))
+            ]
+            with self._lock:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO scores VALUES ({','.join('?' * (len(OUTPUT_COLUMNS) + 1))})",
+                    rows,
+                )
+                self._conn.commit()
+
+    def __len__(self):
+        return len(self._memory)
+
+# === INCREMENTAL SCORING ===
+def score_incremental(df, cache, **autofill_kwargs):
+    """Autofill + score only rows whose input fingerprint has not been seen before."""
+    salt = repr(sorted((k, v) for k, v in autofill_kwargs.items()
+                       if k in ("origin", "detect_uturns", "safety_grid")))
+    fps = fingerprint_rows(df, salt)
+    found, hit = cache.get_many(fps)
+
+    if (~hit).any():
+        failed = set()
+        changed = autofill_missing_fields(df.loc[~hit].copy(), failed_uturns=failed, **autofill_kwargs)
+        changed["SES Score"], changed["Safety Rating"] = score_stops(changed)
+        # A failed Directions call is scored as "no U-turn" for now but must not be
+        # persisted, or the stop would never be looked up again.
+        keep = ~changed["Address"].isin(failed).to_numpy() if failed else np.ones(len(changed), bool)
+        cache.put_many(fps[~hit][keep], changed[keep])
+        found.iloc[np.flatnonzero(~hit)] = changed[OUTPUT_COLUMNS].to_numpy(dtype=object)
+
+    result = df.copy()
+    for column in OUTPUT_COLUMNS:
+        values = found[column].to_numpy()
+        result[column] = values if column == "Safety Rating" else values.astype(np.float64)
+    return result
@@ -2,8 +2,8 @@
 
 import streamlit as st
 import pandas as pd
-import geopandas as gpd
 from geo_utils import geocode_school_address, get_district_geometry, generate_weighted_stops
+from map_render import add_stops
 
 # === PAGE CONFIG ===
 st.set_page_config(page_title="FleetLab District Debugger", layout="wide")
@@ -26,7 +26,7 @@ if st.button("🔍 Find District and Generate Stops"):
             st.info(f"✅ District: {district_name} (Code: {district_code})")
 
             # 3. Generate stops
-            stops_df = generate_weighted_stops(district_poly, (lat, lon), n=50)
+            stops_df = generate_weighted_stops(district_poly, (lat, lon), n=50, dcode=district_code)
 
             # 4. Visualize
             import folium
@@ -35,15 +35,9 @@ if st.button("🔍 Find District and Generate Stops"):
             m = folium.Map(location=[lat, lon], zoom_start=13, tiles="CartoDB positron")
             folium.Marker([lat, lon], popup="School", icon=folium.Icon(color='red')).add_to(m)
 
-            for _, row in stops_df.iterrows():
-                folium.CircleMarker(
-                    location=[row['lat'], row['lon']],
-                    radius=4,
-                    color='blue',
-                    fill=True,
-                    fill_opacity=0.8,
-                    popup=f"Stop: ({row['lat']:.5f}, {row['lon']:.5f})"
-                ).add_to(m)
+            lats, lons = stops_df["lat"].to_numpy(), stops_df["lon"].to_numpy()
+            labels = [f"Stop: ({la:.5f}, {lo:.5f})" for la, lo in zip(lats, lons)]
+            add_stops(m, lats, lons, labels=labels, cluster=False)
 
             st.subheader("🗂️ Generated Stops")
             st.dataframe(stops_df)
@@ -0,0 +1,158 @@
+# map_render.py
+
+import folium
+import numpy as np
+from folium.plugins import FastMarkerCluster, HeatMap
+
+from utils import SAFETY_THRESHOLDS, classify_ses_batch
+
+RATING_COLORS = {"Safe": "green", "Acceptable": "orange", "Unsafe": "red"}
+DEFAULT_COLOR = "blue"
+AGGREGATE_THRESHOLD = 5000  # stops; above this "auto" switches to hex bins
+
+_CIRCLE_CALLBACK = """
+function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]),
+        {radius: 5, color: row[2], fill: true, fillOpacity: 0.7});
+    marker.bindPopup(row[3]);
+    return marker;
+}
+"""
+
+# === POINT LAYERS ===
+def _colors(ratings, n):
+    if ratings is None:
+        return np.full(n, DEFAULT_COLOR, dtype=object)
+    ratings = np.asarray(ratings, dtype=object)
+    colors = np.full(n, DEFAULT_COLOR, dtype=object)
+    for rating, color in RATING_COLORS.items():
+        colors[ratings == rating] = color
+    return colors
+
+def _labels(labels, ratings, n):
+    names = np.full(n, "Stop", dtype=object) if labels is None else np.asarray(labels, dtype=object)
+    if ratings is None:
+        return names
+    return names.astype(str) + ": " + np.asarray(ratings, dtype=object).astype(str)
+
+def cluster_layer(lats, lons, ratings=None, labels=None, name="Stops"):
+    """All stops as one FastMarkerCluster; rows are plain arrays, markers are built in JS."""
+    n = len(lats)
+    data = np.empty((n, 4), dtype=object)
+    data[:, 0] = np.round(np.asarray(lats, dtype=float), 6)
+    data[:, 1] = np.round(np.asarray(lons, dtype=float), 6)
+    data[:, 2] = _colors(ratings, n)
+    data[:, 3] = _labels(labels, ratings, n)
+    return FastMarkerCluster(data.tolist(), callback=_CIRCLE_CALLBACK, name=name)
+
+def geojson_layer(lats, lons, ratings=None, labels=None, name="Stops"):
+    """All stops as one GeoJSON layer of circle markers styled by their rating."""
+    n = len(lats)
+    colors = _colors(ratings, n)
+    popups = _labels(labels, ratings, n)
+    features = [
+        {"type": "Feature",
+         "geometry": {"type": "Point", "coordinates": [lon, lat]},
+         "properties": {"color": color, "label": label}}
+        for lat, lon, color, label in zip(
+            np.round(np.asarray(lats, dtype=float), 6).tolist(),
+            np.round(np.asarray(lons, dtype=float), 6).tolist(),
+            colors.tolist(), popups.tolist())
+    ]
+    return folium.GeoJson(
+        {"type": "FeatureCollection", "features": features},
+        name=name,
+        marker=folium.CircleMarker(radius=5, fill=True, fill_opacity=0.7),
+        style_function=lambda f: {"color": f["properties"]["color"],
+                                  "fillColor": f["properties"]["color"]},
+        popup=folium.GeoJsonPopup(fields=["label"], labels=False),
+    )
+
+# === AGGREGATED LAYERS ===
+def _hex_bins(lats, lons, size_m):
+    lat0 = float(np.mean(lats))
+    x = (lons - np.mean(lons)) * np.cos(np.radians(lat0)) * 111_320.0
+    y = (lats - lat0) * 110_540.0
+    # Pointy-top axial coordinates with cube rounding.
+    q = (np.sqrt(3) / 3 * x - y / 3) / size_m
+    r = (2 / 3 * y) / size_m
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    return rq.astype(np.int64), rr.astype(np.int64), lat0, float(np.mean(lons))
+
+def hexbin_layer(lats, lons, scores=None, size_m=500, thresholds=SAFETY_THRESHOLDS, name="Stops (hex bins)"):
+    """Hex bins colored by mean SES score (or neutral when no scores), one GeoJSON layer."""
+    lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+    q, r, lat0, lon0 = _hex_bins(lats, lons, size_m)
+    keys, inverse, counts = np.unique(np.stack([q, r], axis=1), axis=0,
+                                      return_inverse=True, return_counts=True)
+    inverse = inverse.ravel()
+    if scores is not None:
+        mean_scores = np.bincount(inverse, weights=np.asarray(scores, dtype=float)) / counts
+        colors = _colors(classify_ses_batch(mean_scores, thresholds), len(keys))
+    else:
+        mean_scores = np.full(len(keys), np.nan)
+        colors = np.full(len(keys), DEFAULT_COLOR, dtype=object)
+
+    # Hex centers and corners back to lat/lon.
+    cx = size_m * (np.sqrt(3) * keys[:, 0] + np.sqrt(3) / 2 * keys[:, 1])
+    cy = size_m * (1.5 * keys[:, 1])
+    angles = np.radians(60 * np.arange(6) - 30)
+    corner_x = cx[:, None] + size_m * np.cos(angles)[None, :]
+    corner_y = cy[:, None] + size_m * np.sin(angles)[None, :]
+    corner_lon = lon0 + corner_x / (np.cos(np.radians(lat0)) * 111_320.0)
+    corner_lat = lat0 + corner_y / 110_540.0
+
+    features = []
+    for k in range(len(keys)):
+        ring = np.round(np.column_stack([corner_lon[k], corner_lat[k]]), 6).tolist()
+        label = f"{counts[k]} stops"
+        if np.isfinite(mean_scores[k]):
+            label += f", mean SES {mean_scores[k]:.2f}"
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Polygon", "coordinates": [ring + ring[:1]]},
+            "properties": {"color": colors[k], "label": label},
+        })
+    return folium.GeoJson(
+        {"type": "FeatureCollection", "features": features},
+        name=name,
+        style_function=lambda f: {"color": f["properties"]["color"], "weight": 1,
+                                  "fillColor": f["properties"]["color"], "fillOpacity": 0.5},
+        tooltip=folium.GeoJsonTooltip(fields=["label"], labels=False),
+    )
+
+def heatmap_layer(lats, lons, name="Stop density"):
+    data = np.column_stack([np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)])
+    return HeatMap(np.round(data, 5).tolist(), name=name, radius=12)
+
+# === ENTRY POINT ===
+def add_stops(m, lats, lons, ratings=None, scores=None, labels=None, mode="auto",
+              cluster=True, threshold=AGGREGATE_THRESHOLD, hex_size_m=500):
+    """Add stops to a folium map as a single layer.
+
+    mode: "points", "hexbin", "heatmap", or "auto" (points up to `threshold`, hex bins above).
+    """
+    if mode == "auto":
+        mode = "points" if len(lats) <= threshold else "hexbin"
+    if mode == "points":
+        layer = (cluster_layer if cluster else geojson_layer)(lats, lons, ratings, labels)
+    elif mode == "hexbin":
+        layer = hexbin_layer(lats, lons, scores, size_m=hex_size_m)
+    elif mode == "heatmap":
+        layer = heatmap_layer(lats, lons)
+    else:
+        raise ValueError(f"❌ Unknown map mode: {mode}")
+    layer.add_to(m)
+    return mode
+
+def stops_map(lats, lons, zoom_start=13, tiles="OpenStreetMap", **kwargs):
+    m = folium.Map(location=[float(np.mean(lats)), float(np.mean(lons))],
+                   zoom_start=zoom_start, tiles=tiles)
+    add_stops(m, lats, lons, **kwargs)
+    return m
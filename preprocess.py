@@ -1,15 +1,212 @@
 # preprocess.py
 
+import numpy as np
 import pandas as pd
 
-def load_input_data(csv_file):
-    df = pd.read_csv(csv_file)
-    df.columns = df.columns.str.strip()
+CHUNK_ROWS = 50_000
+
+# Header spellings seen in district exports -> canonical column names
+HEADER_ALIASES = {
+    "latitude": "lat", "lat": "lat",
+    "longitude": "lon", "long": "lon", "lng": "lon", "lon": "lon",
+    "home address": "Home Address", "address": "Address",
+    "stop name": "Stop Name",
+    "school": "School", "grade": "Grade", "district": "District",
+}
+
+# Compact dtypes: float32 coordinates, uint8 flags, categories for repeated labels.
+# Safety factors stay float64 so SES scores (and rating thresholds) match exactly.
+COLUMN_DTYPES = {
+    "lat": "float32", "lon": "float32",
+    "Visibility (V)": "float64", "Lighting (L)": "float64",
+    "Traffic Risk (T)": "float64", "Pedestrian Safety (P)": "float64",
+    "Sidewalk Quality (S)": "float64", "Construction Risk (C)": "float64",
+    "U-Turn Required (U)": "UInt8",
+    "School": "category", "Grade": "category", "District": "category",
+    "Address": "str", "Home Address": "str", "Stop Name": "str",
+}
+RATING_DTYPE = pd.CategoricalDtype(["Unsafe", "Acceptable", "Safe"])
+
+# === HEADERS ===
+def normalize_header(name):
+    name = " ".join(str(name).split())
+    return HEADER_ALIASES.get(name.lower(), name)
+
+def _is_parquet(source):
+    name = getattr(source, "name", source)
+    return isinstance(name, str) and name.lower().endswith((".parquet", ".pq"))
+
+def _raw_header(source):
+    if _is_parquet(source):
+        import pyarrow.parquet as pq
+
+        names = pq.ParquetFile(source).schema_arrow.names
+    else:
+        names = pd.read_csv(source, nrows=0).columns
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return list(names)
+
+def _require_location(columns, allow_address=True):
+    """Fail on the header alone, before any rows are read."""
+    columns = {normalize_header(c) for c in columns}
+    if "Home Address" in columns or {"lat", "lon"} <= columns:
+        return
+    if allow_address and "Address" in columns:
+        return
+    raise ValueError("CSV must contain either 'Home Address' or 'lat'/'lon' columns.")
+
+def _csv_dtypes(header):
+    # Flags are read as floats and coerced per chunk after validation. Text and
+    # category columns are pinned to strings so every chunk gets the same type,
+    # even when a chunk holds no values for them.
+    dtypes = {}
+    for raw in header:
+        dtype = COLUMN_DTYPES.get(normalize_header(raw), "")
+        if dtype.startswith("float"):
+            dtypes[raw] = "float32" if dtype == "float32" else "float64"
+        elif dtype in ("str", "category"):
+            dtypes[raw] = "str"
+    return dtypes
+
+def _validate_chunk(chunk):
+    chunk = chunk.rename(columns=normalize_header)
+    if chunk.columns.duplicated().any():
+        dupes = sorted(set(chunk.columns[chunk.columns.duplicated()]))
+        raise ValueError(f"❌ Duplicate columns after header normalization: {dupes}")
     # Drop rows missing key location fields
-    if "Home Address" in df.columns:
-        df = df.dropna(subset=["Home Address"])
-    elif "lat" in df.columns and "lon" in df.columns:
-        df = df.dropna(subset=["lat", "lon"])
+    if "Home Address" in chunk.columns:
+        chunk = chunk.dropna(subset=["Home Address"])
+    elif "lat" in chunk.columns and "lon" in chunk.columns:
+        chunk = chunk.dropna(subset=["lat", "lon"])
+        chunk = chunk[chunk["lat"].between(-90, 90) & chunk["lon"].between(-180, 180)]
+    elif "Address" in chunk.columns:
+        chunk = chunk.dropna(subset=["Address"])
     else:
         raise ValueError("CSV must contain either 'Home Address' or 'lat'/'lon' columns.")
+    for column, dtype in COLUMN_DTYPES.items():
+        if column in chunk.columns and str(chunk[column].dtype) != dtype:
+            if dtype == "UInt8":
+                chunk[column] = pd.to_numeric(chunk[column], errors="coerce").round().astype(dtype)
+            elif dtype == "category":
+                chunk[column] = chunk[column].astype("str").astype("category")
+            elif dtype == "str":
+                chunk[column] = chunk[column].astype("str")
+            else:
+                chunk[column] = pd.to_numeric(chunk[column], errors="coerce").astype(dtype)
+    return chunk
+
+# === STREAMING READERS ===
+def iter_input_chunks(source, chunksize=CHUNK_ROWS):
+    """Yield validated, compactly typed chunks from a CSV or Parquet file (path or file object)."""
+    header = _raw_header(source)
+    _require_location(header)
+    if _is_parquet(source):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize):
+            yield _validate_chunk(batch.to_pandas())
+        return
+    for chunk in pd.read_csv(source, chunksize=chunksize, dtype=_csv_dtypes(header)):
+        yield _validate_chunk(chunk)
+
+def _concat(chunks):
+    chunks = list(chunks)
+    if not chunks:
+        return pd.DataFrame()
+    df = pd.concat(chunks, ignore_index=True)
+    # Categories differ between chunks; restore the compact dtype after concatenating.
+    for column, dtype in COLUMN_DTYPES.items():
+        if dtype == "category" and column in df.columns:
+            df[column] = df[column].astype("category")
     return df
+
+def read_stops(source, chunksize=CHUNK_ROWS, max_rows=None):
+    """All chunks in one frame; stops reading with a ValueError past max_rows."""
+    if max_rows is None:
+        return _concat(iter_input_chunks(source, chunksize))
+    chunks, rows = [], 0
+    for chunk in iter_input_chunks(source, chunksize):
+        rows += len(chunk)
+        if rows > max_rows:
+            raise ValueError(f"❌ More than {max_rows:,} stops; score files this large with "
+                             "preprocess.write_scored_stops instead.")
+        chunks.append(chunk)
+    return _concat(chunks)
+
+def load_input_data(csv_file):
+    _require_location(_raw_header(csv_file), allow_address=False)
+    return read_stops(csv_file)
+
+# === GENERATOR PIPELINE ===
+def geocode_chunk(chunk, geocoder):
+    if "lat" in chunk.columns and "lon" in chunk.columns:
+        return chunk
+    column = "Home Address" if "Home Address" in chunk.columns else "Address"
+    coords = geocoder.geocode_many(chunk[column].astype(str).tolist())
+    chunk = chunk.assign(
+        lat=np.array([c[0] if c else np.nan for c in coords], dtype=np.float32),
+        lon=np.array([c[1] if c else np.nan for c in coords], dtype=np.float32),
+    )
+    return chunk.dropna(subset=["lat", "lon"])
+
+def score_chunk(chunk, **autofill_kwargs):
+    from utils import autofill_missing_fields, score_stops
+
+    if "Address" not in chunk.columns and "Home Address" in chunk.columns:
+        chunk = chunk.assign(Address=chunk["Home Address"])
+    chunk = autofill_missing_fields(chunk, **autofill_kwargs)
+    if "U-Turn Required (U)" in chunk.columns:
+        chunk["U-Turn Required (U)"] = chunk["U-Turn Required (U)"].astype("UInt8")
+    scores, ratings = score_stops(chunk)
+    chunk["SES Score"] = scores.astype(np.float32)
+    chunk["Safety Rating"] = pd.Categorical(ratings, dtype=RATING_DTYPE)
+    return chunk
+
+def stream_scored_stops(source, chunksize=CHUNK_ROWS, geocoder=None, **autofill_kwargs):
+    """Read -> geocode -> autofill -> score one chunk at a time; memory stays per-chunk."""
+    if geocoder is None:
+        from geocoding import default_geocoder
+
+        geocoder = default_geocoder()
+    for chunk in iter_input_chunks(source, chunksize):
+        chunk = geocode_chunk(chunk, geocoder)
+        if len(chunk):
+            yield score_chunk(chunk, **autofill_kwargs)
+
+def _parquet_schema(table, chunk):
+    """Writer schema from the first chunk, widened so every later chunk casts to it."""
+    import pyarrow as pa
+
+    fields = []
+    for field in table.schema:
+        if pa.types.is_dictionary(field.type):
+            # Category codes widen (int8 -> int16) as later chunks add labels.
+            field = field.with_type(pa.dictionary(pa.int32(), pa.string()))
+        elif pa.types.is_null(field.type) or (field.name not in COLUMN_DTYPES
+                                              and chunk[field.name].isna().all()):
+            # No values yet, so the type is unknown; strings hold whatever comes later.
+            field = field.with_type(pa.string())
+        fields.append(field)
+    return pa.schema(fields, metadata=table.schema.metadata)
+
+def write_scored_stops(source, dest, chunksize=CHUNK_ROWS, geocoder=None, **autofill_kwargs):
+    """Stream scored chunks straight to a CSV or Parquet file. Returns rows written."""
+    rows, writer = 0, None
+    try:
+        for chunk in stream_scored_stops(source, chunksize, geocoder, **autofill_kwargs):
+            if _is_parquet(dest):
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(dest, _parquet_schema(table, chunk))
+                writer.write_table(table.cast(writer.schema))
+            else:
+                chunk.to_csv(dest, mode="w" if rows == 0 else "a", header=rows == 0, index=False)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
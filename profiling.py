@@ -0,0 +1,162 @@
+# profiling.py
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ("profiler", "name", "attrs", "start")
+
+    def __init__(self, profiler, name, attrs):
+        self.profiler = profiler
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.profiler._stack().append(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        stack = self.profiler._stack()
+        stack.pop()
+        self.profiler._record(self.name, self.start, end, len(stack), self.attrs)
+        return False
+
+# === PROFILER ===
+class Profiler:
+    """Nested timing spans and counters. When disabled, span() returns a shared no-op."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.spans = []
+            self.counters = defaultdict(float)
+            self._counter_events = []
+            self._origin = time.perf_counter()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, name, start, end, depth, attrs):
+        with self._lock:
+            self.spans.append({
+                "name": name, "start": start - self._origin, "duration": end - start,
+                "depth": depth, "tid": threading.get_ident(), "attrs": attrs,
+            })
+
+    def span(self, name, **attrs):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, attrs)
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] += n
+            self._counter_events.append((time.perf_counter() - self._origin, name, self.counters[name]))
+
+    # === REPORTS ===
+    def summary(self):
+        """Per-stage rows: calls, total/mean/max seconds, sorted by total time."""
+        stats = {}
+        for s in self.spans:
+            row = stats.setdefault(s["name"], {"stage": s["name"], "calls": 0, "total_s": 0.0,
+                                               "max_s": 0.0, "depth": s["depth"]})
+            row["calls"] += 1
+            row["total_s"] += s["duration"]
+            row["max_s"] = max(row["max_s"], s["duration"])
+            row["depth"] = min(row["depth"], s["depth"])
+        rows = sorted(stats.values(), key=lambda r: -r["total_s"])
+        for row in rows:
+            row["mean_s"] = row["total_s"] / row["calls"]
+        return rows
+
+    def to_dict(self):
+        return {"spans": list(self.spans), "counters": dict(self.counters), "summary": self.summary()}
+
+    def to_json(self, path=None):
+        text = json.dumps(self.to_dict(), default=str, indent=2)
+        if path:
+            with open(path, "w") as f:
+                f.write(text)
+        return text
+
+    def to_chrome_trace(self, path=None):
+        """Trace Event Format, viewable in chrome://tracing or Perfetto."""
+        pid = os.getpid()
+        events = [
+            {"name": s["name"], "ph": "X", "pid": pid, "tid": s["tid"],
+             "ts": s["start"] * 1e6, "dur": s["duration"] * 1e6,
+             "args": {k: str(v) for k, v in s["attrs"].items()}}
+            for s in self.spans
+        ]
+        events += [
+            {"name": name, "ph": "C", "pid": pid, "ts": ts * 1e6, "args": {name: value}}
+            for ts, name, value in self._counter_events
+        ]
+        trace = json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+        if path:
+            with open(path, "w") as f:
+                f.write(trace)
+        return trace
+
+# === MODULE-LEVEL INSTANCE ===
+profiler = Profiler(enabled=os.environ.get("FLEETLAB_PROFILE", "") not in ("", "0"))
+
+# Per-context override (e.g. one Profiler per Streamlit session); new threads
+# start with an empty context and report to the module-level instance.
+_active = ContextVar("fleetlab_profiler", default=None)
+
+def use_profiler(p):
+    """Route span()/count()/traced() in the current thread or task to p (None resets)."""
+    _active.set(p)
+
+def current_profiler():
+    return _active.get() or profiler
+
+def span(name, **attrs):
+    return current_profiler().span(name, **attrs)
+
+def count(name, n=1):
+    current_profiler().count(name, n)
+
+def traced(name=None):
+    """Decorator form of span(); the name defaults to module.function."""
+    def decorator(fn):
+        label = name or f"{fn.__module__}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            p = current_profiler()
+            if not p.enabled:
+                return fn(*args, **kwargs)
+            with p.span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,38 @@
+# projection.py
+
+from functools import lru_cache
+
+import numpy as np
+
+WGS84 = 4326
+DEFAULT_UTM = 26917  # Michigan UTM zone (NAD83 / UTM 17N), used when no location is known
+
+# === UTM ZONE SELECTION ===
+def utm_epsg(lon, lat):
+    zone = int((lon + 180) // 6) % 60 + 1
+    return (32600 if lat >= 0 else 32700) + zone
+
+def utm_epsg_for_geometry(geometry):
+    centroid = geometry.centroid
+    return utm_epsg(centroid.x, centroid.y)
+
+# === CACHED TRANSFORMERS ===
+@lru_cache(maxsize=32)
+def get_transformer(src_epsg, dst_epsg):
+    import pyproj
+
+    return pyproj.Transformer.from_crs(f"EPSG:{src_epsg}", f"EPSG:{dst_epsg}", always_xy=True)
+
+def to_utm(lons, lats, epsg):
+    """Project lon/lat arrays to UTM metres in one call."""
+    xs, ys = get_transformer(WGS84, epsg).transform(
+        np.asarray(lons, dtype=np.float64), np.asarray(lats, dtype=np.float64)
+    )
+    return xs, ys
+
+def to_lonlat(xs, ys, epsg):
+    """Project UTM coordinate arrays back to lon/lat in one call."""
+    lons, lats = get_transformer(epsg, WGS84).transform(
+        np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)
+    )
+    return lons, lats
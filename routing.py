@@ -0,0 +1,237 @@
+# routing.py
+
+import numpy as np
+
+from distance_matrix import euclidean_matrix
+
+METERS_PER_MILE = 1609.344
+
+# === VEHICLES AND ROUTES ===
+class VehicleType:
+    def __init__(self, name, capacity, daily_cost, available=None, driver_cost=0):
+        self.name = name
+        self.capacity = capacity
+        self.daily_cost = daily_cost
+        self.available = available  # None = unlimited
+        self.driver_cost = driver_cost  # flat daily driver cost, when not priced per route hour
+
+    @property
+    def total_cost(self):
+        return self.daily_cost + self.driver_cost
+
+    def __repr__(self):
+        return f"VehicleType({self.name!r}, capacity={self.capacity}, daily_cost={self.daily_cost})"
+
+class Route:
+    def __init__(self, stops, load, meters, seconds, vehicle=None, demands=None):
+        self.stops = stops        # stop indices in pickup order; the route ends at the school
+        self.demands = demands if demands is not None else [1] * len(stops)
+        self.load = load
+        self.meters = meters
+        self.seconds = seconds    # ride time of the first student picked up
+        self.vehicle = vehicle
+
+    @property
+    def miles(self):
+        return self.meters / METERS_PER_MILE
+
+    @property
+    def hours(self):
+        return self.seconds / 3600
+
+    def as_dict(self):
+        return {
+            "vehicle": self.vehicle.name if self.vehicle else None,
+            "stops": list(self.stops),
+            "load": self.load,
+            "miles": round(self.miles, 2),
+            "ride_minutes": round(self.seconds / 60, 1),
+        }
+
+# === DISTANCES ===
+def _path_length(dist, path):
+    return float(dist[path[:-1], path[1:]].sum()) if len(path) > 1 else 0.0
+
+# === CONSTRUCTION: CLARKE-WRIGHT SAVINGS ===
+def _savings_routes(dist, demands, capacity, max_seconds, speed_mps, dwell_seconds):
+    # Node 0 is the school; stops are nodes 1..n.
+    n = len(demands)
+    to_school = dist[0, 1:]
+    routes = {i: [i] for i in range(1, n + 1)}
+    route_of = np.arange(n + 1)
+    load = {i: demands[i - 1] for i in range(1, n + 1)}
+    inner = {i: 0.0 for i in range(1, n + 1)}
+
+    iu, ju = np.triu_indices(n, k=1)
+    savings = to_school[iu] + to_school[ju] - dist[iu + 1, ju + 1]
+    keep = savings > 0
+    iu, ju, savings = iu[keep] + 1, ju[keep] + 1, savings[keep]
+    order = np.argsort(-savings, kind="stable")
+
+    def ride_seconds(meters, stops):
+        return meters / speed_mps + dwell_seconds * stops
+
+    for i, j in zip(iu[order].tolist(), ju[order].tolist()):
+        ri, rj = route_of[i], route_of[j]
+        if ri == rj:
+            continue
+        a, b = routes[ri], routes[rj]
+        if load[ri] + load[rj] > capacity:
+            continue
+        if i not in (a[0], a[-1]) or j not in (b[0], b[-1]):
+            continue
+        # Orient so the merged path runs ... i -> j ...
+        if a[-1] != i:
+            a = a[::-1]
+        if b[0] != j:
+            b = b[::-1]
+        merged_inner = inner[ri] + inner[rj] + dist[i, j]
+        # The path may run in either direction; the end nearer the school goes last.
+        tail = min(dist[a[0], 0], dist[b[-1], 0])
+        if ride_seconds(merged_inner + tail, len(a) + len(b)) > max_seconds:
+            continue
+        routes[ri] = a + b
+        load[ri] += load.pop(rj)
+        inner[ri] = merged_inner
+        del routes[rj], inner[rj]
+        route_of[b] = ri
+
+    paths = []
+    for path in routes.values():
+        if dist[path[0], 0] < dist[path[-1], 0]:
+            path = path[::-1]
+        paths.append(path)
+    return paths
+
+# === IMPROVEMENT: 2-OPT AND OR-OPT ON OPEN PATHS ENDING AT THE SCHOOL ===
+def _two_opt(dist, path):
+    path = path + [0]
+    improved = True
+    while improved:
+        improved = False
+        k = len(path) - 1  # path[k] is the school and stays fixed
+        for i in range(0, k - 1):
+            for j in range(i + 1, k):
+                before = dist[path[i - 1], path[i]] if i > 0 else 0.0
+                after = dist[path[i - 1], path[j]] if i > 0 else 0.0
+                delta = (after + dist[path[i], path[j + 1]]
+                         - before - dist[path[j], path[j + 1]])
+                if delta < -1e-9:
+                    path[i:j + 1] = path[i:j + 1][::-1]
+                    improved = True
+    return path[:-1]
+
+def _or_opt(dist, path, max_segment=3):
+    def edge(u, v):
+        return 0.0 if u is None else dist[u, v]
+
+    improved = True
+    while improved:
+        improved = False
+        for seg_len in range(1, min(max_segment, len(path) - 1) + 1):
+            for start in range(0, len(path) - seg_len + 1):
+                segment = path[start:start + seg_len]
+                prev = path[start - 1] if start > 0 else None
+                nxt = path[start + seg_len] if start + seg_len < len(path) else 0
+                removed = edge(prev, segment[0]) + dist[segment[-1], nxt] - edge(prev, nxt)
+                rest = path[:start] + path[start + seg_len:]
+                for pos in range(len(rest) + 1):
+                    if pos == start:
+                        continue
+                    u = rest[pos - 1] if pos > 0 else None
+                    v = rest[pos] if pos < len(rest) else 0
+                    for seg in (segment, segment[::-1]):
+                        added = edge(u, seg[0]) + dist[seg[-1], v] - edge(u, v)
+                        if added - removed < -1e-9:
+                            path = rest[:pos] + seg + rest[pos:]
+                            improved = True
+                            break
+                    if improved:
+                        break
+                if improved:
+                    break
+            if improved:
+                break
+    return path
+
+# === FLEET ASSIGNMENT ===
+def _assign_vehicles(routes, fleet, make_route):
+    remaining = {v.name: v.available for v in fleet}
+    by_cost = sorted(fleet, key=lambda v: (v.total_cost, v.capacity))
+    queue = sorted(routes, key=lambda r: -r.load)
+    assigned = []
+    while queue:
+        route = queue.pop(0)
+        open_types = [v for v in by_cost if remaining[v.name] is None or remaining[v.name] > 0]
+        fitting = [v for v in open_types if v.capacity >= route.load]
+        if fitting:
+            vehicle = fitting[0]
+        elif open_types:
+            # No free vehicle is big enough: split off the part of the route the
+            # largest free vehicle can carry and queue the remainder.
+            vehicle = max(open_types, key=lambda v: v.capacity)
+            head, tail = _split_route(route, vehicle.capacity, make_route)
+            if not head.stops:
+                raise ValueError(f"❌ A stop with {route.load} students fits no available vehicle.")
+            route = head
+            queue.append(tail)
+            queue.sort(key=lambda r: -r.load)
+        else:
+            raise ValueError("❌ Not enough vehicles available to cover every route.")
+        route.vehicle = vehicle
+        if remaining[vehicle.name] is not None:
+            remaining[vehicle.name] -= 1
+        assigned.append(route)
+    return assigned
+
+def _split_route(route, capacity, make_route):
+    # Keep the stops nearest the school (end of the path) together in the carried part.
+    load, cut = 0, len(route.stops)
+    for k in range(len(route.stops) - 1, -1, -1):
+        if load + route.demands[k] > capacity:
+            break
+        load += route.demands[k]
+        cut = k
+    return make_route(route.stops[cut:]), make_route(route.stops[:cut])
+
+# === SOLVER ===
+def solve_routes(stops_xy, school_xy, fleet, demands=None, dist=None,
+                 max_ride_minutes=60, speed_mph=20, dwell_seconds=30, improve=True):
+    """Capacitated routing of stops to one school with a mixed fleet and max ride time.
+
+    `dist` is an optional (n+1, n+1) metre matrix with the school as node 0;
+    straight-line distances with a circuity factor are used otherwise.
+    """
+    stops_xy = np.asarray(stops_xy, dtype=np.float64).reshape(-1, 2)
+    n = len(stops_xy)
+    if n == 0:
+        return []
+    demands = np.ones(n, dtype=np.int64) if demands is None else np.asarray(demands, dtype=np.int64)
+    capacity = max(v.capacity for v in fleet)
+    if demands.max() > capacity:
+        raise ValueError("❌ A stop has more students than the largest vehicle can carry.")
+    if dist is None:
+        dist = euclidean_matrix(np.vstack([np.asarray(school_xy, dtype=np.float64), stops_xy]),
+                                circuity=1.3)
+
+    speed_mps = speed_mph * METERS_PER_MILE / 3600
+    max_seconds = max_ride_minutes * 60
+    paths = _savings_routes(dist, demands.tolist(), capacity, max_seconds, speed_mps, dwell_seconds)
+
+    def make_route(stops):
+        nodes = [s + 1 for s in stops]
+        meters = _path_length(dist, nodes + [0])
+        return Route(
+            stops=list(stops),
+            load=int(demands[stops].sum()) if len(stops) else 0,
+            meters=meters,
+            seconds=meters / speed_mps + dwell_seconds * len(stops),
+            demands=demands[stops].tolist() if len(stops) else [],
+        )
+
+    routes = []
+    for path in paths:
+        if improve and len(path) > 2:
+            path = _or_opt(dist, _two_opt(dist, path))
+        routes.append(make_route([p - 1 for p in path]))
+    return _assign_vehicles(routes, fleet, make_route)
@@ -0,0 +1,293 @@
+# safety_layers.py
+# Per-district safety-factor rasters built offline from a local OSM extract
+# (road class, speed limits, one-way carriageways, sidewalks, crossings, street
+# lamps, construction). Each layer is a float32 grid in the district's UTM zone;
+# stops pick up factor values with one vectorized index lookup, so autofill needs
+# no Directions API calls where the layer has data. NaN cells mean "no data" and
+# fall back to the usual defaults. A cell has data only when a mapped road lies
+# within about RADIUS_M of it, so stops farther than that from any road (or
+# outside the grid) get the defaults, and their U-turn still comes from the
+# Directions API unless U-turn detection is turned off.
+
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from config import OSM_EXTRACT, cache_path
+from profiling import count, span
+from projection import to_utm, utm_epsg_for_geometry
+
+CELL_M = 50          # raster resolution
+RADIUS_M = 100       # neighbourhood a stop "sees" (roads, lamps, crossings)
+SAFETY_TAGS = {"highway": True, "construction": True}
+
+# highway class -> traffic risk (0 calm .. 1 dangerous) and default speed (mph)
+ROAD_RISK = {
+    "motorway": 1.0, "trunk": 0.9, "primary": 0.8, "secondary": 0.65, "tertiary": 0.5,
+    "unclassified": 0.4, "residential": 0.25, "living_street": 0.1, "service": 0.15,
+    "motorway_link": 0.9, "trunk_link": 0.8, "primary_link": 0.7, "secondary_link": 0.55,
+    "tertiary_link": 0.45,
+}
+ROAD_SPEED_MPH = {
+    "motorway": 65, "trunk": 55, "primary": 45, "secondary": 40, "tertiary": 35,
+    "unclassified": 30, "residential": 25, "living_street": 15, "service": 15,
+}
+# Divided roads: a stop on the far side needs a U-turn
+DIVIDED_CLASSES = {"motorway", "trunk", "primary", "secondary"}
+MEMORY_GRIDS = 16    # grids kept in memory per process (least recently used dropped)
+
+_memory = OrderedDict()
+
+# === GRID ===
+class SafetyGrid:
+    """Factor layers (column name -> (ny, nx) float32) on a UTM grid."""
+
+    def __init__(self, layers, x0, y0, cell_m, epsg):
+        self.layers = {k: np.asarray(v, dtype=np.float32) for k, v in layers.items()}
+        self.x0, self.y0, self.cell_m, self.epsg = float(x0), float(y0), float(cell_m), int(epsg)
+        digest = hashlib.sha1(repr((self.x0, self.y0, self.cell_m, self.epsg)).encode())
+        for column in sorted(self.layers):
+            digest.update(column.encode())
+            digest.update(self.layers[column].tobytes())
+        self.key = digest.hexdigest()[:16]
+
+    def __repr__(self):
+        # Stable across runs, so incremental scoring can salt its fingerprints with it.
+        return f"SafetyGrid({self.key})"
+
+    @property
+    def shape(self):
+        return next(iter(self.layers.values())).shape
+
+    def lookup(self, lats, lons):
+        """{column: float64 values} per point; NaN outside the grid or where there is no data."""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        ny, nx = self.shape
+        ok = np.isfinite(lats) & np.isfinite(lons)
+        xs, ys = to_utm(lons[ok], lats[ok], self.epsg)
+        ix = np.floor((xs - self.x0) / self.cell_m).astype(np.int64)
+        iy = np.floor((ys - self.y0) / self.cell_m).astype(np.int64)
+        inside = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny)
+        rows = np.flatnonzero(ok)[inside]
+        flat = iy[inside] * nx + ix[inside]
+        values = {}
+        for column, layer in self.layers.items():
+            out = np.full(len(lats), np.nan)
+            out[rows] = layer.ravel()[flat]
+            values[column] = out
+        return values
+
+    def save(self, path):
+        """Write the npz atomically, so concurrent builders never see a partial file."""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            self._write(f)
+        os.replace(tmp, path)
+
+    def _write(self, f):
+        np.savez(f, x0=self.x0, y0=self.y0, cell_m=self.cell_m, epsg=self.epsg,
+                 columns=np.array(list(self.layers)), **{f"layer{i}": v for i, v in
+                                                         enumerate(self.layers.values())})
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=False)
+        layers = {str(c): data[f"layer{i}"] for i, c in enumerate(data["columns"])}
+        return cls(layers, data["x0"], data["y0"], data["cell_m"], data["epsg"])
+
+# === RASTER HELPERS ===
+def _box_sum(grid, k):
+    """Sum over the (2k+1)^2 neighbourhood of every cell (summed-area table)."""
+    sat = np.pad(np.pad(grid, k).cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+    n = 2 * k + 1
+    return sat[n:, n:] - sat[:-n, n:] - sat[n:, :-n] + sat[:-n, :-n]
+
+def _box_max(grid, k):
+    out = np.full_like(grid, -np.inf)
+    padded = np.pad(grid, k, constant_values=-np.inf)
+    ny, nx = grid.shape
+    for dy in range(2 * k + 1):
+        for dx in range(2 * k + 1):
+            np.maximum(out, padded[dy:dy + ny, dx:dx + nx], out=out)
+    return out
+
+def _parse_mph(maxspeed):
+    """OSM maxspeed strings ("25 mph", "50", "40;50") -> mph floats (NaN if unknown)."""
+    import pandas as pd
+
+    text = pd.Series(maxspeed, dtype="object").astype("string")
+    number = pd.to_numeric(text.str.extract(r"(\d+(?:\.\d+)?)")[0], errors="coerce")
+    mph = np.where(text.str.contains("mph", na=False).to_numpy(), number, number * 0.621371)
+    return np.asarray(mph, dtype=np.float64)
+
+def _column(features, name):
+    if name in features.columns:
+        return features[name].astype("object").where(features[name].notna(), None).to_numpy()
+    return np.full(len(features), None, dtype=object)
+
+# === BUILD ===
+def build_safety_grid(features, polygon, cell_m=CELL_M, radius_m=RADIUS_M):
+    """Rasterize OSM highway features (a lon/lat GeoDataFrame) over the district polygon."""
+    import shapely
+
+    epsg = utm_epsg_for_geometry(polygon)
+    px, py = to_utm(*shapely.get_coordinates(polygon).T, epsg)
+    x0, y0 = px.min(), py.min()
+    nx = int(np.ceil((px.max() - x0) / cell_m)) + 1
+    ny = int(np.ceil((py.max() - y0) / cell_m)) + 1
+    k = max(1, int(round(radius_m / cell_m)))
+
+    features = features[features.geometry.notna()]
+    highway = _column(features, "highway")
+    geoms = features.geometry.values
+    is_point = np.asarray(shapely.get_type_id(geoms)) == 0
+    is_line = np.isin(shapely.get_type_id(geoms), [1, 5])
+    projected = shapely.transform(geoms, lambda c: np.column_stack(to_utm(c[:, 0], c[:, 1], epsg)))
+
+    def rasterize(mask, values=None, reduce="sum", spacing=cell_m / 2):
+        """Per-cell sum (or max) of values over the vertices of the masked features."""
+        grid = np.zeros((ny, nx)) if reduce == "sum" else np.full((ny, nx), -np.inf)
+        if not mask.any():
+            return grid
+        # Densify in metres so every cell a road crosses gets at least one vertex.
+        coords, owner = shapely.get_coordinates(
+            shapely.segmentize(projected[mask], spacing), return_index=True)
+        xs, ys = coords[:, 0], coords[:, 1]
+        ix = np.floor((xs - x0) / cell_m).astype(np.int64)
+        iy = np.floor((ys - y0) / cell_m).astype(np.int64)
+        keep = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny)
+        flat = iy[keep] * nx + ix[keep]
+        vals = np.ones(keep.sum()) if values is None else values[mask][owner[keep]]
+        if reduce == "sum":
+            np.add.at(grid.ravel(), flat, vals)
+        else:
+            np.maximum.at(grid.ravel(), flat, vals)
+        return grid
+
+    road_class = np.array([h if isinstance(h, str) else None for h in highway], dtype=object)
+    risk = np.array([ROAD_RISK.get(h, np.nan) for h in road_class])
+    roads = is_line & np.isfinite(risk)
+    speed = _parse_mph(_column(features, "maxspeed"))
+    default_speed = np.array([ROAD_SPEED_MPH.get(h, 25) for h in road_class], dtype=np.float64)
+    speed = np.where(np.isfinite(speed), speed, default_speed)
+    oneway = np.isin(_column(features, "oneway"), ["yes", "true", "1", "-1"])
+    divided = roads & oneway & np.isin(road_class, list(DIVIDED_CLASSES))
+    sidewalk_tag = _column(features, "sidewalk")
+    has_sidewalk = roads & np.isin(sidewalk_tag, ["both", "left", "right", "yes", "separate"])
+    sidewalk_ways = is_line & (_column(features, "footway") == "sidewalk")
+    construction = (road_class == "construction") | np.array(
+        [c is not None for c in _column(features, "construction")])
+    lamps = is_point & (road_class == "street_lamp")
+    crossings = is_point & (road_class == "crossing")
+
+    road_points = _box_sum(rasterize(roads), k)
+    near_road = road_points > 0
+    class_max = _box_max(rasterize(roads, risk, "max"), k)
+    speed_max = _box_max(rasterize(roads, speed, "max"), k)
+    speed_norm = np.clip((speed_max - 15) / 40, 0, 1)
+
+    layers = {}
+    with np.errstate(invalid="ignore"):
+        layers["Traffic Risk (T)"] = np.clip(0.6 * class_max + 0.4 * speed_norm, 0, 1)
+        layers["Visibility (V)"] = np.clip(0.85 - 0.35 * speed_norm - 0.1 * class_max, 0, 1)
+        layers["Construction Risk (C)"] = np.where(
+            _box_sum(rasterize(construction), k) > 0, 0.8, 0.1)
+        layers["U-Turn Required (U)"] = (_box_sum(rasterize(divided), 1) > 0).astype(np.float64)
+        # Layers whose source tags are absent from the extract stay "no data".
+        if lamps.any():
+            layers["Lighting (L)"] = np.clip(0.3 + 0.2 * _box_sum(rasterize(lamps), k), 0, 0.9)
+        if crossings.any():
+            layers["Pedestrian Safety (P)"] = np.clip(
+                0.35 + 0.2 * _box_sum(rasterize(crossings), k) - 0.2 * speed_norm, 0, 0.9)
+        if has_sidewalk.any() or sidewalk_ways.any():
+            share = (_box_sum(rasterize(has_sidewalk), k) + _box_sum(rasterize(sidewalk_ways), k)) \
+                / np.maximum(road_points, 1)
+            layers["Sidewalk Quality (S)"] = np.clip(0.2 + 0.7 * share, 0, 1)
+    for column in layers:
+        layers[column] = np.where(near_road, layers[column], np.nan)
+    return SafetyGrid(layers, x0, y0, cell_m, epsg)
+
+# === SOURCES ===
+def _features_from_extract(polygon, path):
+    if path.endswith((".osm", ".xml")):
+        import osmnx as ox
+
+        return ox.features_from_xml(path, polygon=polygon, tags=SAFETY_TAGS)
+    if path.endswith(".pbf"):
+        try:
+            from pyrosm import OSM
+        except ImportError:
+            raise ValueError("❌ Reading .osm.pbf extracts requires the optional 'pyrosm' package.")
+        minx, miny, maxx, maxy = polygon.bounds
+        return OSM(path, bounding_box=[minx, miny, maxx, maxy]).get_data_by_custom_criteria(
+            custom_filter={"highway": True}, keep_nodes=True, keep_ways=True, keep_relations=False)
+    import geopandas as gpd
+
+    # GeoJSON / GeoPackage of OSM highway features
+    return gpd.read_file(path, mask=polygon).to_crs(epsg=4326)
+
+# === PUBLIC API ===
+def get_safety_grid(district_poly, dcode=None, extract_path=None, cell_m=CELL_M, refresh=False):
+    """Safety layers for a district, built once from the local extract and cached on disk.
+
+    The cache key covers the extract's path and mtime, so an updated extract rebuilds.
+    """
+    from buildings import polygon_hash
+
+    extract_path = extract_path or OSM_EXTRACT
+    if not extract_path:
+        raise ValueError("❌ Safety layers need a local OSM extract (set FLEETLAB_OSM_EXTRACT).")
+    try:
+        mtime = os.stat(extract_path).st_mtime_ns
+    except OSError:
+        raise ValueError(f"❌ OSM extract not found: {extract_path}")
+    source = hashlib.sha1(f"{os.path.abspath(extract_path)}:{mtime}".encode()).hexdigest()[:8]
+
+    os.makedirs(cache_path("safety"), exist_ok=True)
+    name = f"{dcode or 'any'}-{polygon_hash(district_poly)}-{source}-{int(cell_m)}m.npz"
+    path = cache_path(os.path.join("safety", name))
+    if not refresh:
+        if path in _memory:
+            count("safety.memory_hits")
+            _memory.move_to_end(path)
+            return _memory[path]
+        if os.path.exists(path):
+            count("safety.disk_hits")
+            return _remember(path, SafetyGrid.load(path))
+
+    with span("safety.build", source=extract_path):
+        count("safety.builds")
+        grid = build_safety_grid(_features_from_extract(district_poly, extract_path),
+                                 district_poly, cell_m)
+    grid.save(path)
+    return _remember(path, grid)
+
+def get_safety_grid_for_stops(lats, lons, extract_path=None, cell_m=CELL_M):
+    """Safety layers covering a set of stops (e.g. an uploaded CSV) without a district.
+
+    The extent is snapped outwards to a 0.02 degree lattice, so nearby stop sets
+    share one cached grid.
+    """
+    from shapely.geometry import box
+
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    ok = np.isfinite(lats) & np.isfinite(lons)
+    if not ok.any():
+        raise ValueError("❌ No stop coordinates to build safety layers for.")
+    step = 0.02
+    minx, maxx = np.floor(lons[ok].min() / step) * step, np.ceil(lons[ok].max() / step) * step
+    miny, maxy = np.floor(lats[ok].min() / step) * step, np.ceil(lats[ok].max() / step) * step
+    extent = box(round(minx - step, 6), round(miny - step, 6), round(maxx + step, 6),
+                 round(maxy + step, 6))
+    return get_safety_grid(extent, dcode="stops", extract_path=extract_path, cell_m=cell_m)
+
+def _remember(path, grid):
+    _memory[path] = grid
+    _memory.move_to_end(path)
+    while len(_memory) > MEMORY_GRIDS:
+        _memory.popitem(last=False)
+    return grid
@@ -0,0 +1,315 @@
+# service.py
+# Local proposal service: simulate -> score -> optimize -> map over HTTP.
+#
+#   python service.py --port 8765 --workers 4
+#   curl -N "http://127.0.0.1:8765/proposal?school=Pioneer+High+School&stops=50"
+#
+# /proposal streams newline-delimited JSON, one event per stage as it finishes
+# ("stops", "scores", "fleet", "map", then "done" or "error"). Identical requests
+# that arrive while one is running share its work (single-flight), and finished
+# proposals are replayed from an LRU cache with a TTL. Every stage runs in a
+# process pool so the event loop only parses requests and forwards events.
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from config import cache_path
+
+logger = logging.getLogger("service")
+
+CACHE_SIZE = 128      # finished proposals kept in memory
+CACHE_TTL = 3600      # seconds before a cached proposal is recomputed
+MAP_DIR = "maps"
+
+# === STAGES (run in worker processes) ===
+def stage_stops(school, n_stops, seed):
+    from simulator import simulate_district
+
+    return simulate_district(school, n_stops=n_stops, seed=seed)
+
+def stage_scores(sim, detect_uturns):
+    from utils import autofill_missing_fields, score_stops
+
+    stops = sim["stop_collection"].to_frame(["lat", "lon"]).assign(
+        Address=sim["metadata"]["school_name"])
+    stops = autofill_missing_fields(stops, detect_uturns=detect_uturns)
+    scores, ratings = score_stops(stops)
+    return scores, ratings
+
+def stage_fleet(sim, num_buses, num_vans, max_ride_minutes):
+    from estimator import generate_proposal
+
+    return generate_proposal(sim, num_buses=num_buses, num_vans=num_vans,
+                             max_ride_minutes=max_ride_minutes, include_map=False)
+
+def stage_map(sim, routes, path):
+    from estimator import proposal_map
+
+    lonlat = sim["stops_lonlat"]
+    proposal_map(sim, lonlat[:, 1], lonlat[:, 0], routes).save(path)
+    return path
+
+# === REQUESTS ===
+def parse_request(params):
+    """Normalized proposal parameters from a query dict; raises ValueError."""
+    school = (params.get("school") or "").strip()
+    if not school:
+        raise ValueError("❌ 'school' is required.")
+    try:
+        request = {
+            "school": " ".join(school.split()),
+            "stops": int(params.get("stops", 50)),
+            "buses": int(params.get("buses", 2)),
+            "vans": int(params.get("vans", 5)),
+            "max_ride": int(params.get("max_ride", 60)),
+            "seed": int(params.get("seed", 0)),
+            "uturns": params.get("uturns", "1") not in ("0", "false", "no"),
+        }
+    except (TypeError, ValueError):
+        raise ValueError("❌ stops, buses, vans, max_ride and seed must be integers.")
+    if not 1 <= request["stops"] <= 5000:
+        raise ValueError("❌ stops must be between 1 and 5000.")
+    return request
+
+def request_key(request):
+    canonical = json.dumps({**request, "school": request["school"].lower()}, sort_keys=True)
+    return hashlib.sha1(canonical.encode()).hexdigest()[:16]
+
+def _jsonable(value):
+    if hasattr(value, "tolist"):  # NumPy arrays and scalars
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+# === SINGLE-FLIGHT ===
+class _Flight:
+    """One running proposal; subscribers replay past events and then follow new ones."""
+
+    def __init__(self):
+        self.events = []
+        self.done = False
+        self.changed = asyncio.Condition()
+
+    async def publish(self, event, final=False):
+        async with self.changed:
+            self.events.append(event)
+            self.done = final
+            self.changed.notify_all()
+
+    async def follow(self):
+        seen = 0
+        while True:
+            async with self.changed:
+                await self.changed.wait_for(lambda: len(self.events) > seen)
+                new, done = self.events[seen:], self.done
+            seen += len(new)
+            for event in new:
+                yield event
+            if done and seen == len(self.events):
+                return
+
+class ProposalService:
+    def __init__(self, workers=None, cache_size=CACHE_SIZE, ttl=CACHE_TTL, executor=None):
+        self.workers = workers
+        self._owns_executor = executor is None
+        self.executor = executor or self._new_pool()
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self._cache = OrderedDict()   # key -> (expires_at, events)
+        self._inflight = {}           # key -> _Flight
+        self._tasks = set()           # strong refs so running proposals are not collected
+        self.stats = {"requests": 0, "cache_hits": 0, "coalesced": 0, "computed": 0, "errors": 0}
+        os.makedirs(cache_path(MAP_DIR), exist_ok=True)
+
+    def _new_pool(self):
+        # Spawned, not forked: forked workers would inherit open client sockets.
+        return ProcessPoolExecutor(max_workers=self.workers,
+                                   mp_context=multiprocessing.get_context("spawn"))
+
+    def _map_path(self, key):
+        return cache_path(os.path.join(MAP_DIR, f"{key}.html"))
+
+    def _evict(self, key):
+        # The map file lives exactly as long as its cache entry.
+        del self._cache[key]
+        try:
+            os.remove(self._map_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _cached(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, events = entry
+        if expires_at < time.monotonic():
+            self._evict(key)
+            return None
+        self._cache.move_to_end(key)
+        return events
+
+    def _store(self, key, events):
+        self._cache[key] = (time.monotonic() + self.ttl, events)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._evict(next(iter(self._cache)))
+
+    async def stream(self, request):
+        """Yield stage events for a request, sharing work with identical requests."""
+        self.stats["requests"] += 1
+        key = request_key(request)
+        events = self._cached(key)
+        if events is not None:
+            self.stats["cache_hits"] += 1
+            for event in events:
+                yield event
+            return
+
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = self._inflight[key] = _Flight()
+            task = asyncio.create_task(self._run(key, request, flight))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            self.stats["coalesced"] += 1
+        async for event in flight.follow():
+            yield event
+
+    async def proposal(self, request):
+        """Every event of a request, keyed by stage."""
+        return {event["stage"]: event async for event in self.stream(request)}
+
+    async def _run(self, key, request, flight):
+        loop = asyncio.get_running_loop()
+        run = lambda fn, *args: loop.run_in_executor(self.executor, fn, *args)
+        try:
+            sim = await run(stage_stops, request["school"], request["stops"], request["seed"])
+            meta = sim["metadata"]
+            await flight.publish({
+                "stage": "stops", "school": meta["school_name"], "district": meta["district_name"],
+                "district_code": meta["district_code"],
+                "school_location": [sim["school"].y, sim["school"].x],
+                "stops": sim["stops_lonlat"][:, ::-1],
+            })
+
+            # Scoring and routing only need the stops, so they run side by side.
+            pending = {
+                run(stage_scores, sim, request["uturns"]): "scores",
+                run(stage_fleet, sim, request["buses"], request["vans"], request["max_ride"]): "fleet",
+            }
+            while pending:
+                finished, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in finished:
+                    stage = pending.pop(future)
+                    if stage == "fleet":
+                        proposal = future.result()
+                        await flight.publish({"stage": "fleet", **proposal})
+                    else:
+                        ses, ratings = future.result()
+                        await flight.publish({"stage": "scores", "ses": ses, "ratings": ratings})
+
+            path = self._map_path(key)
+            await run(stage_map, sim, proposal["fleet_mix"]["routes"], path)
+            await flight.publish({"stage": "map", "url": f"/{MAP_DIR}/{key}.html"})
+            await flight.publish({"stage": "done", "key": key}, final=True)
+            self.stats["computed"] += 1
+            self._store(key, flight.events)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error("❌ %s: %s", request["school"], e)
+            if isinstance(e, BrokenProcessPool) and self._owns_executor:
+                self.executor = self._new_pool()  # a crashed worker must not take the service down
+            await flight.publish({"stage": "error", "error": str(e)}, final=True)
+        finally:
+            self._inflight.pop(key, None)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+# === HTTP ===
+async def _respond(writer, status, body, content_type="application/json"):
+    if isinstance(body, str):
+        body = body.encode()
+    writer.write(
+        f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+
+async def handle(service, reader, writer):
+    try:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass  # headers are not needed
+        if len(request_line) < 2 or request_line[0] != "GET":
+            return await _respond(writer, "405 Method Not Allowed", '{"error": "GET only"}')
+
+        url = urlsplit(request_line[1])
+        if url.path == "/health":
+            stats = {**service.stats, "inflight": len(service._inflight), "cached": len(service._cache)}
+            return await _respond(writer, "200 OK", json.dumps(stats))
+
+        if url.path.startswith(f"/{MAP_DIR}/"):
+            name = os.path.basename(unquote(url.path))
+            path = cache_path(os.path.join(MAP_DIR, name))
+            if not name.endswith(".html") or not os.path.exists(path):
+                return await _respond(writer, "404 Not Found", '{"error": "no such map"}')
+            with open(path, "rb") as f:
+                return await _respond(writer, "200 OK", f.read(), "text/html; charset=utf-8")
+
+        if url.path != "/proposal":
+            return await _respond(writer, "404 Not Found", '{"error": "not found"}')
+        try:
+            request = parse_request({k: v[-1] for k, v in parse_qs(url.query).items()})
+        except ValueError as e:
+            return await _respond(writer, "400 Bad Request", json.dumps({"error": str(e)}))
+
+        # No Content-Length: the body is NDJSON that ends when the connection closes.
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+        async for event in service.stream(request):
+            writer.write(json.dumps(event, default=_jsonable).encode() + b"\n")
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass  # client went away; an in-flight proposal keeps running for the cache
+    finally:
+        writer.close()
+
+async def serve(host, port, workers=None, cache_size=CACHE_SIZE, ttl=CACHE_TTL):
+    service = ProposalService(workers=workers, cache_size=cache_size, ttl=ttl)
+    server = await asyncio.start_server(lambda r, w: handle(service, r, w), host, port)
+    logger.info("Serving proposals on http://%s:%d", host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve fleet proposals over a local HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="process pool size")
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE)
+    parser.add_argument("--ttl", type=int, default=CACHE_TTL, help="cache lifetime in seconds")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.cache_size, args.ttl))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
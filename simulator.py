@@ -1,46 +1,55 @@
 # simulator.py
 
+import numpy as np
 import pandas as pd
-from shapely.geometry import Point
-from shapely.ops import transform
 from utils import geocode_address, get_district_geometry, generate_weighted_stops
-import pyproj
+from projection import utm_epsg_for_geometry
+from stops import StopCollection
+from profiling import span
+
+def simulate_district(school_name, n_stops=50, seed=None):
+    from shapely.geometry import Point
 
-def simulate_district(school_name, n_stops=50):
     # 1. Geocode school location
-    lat, lon = geocode_address(school_name)
+    with span("simulate.geocode"):
+        lat, lon = geocode_address(school_name)
     school_point = Point(lon, lat)
 
     # 2. Get school district polygon and projection
-    district_polygon, district_name, _ = get_district_geometry(lat, lon)
+    with span("simulate.district"):
+        district_polygon, district_name, district_code = get_district_geometry(lat, lon)
+        utm_crs = utm_epsg_for_geometry(district_polygon)
 
     # 3. Generate weighted building-based stop locations
-    stops_df = generate_weighted_stops(district_polygon, (lat, lon), n=n_stops)
+    with span("simulate.stops", n=n_stops):
+        stops_df = generate_weighted_stops(district_polygon, (lat, lon), n=n_stops,
+                                           dcode=district_code, seed=seed)
 
-    # 4. Convert stops to shapely Points in UTM
-    transformer = pyproj.Transformer.from_crs("EPSG:4326", "EPSG:26917", always_xy=True).transform
-    stops_utm = [Point(transformer(pt[1], pt[0])) for pt in zip(stops_df["lat"], stops_df["lon"])]
+    # 4. Keep stops in one compact record array; (n, 2) lon/lat and UTM views share it
+    with span("simulate.project"):
+        stops = StopCollection.from_arrays(stops_df["lon"].to_numpy(), stops_df["lat"].to_numpy(),
+                                           epsg=utm_crs)
 
     return {
         "school": school_point,
         "district": district_polygon,
-        "stops": stops_utm,
-        "utm_crs": 26917,
+        "stops": stops.xy,
+        "stops_lonlat": stops.lonlat,
+        "stop_collection": stops,
+        "utm_crs": utm_crs,
         "metadata": {
             "school_name": school_name,
             "district_name": district_name,
+            "district_code": district_code,
             "num_stops": len(stops_df)
         }
     }
 
-def generate_stops_for_school(school_name, n=50):
-    sim = simulate_district(school_name, n_stops=n)
-    project_back = pyproj.Transformer.from_crs(sim["utm_crs"], "EPSG:4326", always_xy=True).transform
-    stops_latlon = [transform(project_back, pt) for pt in sim["stops"]]
+def generate_stops_for_school(school_name, n=50, seed=None):
+    sim = simulate_district(school_name, n_stops=n, seed=seed)
+    n_stops = len(sim["stop_collection"])
 
-    return pd.DataFrame({
-        "lat": [pt.y for pt in stops_latlon],
-        "lon": [pt.x for pt in stops_latlon],
-        "Stop Name": [f"Stop {i+1}" for i in range(len(stops_latlon))],
-        "Address": [sim["metadata"]["school_name"]]*len(stops_latlon)
+    return sim["stop_collection"].to_frame(["lat", "lon"]).assign(**{
+        "Stop Name": "Stop " + pd.Series(np.arange(1, n_stops + 1)).astype(str),
+        "Address": sim["metadata"]["school_name"]
     })
@@ -0,0 +1,107 @@
+# stop_sampling.py
+# Stop placement over building centroids (projected metres).
+#
+# Buildings are bucketed into a square grid of strata sized so the district gets
+# roughly one stop per stratum. Stops are allotted to strata by systematic sampling
+# over cumulative building weight (density-weighted, low variance), candidates
+# inside a stratum are tried in weighted random order, and a hash grid of accepted
+# stops rejects anything closer than min_spacing (Poisson-disk style).
+
+import numpy as np
+
+OCCUPANCY_CELL_M = 100   # resolution used to measure the built-up area
+SPACING_FRACTION = 0.5   # default min spacing as a fraction of the stratum size
+MAX_ATTEMPTS = 30        # candidates tried per requested stop before giving up
+
+def _cell_keys(xs, ys, x0, y0, size):
+    cx = ((xs - x0) // size).astype(np.int64)
+    cy = ((ys - y0) // size).astype(np.int64)
+    return cx * (cy.max(initial=0) + 1) + cy
+
+class _SpacingGrid:
+    """Hash grid of accepted stops; cell size equals the spacing so 3x3 cells suffice."""
+
+    def __init__(self, spacing):
+        self.spacing = spacing
+        self.cells = {}
+
+    def try_add(self, x, y):
+        if self.spacing <= 0:
+            return True
+        cx, cy = int(x // self.spacing), int(y // self.spacing)
+        limit = self.spacing * self.spacing
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for px, py in self.cells.get((cx + dx, cy + dy), ()):
+                    if (px - x) ** 2 + (py - y) ** 2 < limit:
+                        return False
+        self.cells.setdefault((cx, cy), []).append((x, y))
+        return True
+
+def stratum_size(xs, ys, n):
+    """Side of a square stratum so the built-up area holds about n of them."""
+    x0, y0 = xs.min(), ys.min()
+    occupied = len(np.unique(_cell_keys(xs, ys, x0, y0, OCCUPANCY_CELL_M))) * OCCUPANCY_CELL_M ** 2
+    return max(float(OCCUPANCY_CELL_M), float(np.sqrt(occupied / n)))
+
+def sample_stops(xs, ys, n, weights=None, min_spacing=None, seed=None, max_attempts=MAX_ATTEMPTS):
+    """Indices of up to n spatially stratified, density-weighted, spaced-out points.
+
+    weights scales each point's share (e.g. dwelling units); min_spacing defaults to
+    half the stratum size. The same seed always returns the same stops.
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    total_points = len(xs)
+    if total_points == 0 or n <= 0:
+        return np.empty(0, dtype=np.int64)
+    rng = np.random.default_rng(seed)
+    w = np.ones(total_points) if weights is None else np.asarray(weights, dtype=np.float64)
+    if np.any(w < 0) or not np.any(w > 0):
+        raise ValueError("❌ Stop weights must be non-negative with at least one positive value.")
+
+    size = stratum_size(xs, ys, n)
+    spacing = SPACING_FRACTION * size if min_spacing is None else float(min_spacing)
+    keys = _cell_keys(xs, ys, xs.min(), ys.min(), size)
+
+    # Sort by stratum, then by an exponential race so heavier points come first.
+    with np.errstate(divide="ignore"):
+        race = rng.exponential(size=total_points) / w
+    order = np.lexsort((race, keys))
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    ends = np.r_[starts[1:], total_points]
+
+    # Systematic sample over cumulative weight -> stop quota per stratum.
+    cum = np.cumsum(w[order])
+    picks = np.searchsorted(cum, (rng.random() + np.arange(n)) * cum[-1] / n, side="right")
+    picks = np.minimum(picks, total_points - 1)
+    quotas = np.bincount(np.searchsorted(starts, picks, side="right") - 1, minlength=len(starts))
+
+    grid = _SpacingGrid(spacing)
+    accepted = []
+    used = np.zeros(total_points, dtype=bool)
+    for s in rng.permutation(np.flatnonzero(quotas)):
+        need = int(quotas[s])
+        stop = min(ends[s], starts[s] + need * max_attempts)
+        for pos in range(starts[s], stop):
+            i = order[pos]
+            if w[i] > 0 and grid.try_add(xs[i], ys[i]):
+                accepted.append(i)
+                used[i] = True
+                need -= 1
+                if need == 0:
+                    break
+
+    # Strata that ran out of spaced candidates: top up from anywhere in the district.
+    shortfall = n - len(accepted)
+    pool = np.flatnonzero(~used & (w > 0))
+    if shortfall > 0 and len(pool):
+        tries = rng.choice(pool, size=min(len(pool), shortfall * max_attempts * 4), replace=False,
+                           p=w[pool] / w[pool].sum())
+        for i in tries:
+            if grid.try_add(xs[i], ys[i]):
+                accepted.append(i)
+                if len(accepted) == n:
+                    break
+    return np.asarray(accepted, dtype=np.int64)
@@ -0,0 +1,142 @@
+# stops.py
+# Compact columnar stop store. Every stop is one 100-byte record of a NumPy
+# structured array (coordinates, SES factors, score, rating code, cluster/route
+# ids and load), with no per-stop Python objects. Field views are zero-copy and
+# to_frame() wraps them in a DataFrame without copying.
+
+import numpy as np
+from numpy.lib.recfunctions import structured_to_unstructured
+
+from utils import (SAFETY_THRESHOLDS, SES_FACTORS, RATING_LABELS, UTURN_COLUMN,
+                   calculate_ses_batch, classify_ses_codes)
+
+# field -> DataFrame column; lon/lat and x/y are adjacent so (n, 2) views need no copy
+COLUMN_NAMES = {
+    "lon": "lon", "lat": "lat", "x": "x", "y": "y",
+    **{letter.lower(): column for letter, (column, _, _) in SES_FACTORS.items()},
+    "score": "SES Score", "rating": "Safety Rating",
+    "cluster": "Cluster", "route": "Route", "load": "Students",
+}
+FACTOR_FIELDS = [letter.lower() for letter in SES_FACTORS]
+
+STOP_DTYPE = np.dtype(
+    [("lon", "f8"), ("lat", "f8"), ("x", "f8"), ("y", "f8")]
+    + [(letter.lower(), "u1" if column == UTURN_COLUMN else "f8")
+       for letter, (column, _, _) in SES_FACTORS.items()]
+    + [("score", "f8"), ("rating", "i1"), ("cluster", "i4"), ("route", "i4"), ("load", "u2")]
+)
+
+# Value of each field for a stop nobody has filled in
+FIELD_DEFAULTS = {
+    "lon": np.nan, "lat": np.nan, "x": np.nan, "y": np.nan,
+    **{letter.lower(): default for letter, (_, default, _) in SES_FACTORS.items()},
+    "score": np.nan, "rating": -1, "cluster": -1, "route": -1, "load": 1,
+}
+
+class StopCollection:
+    """Typed, array-backed set of stops. Fields are read and written as NumPy views."""
+
+    __slots__ = ("data", "epsg")
+
+    def __init__(self, data, epsg=None):
+        if data.dtype != STOP_DTYPE:
+            raise ValueError("❌ StopCollection needs an array of STOP_DTYPE records.")
+        self.data = data
+        self.epsg = epsg
+
+    @classmethod
+    def empty(cls, n, epsg=None):
+        data = np.empty(n, dtype=STOP_DTYPE)
+        for field, default in FIELD_DEFAULTS.items():
+            data[field] = default
+        return cls(data, epsg)
+
+    @classmethod
+    def from_arrays(cls, lons, lats, epsg=None, xs=None, ys=None, **fields):
+        stops = cls.empty(len(lons), epsg)
+        stops.data["lon"], stops.data["lat"] = lons, lats
+        if xs is not None:
+            stops.data["x"], stops.data["y"] = xs, ys
+        elif epsg is not None:
+            stops.project(epsg)
+        for name, values in fields.items():
+            stops.data[name] = values
+        return stops
+
+    @classmethod
+    def from_frame(cls, df, epsg=None):
+        """Copy the known columns of df (one pass); absent factors keep their SES defaults."""
+        import pandas as pd
+
+        stops = cls.empty(len(df), epsg)
+        for field, column in COLUMN_NAMES.items():
+            if column not in df.columns:
+                continue
+            values = df[column]
+            if field == "rating":
+                labels = pd.Categorical(values, categories=RATING_LABELS)
+                stops.data[field] = labels.codes
+            elif STOP_DTYPE[field].kind == "f":
+                stops.data[field] = values.to_numpy(dtype=np.float64, na_value=np.nan)
+            else:
+                stops.data[field] = values.fillna(FIELD_DEFAULTS[field]).to_numpy()
+        if epsg is not None and "x" not in df.columns:
+            stops.project(epsg)
+        return stops
+
+    # === VIEWS ===
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.data[key]
+        return StopCollection(np.atleast_1d(self.data[key]), self.epsg)
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    @property
+    def lonlat(self):
+        return structured_to_unstructured(self.data[["lon", "lat"]], copy=False)
+
+    @property
+    def xy(self):
+        return structured_to_unstructured(self.data[["x", "y"]], copy=False)
+
+    def columns(self, fields=None):
+        """{DataFrame column name: zero-copy field view}."""
+        return {COLUMN_NAMES[f]: self.data[f] for f in (fields or STOP_DTYPE.names)}
+
+    def to_frame(self, fields=None, ratings_as_labels=True):
+        """DataFrame over the record buffer; only the rating labels are materialized."""
+        import pandas as pd
+
+        columns = self.columns(fields)
+        if ratings_as_labels and "Safety Rating" in columns:
+            columns["Safety Rating"] = pd.Categorical.from_codes(
+                self.data["rating"], categories=list(RATING_LABELS), validate=False
+            )
+        return pd.DataFrame(columns, copy=False)
+
+    def to_geodataframe(self, fields=None):
+        import geopandas as gpd
+
+        return gpd.GeoDataFrame(
+            self.to_frame(fields),
+            geometry=gpd.points_from_xy(self.data["lon"], self.data["lat"]), crs="EPSG:4326",
+        )
+
+    # === IN-PLACE UPDATES ===
+    def project(self, epsg):
+        from projection import to_utm
+
+        self.data["x"], self.data["y"] = to_utm(self.data["lon"], self.data["lat"], epsg)
+        self.epsg = epsg
+
+    def score(self, weights=None, thresholds=SAFETY_THRESHOLDS):
+        scores = calculate_ses_batch(self.columns(FACTOR_FIELDS), weights)
+        self.data["score"] = scores
+        self.data["rating"] = classify_ses_codes(scores, thresholds)
+        return scores
@@ -0,0 +1,77 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from directions import DirectionsCache, lookup_uturns
+from utils import UTURN_COLUMN, autofill_missing_fields
+
+
+class FakeDirections:
+    """Stand-in for googlemaps.Client: U-turn for addresses containing 'Loop'."""
+
+    def __init__(self, fail=()):
+        self.calls = []
+        self.fail = set(fail)
+        self._lock = threading.Lock()
+
+    def directions(self, origin, destination, mode="driving"):
+        with self._lock:
+            self.calls.append((time.monotonic(), destination))
+        if destination in self.fail:
+            raise RuntimeError("OVER_QUERY_LIMIT")
+        maneuver = "uturn-left" if "Loop" in destination else "turn-right"
+        return [{"legs": [{"steps": [{"maneuver": maneuver}]}]}]
+
+
+def _cache(tmp_path):
+    return DirectionsCache(str(tmp_path / "directions.sqlite"))
+
+
+def test_autofill_queries_each_address_once_and_caches(tmp_path):
+    client, cache = FakeDirections(), _cache(tmp_path)
+    df = pd.DataFrame({"Address": ["1 Loop Rd", "2 Main St", "1 Loop Rd"],
+                       "lat": [42.2, 42.3, 42.2], "lon": [-83.7, -83.6, -83.7]})
+
+    out = autofill_missing_fields(df.copy(), client=client, origin="School", cache=cache,
+                                  rate_per_sec=1000)
+    assert out[UTURN_COLUMN].tolist() == [1, 0, 1]
+    assert sorted(d for _, d in client.calls) == ["1 Loop Rd", "2 Main St"]
+
+    # Second run is served entirely from the SQLite cache.
+    client.calls.clear()
+    again = autofill_missing_fields(df.copy(), client=client, origin="School", cache=cache)
+    assert again[UTURN_COLUMN].tolist() == [1, 0, 1]
+    assert client.calls == []
+
+
+def test_autofill_skips_stops_without_address(tmp_path):
+    client, cache = FakeDirections(), _cache(tmp_path)
+    df = pd.DataFrame({"Address": [None, "  ", "9 Loop Ct"], "lat": [1.0, 2.0, 3.0],
+                       "lon": [1.0, 2.0, 3.0]})
+
+    out = autofill_missing_fields(df, client=client, origin="School", cache=cache,
+                                  rate_per_sec=1000)
+    assert out[UTURN_COLUMN].tolist() == [0, 0, 1]
+    assert [d for _, d in client.calls] == ["9 Loop Ct"]
+    assert cache.get_many("School", ["Unknown Address", "  "]) == {}
+
+
+def test_failed_lookups_are_not_cached(tmp_path):
+    client, cache = FakeDirections(fail={"3 Loop Ave"}), _cache(tmp_path)
+    results = lookup_uturns(client, "School", ["3 Loop Ave", "4 Oak St"], cache=cache,
+                            rate_per_sec=1000)
+    assert results == {"3 Loop Ave": 0, "4 Oak St": 0}
+    assert cache.get_many("School", ["3 Loop Ave", "4 Oak St"]) == {"4 Oak St": 0}
+
+
+def test_lookup_respects_rate_limit():
+    client = FakeDirections()
+    destinations = [f"{i} Main St" for i in range(12)]
+    lookup_uturns(client, "School", destinations, cache=None, max_workers=8, rate_per_sec=4)
+
+    times = np.sort([t for t, _ in client.calls])
+    assert len(times) == 12
+    # 4 tokens up front, then 4 per second: the 12th call waits about 2 s.
+    assert times[-1] - times[0] >= 1.8
@@ -0,0 +1,28 @@
+import os
+
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import box
+
+import buildings
+
+
+def test_centroids_are_cached_atomically_and_memory_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(buildings, "cache_path", lambda name: str(tmp_path / name))
+    monkeypatch.setattr(buildings, "MEMORY_DISTRICTS", 2)
+    monkeypatch.setattr(buildings, "_memory", buildings.OrderedDict())
+    footprints = [box(-83.75 + i * 1e-3, 42.25, -83.7495 + i * 1e-3, 42.2505) for i in range(5)]
+    extract = str(tmp_path / "buildings.geojson")
+    gpd.GeoDataFrame({"building": ["yes"] * 5}, geometry=footprints, crs="EPSG:4326").to_file(extract)
+
+    districts = [box(-83.751, 42.249, -83.7468 + k * 1e-3, 42.251) for k in range(3)]
+    for k, district in enumerate(districts):
+        lons, lats = buildings.get_building_centroids(district, dcode=str(k), extract_path=extract)
+        assert len(lons) == (4, 5, 5)[k]
+
+    assert len(buildings._memory) == 2
+    files = sorted(os.listdir(tmp_path / "buildings"))
+    assert len(files) == 3 and all(f.endswith(".npz") for f in files)
+    # The evicted district comes back from disk unchanged.
+    lons, _ = buildings.get_building_centroids(districts[0], dcode="0", extract_path=extract)
+    np.testing.assert_allclose(np.sort(lons), -83.75 + np.arange(4) * 1e-3 + 2.5e-4)
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from consolidation import consolidate_stops
+from projection import to_utm, utm_epsg
+
+
+def _frame(offsets_m, lat0=42.25, lon0=-83.75, students=None):
+    # Small east-west offsets in metres around one point.
+    lons = lon0 + np.asarray(offsets_m, dtype=np.float64) / (111_320 * np.cos(np.radians(lat0)))
+    df = pd.DataFrame({"lat": np.full(len(lons), lat0), "lon": lons})
+    if students is not None:
+        df["Students"] = students
+    return df
+
+
+def test_mean_walk_is_per_student():
+    # One cluster: most students live at the stop, one lives 300 m away.
+    df = _frame([0, 0, 0, 300], students=[5, 5, 5, 1])
+    stops, assignment, report = consolidate_stops(df, walk_radius_m=400, load_column="Students")
+    assert len(stops) == 1 and (assignment == 0).all()
+
+    epsg = utm_epsg(-83.75, 42.25)
+    xs, ys = to_utm(df["lon"].to_numpy(), df["lat"].to_numpy(), epsg)
+    sx, sy = to_utm(stops["lon"].to_numpy(), stops["lat"].to_numpy(), epsg)
+    walks = np.hypot(xs - sx[0], ys - sy[0])
+    expected = (walks * df["Students"]).sum() / df["Students"].sum()
+    assert abs(report["mean_walk_m"] - expected) < 1e-6
+    assert abs(report["max_walk_m"] - walks.max()) < 1e-6
+    assert report["mean_walk_m"] < report["max_walk_m"]
+
+
+def test_empty_input_reports_zero_walk():
+    _, assignment, report = consolidate_stops(_frame([]))
+    assert len(assignment) == 0
+    assert report["mean_walk_m"] == 0.0 and report["max_walk_m"] == 0.0
@@ -0,0 +1,71 @@
+import networkx as nx
+import numpy as np
+
+import distance_matrix as dm
+
+
+def _grid_graph(n=6, step=0.002, lon0=-83.75, lat0=42.25):
+    g = nx.MultiDiGraph()
+    for i in range(n):
+        for j in range(n):
+            g.add_node(i * n + j, x=lon0 + i * step, y=lat0 + j * step)
+    for i in range(n):
+        for j in range(n):
+            for di, dj in ((1, 0), (0, 1)):
+                if i + di < n and j + dj < n:
+                    u, v = i * n + j, (i + di) * n + j + dj
+                    length = 150.0 + 10 * (i + j)
+                    g.add_edge(u, v, length=length)
+                    g.add_edge(v, u, length=length)
+    return g
+
+
+def _points(g, n, seed=0):
+    rng = np.random.default_rng(seed)
+    lon = np.array([d["x"] for _, d in g.nodes(data=True)])
+    lat = np.array([d["y"] for _, d in g.nodes(data=True)])
+    return (rng.uniform(lon.min(), lon.max(), n), rng.uniform(lat.min(), lat.max(), n))
+
+
+def test_road_refinement_matches_networkx():
+    g = _grid_graph()
+    lons, lats = _points(g, 15)
+    matrix = dm.haversine_matrix(lons, lats)
+    dm.refine_with_road_network(matrix, g, lons, lats, cutoff=None)
+
+    nodes, snap = dm._nearest_nodes(g, lons, lats)
+    for i in range(len(lons)):
+        lengths = nx.single_source_dijkstra_path_length(g, nodes[i], weight="length")
+        expected = np.array([lengths[t] for t in nodes]) + snap + snap[i]
+        expected[i] = 0
+        np.testing.assert_allclose(matrix[i], expected, rtol=1e-5)
+
+
+def test_cutoff_keeps_straight_line_for_far_pairs():
+    g = _grid_graph()
+    lons, lats = _points(g, 10, seed=1)
+    straight = dm.haversine_matrix(lons, lats)
+    refined = dm.refine_with_road_network(straight.copy(), g, lons, lats, cutoff=300)
+    full = dm.refine_with_road_network(straight.copy(), g, lons, lats, cutoff=None)
+    snapped = np.add.outer(*(2 * [dm._nearest_nodes(g, lons, lats)[1]]))
+    near = (full - snapped) <= 300
+    np.testing.assert_allclose(refined[near], full[near], rtol=1e-5)
+    np.testing.assert_array_equal(refined[~near], straight[~near])
+
+
+def test_nearest_nodes_fallback_bounds_block_size(monkeypatch):
+    g = _grid_graph()
+    lons, lats = _points(g, 50, seed=2)
+    expected_nodes, expected_snap = dm._nearest_nodes(g, lons, lats)
+    monkeypatch.setattr(dm, "BLOCK_ELEMENTS", 100)  # a few stops per block
+    nodes, snap = dm._nearest_nodes(g, lons, lats)
+    np.testing.assert_array_equal(nodes, expected_nodes)
+    np.testing.assert_allclose(snap, expected_snap)
+
+
+def test_haversine_blocks_follow_column_count(monkeypatch):
+    lons, lats = _points(_grid_graph(), 40, seed=3)
+    full = dm.haversine_matrix(lons, lats)
+    monkeypatch.setattr(dm, "BLOCK_ELEMENTS", 90)
+    assert dm.block_rows(40) == 2
+    np.testing.assert_array_equal(dm.haversine_matrix(lons, lats), full)
@@ -0,0 +1,43 @@
+import numpy as np
+
+from cost_model import CostModel
+from district_fleet import Trip, chain_trips
+from routing import METERS_PER_MILE, Route, VehicleType
+
+BUS = VehicleType("bus", 20, 200)
+
+
+def _trip(start, minutes, start_xy=(0.0, 0.0), end_xy=(0.0, 0.0), load=10):
+    route = Route([0], load, 5 * METERS_PER_MILE, minutes * 60, BUS)
+    return Trip(0, route, start, start + minutes, np.asarray(start_xy), np.asarray(end_xy))
+
+
+def test_block_hours_split_driving_and_idle():
+    blocks = chain_trips([_trip(420, 30), _trip(500, 30)], cost_model=CostModel(idle_hourly_rate=0))
+    assert len(blocks) == 1
+    block = blocks[0]
+    assert block.duty_hours == 110 / 60
+    assert block.hours == 1.0
+    assert abs(block.idle_hours - 50 / 60) < 1e-9
+
+    costs = CostModel(idle_hourly_rate=12).estimate_routes(blocks)
+    assert abs(costs["driver_cost"] - 2 * 25 * 1.0) < 1e-9
+    assert abs(costs["idle_cost"] - 2 * 12 * 50 / 60) < 1e-9
+
+
+def test_chains_only_when_cheaper_than_another_vehicle():
+    trips = [_trip(420, 30), _trip(600, 30)]  # 2.5 h idle between tiers
+    assert len(chain_trips(trips, cost_model=CostModel(idle_hourly_rate=10))) == 1
+    # 2 trips/day * 2.5 h * $50 = $250 of standby exceeds a $200 bus.
+    assert len(chain_trips(trips, cost_model=CostModel(idle_hourly_rate=50))) == 2
+
+
+def test_chaining_never_costs_more_than_separate_vehicles():
+    rng = np.random.default_rng(0)
+    trips = [_trip(s, 30, rng.uniform(0, 8000, 2), rng.uniform(0, 8000, 2))
+             for s in rng.choice([420, 465, 510, 555], 40)]
+    for rate in (0, 10, 25, 60):
+        model = CostModel(idle_hourly_rate=rate)
+        chained = model.estimate_routes(chain_trips(trips, cost_model=model))
+        separate = model.estimate_routes([t.route for t in trips])
+        assert chained["total_cost"] <= separate["total_cost"] + 1e-9
@@ -0,0 +1,61 @@
+import itertools
+
+import numpy as np
+
+from fleet_mix import pareto_frontier, solve_fleet_mix
+from routing import VehicleType
+
+
+def _brute_force(n, types):
+    """{vehicle count: cheapest covering cost} over every count combination."""
+    ranges = [range((v.available if v.available is not None else -(-n // v.capacity)) + 1)
+              for v in types]
+    best = {}
+    for counts in itertools.product(*ranges):
+        if sum(c * v.capacity for c, v in zip(counts, types)) < n:
+            continue
+        cost = sum(c * v.total_cost for c, v in zip(counts, types))
+        best[sum(counts)] = min(best.get(sum(counts), np.inf), cost)
+    return best
+
+
+def _fleets(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(40):
+        k = rng.integers(1, 4)
+        yield int(rng.integers(0, 90)), [
+            VehicleType(f"v{t}", int(rng.integers(3, 30)), int(rng.integers(50, 300)),
+                        available=None if rng.random() < 0.3 else int(rng.integers(0, 8)),
+                        driver_cost=int(rng.integers(0, 80)))
+            for t in range(k)
+        ]
+
+
+def test_solve_fleet_mix_matches_brute_force():
+    for n, types in _fleets(0):
+        best = _brute_force(n, types)
+        mix = solve_fleet_mix(n, types)
+        if not best:
+            assert mix is None
+            continue
+        assert mix["total_cost"] == min(best.values())
+        assert mix["seats"] >= n and mix["spare_seats"] == mix["seats"] - n
+        for v in types:
+            assert v.available is None or mix["counts"][v.name] <= v.available
+
+
+def test_pareto_frontier_matches_brute_force():
+    for n, types in _fleets(1):
+        best = _brute_force(n, types)
+        frontier = pareto_frontier(n, types)
+        if not best:
+            assert frontier == []
+            continue
+        expected, lowest = [], np.inf
+        for v in sorted(best):
+            if best[v] < lowest and v <= solve_fleet_mix(n, types)["vehicles"]:
+                lowest = best[v]
+                expected.append((v, best[v]))
+        assert [(m["vehicles"], m["total_cost"]) for m in frontier] == expected
+        for mix in frontier:
+            assert mix["seats"] >= n
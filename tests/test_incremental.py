@@ -0,0 +1,45 @@
+import pandas as pd
+
+from directions import DirectionsCache
+from incremental import ScoreCache, score_incremental
+from utils import UTURN_COLUMN
+
+
+class FlakyDirections:
+    """Fails every call until `healthy` is set; then reports a U-turn everywhere."""
+
+    def __init__(self):
+        self.healthy = False
+        self.calls = 0
+
+    def directions(self, origin, destination, mode="driving"):
+        self.calls += 1
+        if not self.healthy:
+            raise RuntimeError("OVER_QUERY_LIMIT")
+        return [{"legs": [{"steps": [{"maneuver": "uturn-left"}]}]}]
+
+
+def test_failed_uturn_lookups_are_not_persisted(tmp_path, monkeypatch):
+    client = FlakyDirections()
+    directions = DirectionsCache(str(tmp_path / "directions.sqlite"))
+    monkeypatch.setattr("utils.default_directions_cache", lambda: directions)
+    scores = ScoreCache(str(tmp_path / "scores.sqlite"))
+    df = pd.DataFrame({"Address": ["1 Elm St", "2 Oak St"], "lat": [42.2, 42.3],
+                       "lon": [-83.7, -83.6]})
+    kwargs = dict(client=client, origin="School", rate_per_sec=1000)
+
+    first = score_incremental(df, scores, **kwargs)
+    assert first[UTURN_COLUMN].tolist() == [0, 0]
+    assert client.calls == 2
+    assert len(scores) == 0
+
+    # Same rows once the API recovers: they are looked up again, not replayed as U=0.
+    client.healthy = True
+    second = score_incremental(df, scores, **kwargs)
+    assert second[UTURN_COLUMN].tolist() == [1, 1]
+    assert client.calls == 4
+    assert len(scores) == 2
+
+    third = score_incremental(df, scores, **kwargs)
+    assert third[UTURN_COLUMN].tolist() == [1, 1]
+    assert client.calls == 4
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+import map_render as mr
+
+
+def _stops(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return 42.25 + rng.normal(0, 0.02, n), -83.75 + rng.normal(0, 0.02, n)
+
+
+def test_point_layers_carry_rating_colors_and_labels():
+    lats, lons = [42.25, 42.26, 42.27], [-83.75, -83.74, -83.73]
+    ratings = ["Safe", "Unsafe", None]
+    layer = mr.cluster_layer(lats, lons, ratings, labels=["A", "B", "C"])
+    assert [row[2:] for row in layer.data] == [
+        ["green", "A: Safe"], ["red", "B: Unsafe"], [mr.DEFAULT_COLOR, "C: None"]]
+
+    features = mr.geojson_layer(lats, lons).data["features"]
+    assert [f["properties"] for f in features] == [{"color": mr.DEFAULT_COLOR, "label": "Stop"}] * 3
+    assert features[1]["geometry"]["coordinates"] == [-83.74, 42.26]
+
+
+def test_hex_bins_cover_every_stop_once():
+    lats, lons = _stops(2000)
+    scores = np.linspace(0, 1, 2000)
+    features = mr.hexbin_layer(lats, lons, scores, size_m=400).data["features"]
+    counts = [int(f["properties"]["label"].split()[0]) for f in features]
+    assert sum(counts) == 2000
+
+    # Every stop lies within one hex radius of its bin's centre.
+    q, r, lat0, lon0 = mr._hex_bins(lats, lons, 400)
+    cx = 400 * (np.sqrt(3) * q + np.sqrt(3) / 2 * r)
+    cy = 400 * 1.5 * r
+    x = (lons - lon0) * np.cos(np.radians(lat0)) * 111_320.0
+    y = (lats - lat0) * 110_540.0
+    assert (np.hypot(x - cx, y - cy) <= 400 + 1e-6).all()
+
+
+def test_auto_mode_switches_to_hex_bins_above_threshold():
+    m = mr.stops_map(*_stops(50))
+    assert mr.add_stops(m, *_stops(50), threshold=100) == "points"
+    assert mr.add_stops(m, *_stops(150), threshold=100) == "hexbin"
+    with pytest.raises(ValueError, match="Unknown map mode"):
+        mr.add_stops(m, *_stops(5), mode="pins")
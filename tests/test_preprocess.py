@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from preprocess import load_input_data, read_stops, write_scored_stops
+
+
+def _stops_csv(path, n=20):
+    df = pd.DataFrame({
+        "Stop Name": [f"Stop {i}" for i in range(n)],
+        # Empty for the whole first chunk, strings later
+        "Address": [None] * (n // 2) + [f"{i} Main St" for i in range(n // 2, n)],
+        "lat": np.linspace(42.2, 42.3, n),
+        "lon": np.linspace(-83.8, -83.7, n),
+        # Few labels in the first chunk, many (wider category codes) later
+        "School": ["North"] * (n // 2) + [f"School {i}" for i in range(n // 2, n)],
+        "Notes": [None] * (n // 2) + ["gate code"] * (n - n // 2),
+    })
+    df.to_csv(path, index=False)
+    return df
+
+
+def test_write_scored_stops_parquet_streams_several_chunks(tmp_path):
+    pytest.importorskip("pyarrow")
+    source = tmp_path / "stops.csv"
+    expected = _stops_csv(source, n=600)
+    dest = tmp_path / "scored.parquet"
+
+    rows = write_scored_stops(str(source), str(dest), chunksize=10, geocoder=object(),
+                              detect_uturns=False)
+
+    assert rows == len(expected)
+    out = pd.read_parquet(dest)
+    assert len(out) == len(expected)
+    assert out["Address"].tolist()[-1] == "599 Main St"
+    assert out["Address"].isna().sum() == 300
+    assert set(out["School"].astype(str)) == set(expected["School"])
+    assert out["Notes"].tolist()[-1] == "gate code"
+    assert set(out["Safety Rating"].astype(str)) <= {"Safe", "Acceptable", "Unsafe"}
+
+
+def test_write_scored_stops_csv_matches_parquet_rows(tmp_path):
+    source = tmp_path / "stops.csv"
+    expected = _stops_csv(source)
+    dest = tmp_path / "scored.csv"
+    assert write_scored_stops(str(source), str(dest), chunksize=7, geocoder=object(),
+                              detect_uturns=False) == len(expected)
+    assert len(pd.read_csv(dest)) == len(expected)
+
+
+def test_load_input_data_prefers_home_address(tmp_path):
+    path = tmp_path / "stops.csv"
+    pd.DataFrame({
+        "Home Address": ["1 Elm St", None, "3 Oak St"],
+        "lat": [42.2, 42.21, None],
+        "lon": [-83.7, -83.71, None],
+    }).to_csv(path, index=False)
+    df = load_input_data(str(path))
+    # Rows are kept or dropped on Home Address, not on the coordinates
+    assert df["Home Address"].tolist() == ["1 Elm St", "3 Oak St"]
+
+
+def test_load_input_data_rejects_address_only_from_header(tmp_path, monkeypatch):
+    path = tmp_path / "stops.csv"
+    pd.DataFrame({"Address": ["1 Elm St"]}).to_csv(path, index=False)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("body was read")
+
+    monkeypatch.setattr("preprocess.read_stops", fail)
+    with pytest.raises(ValueError, match="Home Address"):
+        load_input_data(str(path))
+
+
+def test_read_stops_accepts_address_only(tmp_path):
+    path = tmp_path / "stops.csv"
+    pd.DataFrame({"Address": ["1 Elm St", None]}).to_csv(path, index=False)
+    assert read_stops(str(path))["Address"].tolist() == ["1 Elm St"]
+
+
+def test_read_stops_stops_past_max_rows(tmp_path):
+    path = tmp_path / "stops.csv"
+    pd.DataFrame({"lat": np.full(25, 42.25), "lon": np.full(25, -83.75)}).to_csv(path, index=False)
+    assert len(read_stops(str(path), chunksize=10, max_rows=25)) == 25
+    with pytest.raises(ValueError, match="write_scored_stops"):
+        read_stops(str(path), chunksize=10, max_rows=24)
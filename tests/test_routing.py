@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from routing import METERS_PER_MILE, VehicleType, solve_routes
+
+FLEET = [VehicleType("bus", 20, 200), VehicleType("van", 7, 120)]
+
+
+def _problem(n, seed=0, span=12_000):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(0, span, (n, 2)), (span / 2, span / 2), rng.integers(1, 6, n)
+
+
+def _check(routes, demands, fleet):
+    served = np.concatenate([r.stops for r in routes]) if routes else np.empty(0, dtype=int)
+    assert sorted(served.tolist()) == list(range(len(demands)))
+    caps = {v.name: v for v in fleet}
+    for r in routes:
+        assert r.load == demands[r.stops].sum() == sum(r.demands)
+        assert r.load <= caps[r.vehicle.name].capacity
+    for v in fleet:
+        if v.available is not None:
+            assert sum(r.vehicle.name == v.name for r in routes) <= v.available
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_every_stop_served_within_capacity_and_ride_time(seed):
+    stops, school, demands = _problem(120, seed)
+    routes = solve_routes(stops, school, FLEET, demands=demands, max_ride_minutes=45)
+    _check(routes, demands, FLEET)
+    for r in routes:
+        assert r.seconds <= 45 * 60 + 1e-6
+        # Route length is the path through its stops and on to the school (float32 matrix).
+        path = np.vstack([stops[r.stops], school])
+        assert r.meters == pytest.approx(1.3 * np.hypot(*np.diff(path, axis=0).T).sum(), rel=1e-5)
+
+
+def test_speed_scales_ride_time():
+    stops, school, demands = _problem(40, 1)
+    for r in solve_routes(stops, school, FLEET, demands=demands, speed_mph=30, dwell_seconds=0):
+        assert abs(r.seconds - r.meters / (30 * METERS_PER_MILE / 3600)) < 1e-6
+
+
+def test_routes_split_to_fit_limited_vehicles():
+    # Only vans may be left for the big routes, so they must be split, not overloaded.
+    fleet = [VehicleType("bus", 20, 200, available=1), VehicleType("van", 7, 120)]
+    stops, school, demands = _problem(80, 2)
+    routes = solve_routes(stops, school, fleet, demands=demands)
+    _check(routes, demands, fleet)
+    assert any(r.vehicle.name == "van" and r.load > 0 for r in routes)
+
+
+def test_errors_when_fleet_cannot_cover_demand():
+    stops, school, demands = _problem(60, 3)
+    with pytest.raises(ValueError, match="Not enough vehicles"):
+        solve_routes(stops, school, [VehicleType("bus", 20, 200, available=2)], demands=demands)
+    with pytest.raises(ValueError, match="more students than the largest vehicle"):
+        solve_routes(stops[:1], school, FLEET, demands=[25])
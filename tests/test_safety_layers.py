@@ -0,0 +1,68 @@
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import LineString, Point, box
+
+import safety_layers as sl
+
+LON0, LAT0 = -83.75, 42.25
+DISTRICT = box(LON0, LAT0, LON0 + 0.02, LAT0 + 0.02)
+
+
+def _features():
+    mid = LAT0 + 0.01
+    return gpd.GeoDataFrame({
+        "highway": ["primary", "residential", "street_lamp"],
+        "maxspeed": ["45 mph", None, None],
+        "oneway": ["yes", None, None],
+        "sidewalk": [None, "both", None],
+    }, geometry=[
+        LineString([(LON0, mid), (LON0 + 0.02, mid)]),
+        LineString([(LON0 + 0.005, LAT0), (LON0 + 0.005, LAT0 + 0.02)]),
+        Point(LON0 + 0.005, LAT0 + 0.003),
+    ], crs="EPSG:4326")
+
+
+def _at(grid, lat, lon):
+    return {k: float(v[0]) for k, v in grid.lookup([lat], [lon]).items()}
+
+
+def test_factors_follow_nearby_roads():
+    grid = sl.build_safety_grid(_features(), DISTRICT)
+    arterial = _at(grid, LAT0 + 0.0101, LON0 + 0.015)
+    residential = _at(grid, LAT0 + 0.003, LON0 + 0.0051)
+
+    assert arterial["U-Turn Required (U)"] == 1.0
+    assert residential["U-Turn Required (U)"] == 0.0
+    assert arterial["Traffic Risk (T)"] > residential["Traffic Risk (T)"]
+    assert arterial["Visibility (V)"] < residential["Visibility (V)"]
+    assert residential["Lighting (L)"] > 0.3
+    assert residential["Sidewalk Quality (S)"] > 0.5
+    # No crossings were mapped, so that layer is left to the defaults.
+    assert "Pedestrian Safety (P)" not in grid.layers
+
+
+def test_far_from_roads_and_outside_grid_are_nan():
+    grid = sl.build_safety_grid(_features(), DISTRICT)
+    # ~500 m from either road, and well outside the district.
+    values = grid.lookup([LAT0 + 0.016, LAT0 + 0.5, np.nan], [LON0 + 0.015, LON0, LON0])
+    for column in values.values():
+        assert np.isnan(column).all()
+
+
+def test_long_segments_are_densified_in_metres():
+    # A single two-vertex road 1.6 km long must still mark every cell along it.
+    grid = sl.build_safety_grid(_features().iloc[:1], DISTRICT)
+    lons = np.linspace(LON0 + 0.001, LON0 + 0.019, 40)
+    traffic = grid.lookup(np.full(40, LAT0 + 0.01), lons)["Traffic Risk (T)"]
+    assert np.isfinite(traffic).all()
+
+
+def test_save_load_round_trip(tmp_path):
+    grid = sl.build_safety_grid(_features(), DISTRICT)
+    path = str(tmp_path / "grid.npz")
+    grid.save(path)
+    loaded = sl.SafetyGrid.load(path)
+    assert repr(loaded) == repr(grid)
+    lats, lons = [LAT0 + 0.0101, LAT0 + 0.003], [LON0 + 0.015, LON0 + 0.0051]
+    for column, values in grid.lookup(lats, lons).items():
+        np.testing.assert_array_equal(loaded.lookup(lats, lons)[column], values)
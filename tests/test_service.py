@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import service
+
+
+@pytest.fixture
+def stages(tmp_path, monkeypatch):
+    """Stub stages (run in threads) that count calls; stage_stops waits on `gate`."""
+    calls = {"stops": 0, "scores": 0, "fleet": 0, "map": 0}
+    gate = threading.Event()
+    gate.set()
+
+    def stage_stops(school, n_stops, seed):
+        calls["stops"] += 1
+        gate.wait(5)
+        if school == "Broken":
+            raise ValueError("❌ no such school")
+        return {
+            "metadata": {"school_name": school, "district_name": "D", "district_code": "1"},
+            "school": SimpleNamespace(x=-83.75, y=42.25),
+            "stops_lonlat": np.full((n_stops, 2), (-83.75, 42.25)),
+        }
+
+    def stage_scores(sim, detect_uturns):
+        calls["scores"] += 1
+        return np.ones(len(sim["stops_lonlat"])), ["Safe"] * len(sim["stops_lonlat"])
+
+    def stage_fleet(sim, num_buses, num_vans, max_ride_minutes):
+        calls["fleet"] += 1
+        return {"fleet_mix": {"routes": []}}
+
+    def stage_map(sim, routes, path):
+        calls["map"] += 1
+        with open(path, "w") as f:
+            f.write("<html></html>")
+        return path
+
+    monkeypatch.setattr(service, "cache_path", lambda name: str(tmp_path / name))
+    for name, fn in (("stage_stops", stage_stops), ("stage_scores", stage_scores),
+                     ("stage_fleet", stage_fleet), ("stage_map", stage_map)):
+        monkeypatch.setattr(service, name, fn)
+    return calls, gate, tmp_path
+
+
+def _service(**kwargs):
+    return service.ProposalService(executor=ThreadPoolExecutor(4), **kwargs)
+
+
+def _request(school="Pioneer High School", **params):
+    return service.parse_request({"school": school, **params})
+
+
+def test_identical_requests_share_one_run(stages):
+    calls, gate, _ = stages
+    svc = _service()
+    gate.clear()
+
+    async def main():
+        first = asyncio.ensure_future(svc.proposal(_request()))
+        await asyncio.sleep(0.05)
+        # Same request, differently spelled: joins the running flight.
+        second = asyncio.ensure_future(svc.proposal(_request("  pioneer   high school ")))
+        await asyncio.sleep(0.05)
+        gate.set()
+        return await first, await second
+
+    first, second = asyncio.run(main())
+    assert calls["stops"] == calls["map"] == 1
+    assert svc.stats["coalesced"] == 1 and svc.stats["computed"] == 1
+    # Scores and fleet run side by side, so only their set is fixed, not their order.
+    assert list(first) == list(second)
+    assert set(first) == {"stops", "scores", "fleet", "map", "done"}
+    assert not svc._inflight
+
+    # Finished proposals replay from the cache.
+    asyncio.run(svc.proposal(_request()))
+    assert calls["stops"] == 1 and svc.stats["cache_hits"] == 1
+
+
+def test_lru_eviction_removes_map_files(stages):
+    calls, _, tmp_path = stages
+    svc = _service(cache_size=1)
+    a = asyncio.run(svc.proposal(_request(seed="1")))
+    a_map = tmp_path / a["map"]["url"].lstrip("/")
+    assert a_map.exists()
+
+    asyncio.run(svc.proposal(_request(seed="2")))
+    assert len(svc._cache) == 1 and not a_map.exists()
+    asyncio.run(svc.proposal(_request(seed="1")))
+    assert calls["stops"] == 3 and svc.stats["cache_hits"] == 0
+
+
+def test_expired_entries_are_recomputed(stages):
+    calls, _, _ = stages
+    svc = _service(ttl=0)
+    asyncio.run(svc.proposal(_request()))
+    time.sleep(0.01)
+    asyncio.run(svc.proposal(_request()))
+    assert calls["stops"] == 2 and svc.stats["cache_hits"] == 0
+
+
+def test_errors_are_streamed_and_not_cached(stages):
+    calls, _, _ = stages
+    svc = _service()
+    events = asyncio.run(svc.proposal(_request("Broken")))
+    assert list(events) == ["error"] and "no such school" in events["error"]["error"]
+    asyncio.run(svc.proposal(_request("Broken")))
+    assert calls["stops"] == 2 and not svc._cache and svc.stats["errors"] == 2
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from stop_sampling import sample_stops
+
+
+def _town(seed=0):
+    # A dense core of 4,000 buildings plus 1,000 scattered over 10 km.
+    rng = np.random.default_rng(seed)
+    core = rng.normal(5_000, 400, (4_000, 2))
+    rural = rng.uniform(0, 10_000, (1_000, 2))
+    pts = np.vstack([core, rural])
+    return pts[:, 0], pts[:, 1]
+
+
+def _min_distance(xs, ys):
+    d = np.hypot(xs[:, None] - xs, ys[:, None] - ys)
+    np.fill_diagonal(d, np.inf)
+    return d.min()
+
+
+def test_same_seed_same_stops_and_spacing_respected():
+    xs, ys = _town()
+    picked = sample_stops(xs, ys, 60, min_spacing=150, seed=7)
+    np.testing.assert_array_equal(picked, sample_stops(xs, ys, 60, min_spacing=150, seed=7))
+    assert len(picked) == 60 and len(np.unique(picked)) == 60
+    assert _min_distance(xs[picked], ys[picked]) >= 150
+
+
+def test_stops_follow_building_density():
+    xs, ys = _town()
+    picked = sample_stops(xs, ys, 100, min_spacing=50, seed=1)
+    in_core = np.hypot(xs[picked] - 5_000, ys[picked] - 5_000) < 1_200
+    # 80% of the buildings are in the core; stops should lean the same way.
+    assert in_core.mean() > 0.5
+
+
+def test_weights_steer_and_exclude_points():
+    xs, ys = _town()
+    weights = np.ones(len(xs))
+    weights[:4_000] = 0  # nobody lives in the core
+    picked = sample_stops(xs, ys, 40, weights=weights, seed=2)
+    assert len(picked) > 0 and (picked >= 4_000).all()
+
+
+def test_returns_fewer_when_spacing_cannot_fit_and_validates_weights():
+    xs, ys = np.array([0.0, 10.0, 20.0]), np.array([0.0, 0.0, 0.0])
+    assert len(sample_stops(xs, ys, 3, min_spacing=15, seed=0)) == 2
+    assert len(sample_stops(xs[:0], ys[:0], 5)) == 0
+    with pytest.raises(ValueError, match="non-negative"):
+        sample_stops(xs, ys, 2, weights=[1, -1, 1])
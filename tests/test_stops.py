@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from stops import STOP_DTYPE, StopCollection
+from utils import calculate_ses, classify_ses, score_stops
+
+
+def _frame(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "lat": 42.25 + rng.normal(0, 0.01, n), "lon": -83.75 + rng.normal(0, 0.01, n),
+        "Visibility (V)": rng.random(n), "Lighting (L)": rng.random(n),
+        "Traffic Risk (T)": rng.random(n), "Pedestrian Safety (P)": rng.random(n),
+        "Sidewalk Quality (S)": rng.random(n), "Construction Risk (C)": rng.random(n),
+        "U-Turn Required (U)": rng.integers(0, 2, n),
+        "Students": rng.integers(1, 9, n),
+    })
+    # Scores near the rating thresholds exercise the boundaries.
+    df.loc[:4, list(df.columns[2:9])] = [0.7, 0.7, 0.3, 0.7, 0.7, 0.3, 0]
+    return df
+
+
+def test_batch_scores_and_labels_match_row_wise():
+    df = _frame()
+    expected = [calculate_ses(row) for _, row in df.iterrows()]
+    scores, labels = score_stops(df)
+    np.testing.assert_array_equal(scores, expected)
+    assert labels.tolist() == [classify_ses(s) for s in expected]
+
+    stops = StopCollection.from_frame(df)
+    col_scores, col_labels = score_stops(stops)
+    np.testing.assert_array_equal(col_scores, expected)
+    assert col_labels.tolist() == labels.tolist()
+    assert stops.to_frame()["Safety Rating"].astype(str).tolist() == labels.tolist()
+
+
+def test_missing_factors_use_ses_defaults():
+    df = _frame(20).drop(columns=["Lighting (L)", "U-Turn Required (U)"])
+    expected = [calculate_ses(row) for _, row in df.iterrows()]
+    scores, _ = score_stops(StopCollection.from_frame(df))
+    np.testing.assert_array_equal(scores, expected)
+
+
+def test_frame_round_trip_and_zero_copy_views():
+    df = _frame(50)
+    stops = StopCollection.from_frame(df, epsg=32617)
+    out = stops.to_frame()
+    for column in ("lat", "lon", "Traffic Risk (T)", "Students"):
+        np.testing.assert_array_equal(out[column].to_numpy(), df[column].to_numpy())
+    assert np.isfinite(stops["x"]).all()
+    assert stops.nbytes == 50 * STOP_DTYPE.itemsize == 50 * 100
+    # lonlat is a view: writes show up in the record buffer.
+    stops.lonlat[0, 0] = 0.0
+    assert stops["lon"][0] == 0.0
+    assert len(stops[stops["load"] > 4]) == int((df["Students"] > 4).sum())
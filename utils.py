@@ -1,137 +1,230 @@
 #utils.py
-import googlemaps
-import geopandas as gpd
+import logging
 import pandas as pd
 import numpy as np
-import pyproj
-from shapely.geometry import Point, Polygon, MultiPolygon
-from shapely.ops import transform
-import osmnx as ox
-import streamlit as st
+from geocoding import geocode_address
+from buildings import get_building_centroids
+from stop_sampling import sample_stops
+from projection import DEFAULT_UTM, WGS84, get_transformer, to_utm, utm_epsg_for_geometry
+from clients import get_gmaps
+from profiling import count, span, traced
+from directions import lookup_uturns, default_cache as default_directions_cache
 
 # === CONFIG ===
-DEFAULT_UTM = 26917  # Michigan UTM zone
-gmaps = googlemaps.Client(key=st.secrets["google"]["maps_api_key"])
+logger = logging.getLogger(__name__)
 
 # === GEOCODING ===
-def geocode_address(address):
-    geocode = gmaps.geocode(address)
-    if not geocode:
-        raise ValueError(f"❌ Could not geocode address: {address}")
-    loc = geocode[0]['geometry']['location']
-    return loc['lat'], loc['lng']
-
-@st.cache_data(show_spinner="📍 Geocoding school address...")
 def geocode_school_address(address):
     return geocode_address(address)
 
 # === DISTRICT MATCHING ===
-def get_district_geometry(lat, lon, district_geojson="School_District.geojson"):
-    districts = gpd.read_file(district_geojson).to_crs(epsg=4326)
-    districts = districts[districts.geometry.type.isin(["Polygon", "MultiPolygon"])]
-    st.warning(f"📂 GeoJSON geometry types: {districts.geometry.type.unique()}")
+@traced("district_lookup")
+def get_district_geometry(lat, lon, district_geojson=None):
+    # districts pulls in shapely, so it is imported on first lookup only.
+    from districts import DISTRICT_GEOJSON, get_district_index
 
-    point = Point(lon, lat)
-    point_gdf = gpd.GeoDataFrame([{"geometry": point}], crs="EPSG:4326")
-    joined = gpd.sjoin(districts, point_gdf, how="inner", predicate="contains")
+    index = get_district_index(district_geojson or DISTRICT_GEOJSON)
+    logger.debug("GeoJSON geometry types: %s", index.geom_types)
 
-    if joined.empty:
-        raise ValueError("❌ No matching school district found for the selected location.")
+    geometry, name, dcode = index.lookup(lat, lon)
 
-    row = joined.iloc[0]
-    geometry = row.geometry
-
-    st.warning(f"📐 Matched geometry type: {geometry.geom_type}")
-    st.info(f"🎯 Matched district: {row.get('Name', 'Unknown')} (DCode: {row.get('DCode', '0000')})")
-    return geometry, row.get("Name", "Unknown"), row.get("DCode", "0000")
+    logger.debug("Matched geometry type: %s", geometry.geom_type)
+    logger.info("Matched district: %s (DCode: %s)", name, dcode)
+    return geometry, name, dcode
 
 # === PROJECTION UTILS ===
-def get_transformers():
-    fwd = pyproj.Transformer.from_crs("EPSG:4326", f"EPSG:{DEFAULT_UTM}", always_xy=True).transform
-    rev = pyproj.Transformer.from_crs(f"EPSG:{DEFAULT_UTM}", "EPSG:4326", always_xy=True).transform
-    return fwd, rev
+def get_transformers(epsg=DEFAULT_UTM):
+    return get_transformer(WGS84, epsg).transform, get_transformer(epsg, WGS84).transform
 
 # === STOP GENERATOR ===
-def generate_weighted_stops(district_poly_latlon, school_point_latlon, n=50):
-    tags = {"building": True}
-    try:
-        buildings = ox.features_from_polygon(district_poly_latlon, tags)
-    except Exception as e:
-        raise ValueError(f"❌ Could not fetch buildings from OpenStreetMap: {e}")
-
-    if buildings.empty:
-        raise ValueError("❌ No buildings found in selected district from OpenStreetMap.")
-
-    building_centroids = buildings.centroid
-    building_centroids = building_centroids[building_centroids.geometry.notnull()]
-    fwd, rev = get_transformers()
-    building_centroids_utm = building_centroids.to_crs(epsg=DEFAULT_UTM)
+@traced("weighted_stops")
+def generate_weighted_stops(district_poly_latlon, school_point_latlon, n=50, dcode=None,
+                            min_spacing=None, seed=None):
+    lons, lats = get_building_centroids(district_poly_latlon, dcode=dcode)
 
-    school_point = Point(school_point_latlon[1], school_point_latlon[0])
-    school_utm = transform(fwd, school_point)
+    epsg = utm_epsg_for_geometry(district_poly_latlon)
+    xs, ys = to_utm(lons, lats, epsg)
+    school_x, school_y = to_utm(school_point_latlon[1], school_point_latlon[0], epsg)
 
     walk_buffer = 400
-    filtered = building_centroids_utm[building_centroids_utm.distance(school_utm) > walk_buffer]
+    keep = np.hypot(xs - school_x, ys - school_y) > walk_buffer
+    candidates = np.flatnonzero(keep)
 
-    if filtered.empty:
+    if len(candidates) == 0:
         raise ValueError("❌ All buildings are too close to the school. No valid stops.")
 
-    if len(filtered) < n:
-        st.warning(f"⚠️ Only {len(filtered)} stops available beyond walking distance.")
-        sampled = filtered
-    else:
-        sampled = filtered.sample(n=n)
-
-    try:
-        stops = [transform(rev, pt) for pt in sampled.geometry]
-        latitudes = [p.y for p in stops if np.isfinite(p.y)]
-        longitudes = [p.x for p in stops if np.isfinite(p.x)]
-        if not latitudes or not longitudes:
-            raise ValueError("❌ Coordinate transformation failed.")
-    except Exception as e:
-        raise ValueError(f"❌ Failed to convert stop coordinates: {e}")
+    # Density-weighted, stratified across the district, at least min_spacing apart
+    sampled = candidates[sample_stops(xs[candidates], ys[candidates], n,
+                                      min_spacing=min_spacing, seed=seed)]
+    if len(sampled) < n:
+        logger.warning("Only %d stops available beyond walking distance.", len(sampled))
 
-    return pd.DataFrame({"lat": latitudes, "lon": longitudes})
+    # Centroids are cached in lat/lon, so no reverse projection is needed.
+    return pd.DataFrame({"lat": lats[sampled], "lon": lons[sampled]})
 
 # === SAFETY FACTOR FILLER ===
-def autofill_missing_fields(df):
-    for idx, row in df.iterrows():
-        address = row.get("Address", "Unknown Address")
-        if 'Traffic Risk (T)' not in df.columns or pd.isna(row.get('Traffic Risk (T)')):
-            df.at[idx, 'Traffic Risk (T)'] = 0.5
-        if 'U-Turn Required (U)' not in df.columns or pd.isna(row.get('U-Turn Required (U)')):
-            try:
-                directions = gmaps.directions("school address", address, mode="driving")
-                u_turn = any(
-                    step.get('maneuver') in ['uturn-left', 'uturn-right']
-                    for leg in directions
-                    for step in leg['legs'][0]['steps']
-                )
-                df.at[idx, 'U-Turn Required (U)'] = int(u_turn)
-            except:
-                df.at[idx, 'U-Turn Required (U)'] = 0
-        if 'Construction Risk (C)' not in df.columns or pd.isna(row.get('Construction Risk (C)')):
-            df.at[idx, 'Construction Risk (C)'] = 0.2
-        if 'Visibility (V)' not in df.columns: df.at[idx, 'Visibility (V)'] = 0.6
-        if 'Lighting (L)' not in df.columns: df.at[idx, 'Lighting (L)'] = 0.5
-        if 'Pedestrian Safety (P)' not in df.columns: df.at[idx, 'Pedestrian Safety (P)'] = 0.5
-        if 'Sidewalk Quality (S)' not in df.columns: df.at[idx, 'Sidewalk Quality (S)'] = 0.5
+# column -> default; NaN cells are filled too
+RISK_DEFAULTS = {"Traffic Risk (T)": 0.5, "Construction Risk (C)": 0.2}
+# column -> default; only used when the column is absent
+QUALITY_DEFAULTS = {
+    "Visibility (V)": 0.6, "Lighting (L)": 0.5,
+    "Pedestrian Safety (P)": 0.5, "Sidewalk Quality (S)": 0.5,
+}
+UTURN_COLUMN = "U-Turn Required (U)"
+
+def autofill_missing_fields(df, client=None, origin="school address", cache=None,
+                            max_workers=8, rate_per_sec=10, detect_uturns=True, safety_grid=None,
+                            failed_uturns=None):
+    """Fill missing safety factors: safety_grid layers first (see safety_layers),
+    then defaults; U-turns still missing after that come from the Directions API.
+
+    Addresses whose Directions call failed (scored as no U-turn) are added to the
+    failed_uturns set, if given, so callers can avoid persisting those rows.
+    """
+    with span("autofill", rows=len(df)):
+        count("autofill.rows", len(df))
+        if safety_grid is not None:
+            _fill_from_grid(df, safety_grid)
+        return _autofill(df, client, origin, cache, max_workers, rate_per_sec, detect_uturns,
+                         failed_uturns)
+
+def _fill_from_grid(df, grid):
+    with span("autofill.grid"):
+        lats = pd.to_numeric(df["lat"], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        lons = pd.to_numeric(df["lon"], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        layers = grid.lookup(lats, lons)
+        for column, values in layers.items():
+            if column not in df.columns:
+                default = QUALITY_DEFAULTS.get(column, RISK_DEFAULTS.get(column, np.nan))
+                df[column] = np.where(np.isnan(values), default, values)
+                continue
+            fill = (df[column].isna().to_numpy() & ~np.isnan(values))
+            if fill.any():
+                df.loc[fill, column] = values[fill].astype(np.int8) if column == UTURN_COLUMN \
+                    else values[fill]
+        # Stops with no mapped road nearby (or outside the grid) keep the defaults.
+        covered = int((~np.isnan(layers["Traffic Risk (T)"])).sum()) if layers else 0
+        count("autofill.grid_rows", covered)
+        count("autofill.grid_misses", len(df) - covered)
+
+def _autofill(df, client, origin, cache, max_workers, rate_per_sec, detect_uturns, failed_uturns):
+    for column, default in RISK_DEFAULTS.items():
+        df[column] = df[column].fillna(default) if column in df.columns else default
+    for column, default in QUALITY_DEFAULTS.items():
+        if column not in df.columns:
+            df[column] = default
+
+    if UTURN_COLUMN in df.columns:
+        missing = df[UTURN_COLUMN].isna()
+    else:
+        missing = pd.Series(True, index=df.index)
+    if missing.any() and not detect_uturns:
+        df.loc[missing, UTURN_COLUMN] = 0
+    elif missing.any():
+        # Stops without an address have nothing to route to; they keep the default
+        # (no U-turn) rather than sharing one made-up cached answer.
+        if "Address" in df.columns:
+            has_address = df["Address"].notna() & df["Address"].astype("str").str.strip().ne("")
+        else:
+            has_address = pd.Series(False, index=df.index)
+        query = missing & has_address
+        df.loc[missing & ~has_address, UTURN_COLUMN] = 0
+        if not query.any():
+            return df
+        addresses = df.loc[query, "Address"].astype(str)
+        u_turns = lookup_uturns(
+            client if client is not None else get_gmaps(),
+            origin,
+            addresses.tolist(),
+            cache=cache if cache is not None else default_directions_cache(),
+            max_workers=max_workers,
+            rate_per_sec=rate_per_sec,
+            failed=failed_uturns,
+        )
+        df.loc[query, UTURN_COLUMN] = addresses.map(u_turns)
     return df
 
 # === SES CALCULATOR ===
-def calculate_ses(row):
-    weights = {
-        "V": 0.25, "L": 0.15, "T": 0.25,
-        "P": 0.2,  "S": 0.1,  "C": 0.05, "U": 0.05
-    }
-    adjusted = {
-        "V": row.get("Visibility (V)", 0.5),
-        "L": row.get("Lighting (L)", 0.5),
-        "T": 1 - row.get("Traffic Risk (T)", 0.5),
-        "P": row.get("Pedestrian Safety (P)", 0.5),
-        "S": row.get("Sidewalk Quality (S)", 0.5),
-        "C": 1 - row.get("Construction Risk (C)", 0.2),
-        "U": 1 - row.get("U-Turn Required (U)", 0)
-    }
+SES_WEIGHTS = {
+    "V": 0.25, "L": 0.15, "T": 0.25,
+    "P": 0.2,  "S": 0.1,  "C": 0.05, "U": 0.05
+}
+# factor -> (column, default when missing, risk factor scored as 1 - value)
+SES_FACTORS = {
+    "V": ("Visibility (V)", 0.5, False),
+    "L": ("Lighting (L)", 0.5, False),
+    "T": ("Traffic Risk (T)", 0.5, True),
+    "P": ("Pedestrian Safety (P)", 0.5, False),
+    "S": ("Sidewalk Quality (S)", 0.5, False),
+    "C": ("Construction Risk (C)", 0.2, True),
+    "U": ("U-Turn Required (U)", 0, True),
+}
+# (Safe, Acceptable) lower bounds; anything below is Unsafe
+SAFETY_THRESHOLDS = (0.7, 0.5)
+# Rating code -> label (codes are what StopCollection stores)
+RATING_LABELS = ("Unsafe", "Acceptable", "Safe")
+
+def calculate_ses(row, weights=None):
+    weights = SES_WEIGHTS if weights is None else weights
+    adjusted = {}
+    for k, (column, default, inverted) in SES_FACTORS.items():
+        value = row.get(column, default)
+        adjusted[k] = 1 - value if inverted else value
     return sum(weights[k] * adjusted[k] for k in weights)
 
+def classify_ses(score, thresholds=SAFETY_THRESHOLDS):
+    safe, acceptable = thresholds
+    return "Safe" if score >= safe else "Acceptable" if score >= acceptable else "Unsafe"
+
+# === BATCH SES SCORING ===
+def _factor_column(data, column, default, n):
+    if column in data:
+        values = data[column]
+        if hasattr(values, "to_numpy"):
+            # Nullable (e.g. UInt8) columns turn pd.NA into NaN, as row-wise scoring would.
+            return values.to_numpy(dtype=np.float64, na_value=np.nan)
+        return np.asarray(values, dtype=np.float64)
+    return np.full(n, default, dtype=np.float64)
+
+def calculate_ses_batch(data, weights=None):
+    """Vectorized calculate_ses over a DataFrame or a dict of column arrays."""
+    weights = SES_WEIGHTS if weights is None else weights
+    n = len(data) if isinstance(data, pd.DataFrame) else len(next(iter(data.values()), ()))
+    # Accumulate in the same factor order as calculate_ses so results match bit for bit.
+    scores = np.zeros(n, dtype=np.float64)
+    for k in weights:
+        column, default, inverted = SES_FACTORS[k]
+        values = _factor_column(data, column, default, n)
+        scores = scores + weights[k] * (1 - values if inverted else values)
+    return scores
+
+def classify_ses_codes(scores, thresholds=SAFETY_THRESHOLDS):
+    """Index into RATING_LABELS for every score (NaN scores rate Unsafe, as row-wise)."""
+    safe, acceptable = thresholds
+    scores = np.asarray(scores, dtype=np.float64)
+    return (scores >= acceptable).astype(np.int8) + (scores >= safe)
+
+def classify_ses_batch(scores, thresholds=SAFETY_THRESHOLDS):
+    return np.asarray(RATING_LABELS, dtype=object)[classify_ses_codes(scores, thresholds)]
+
+def score_stops(data, weights=None, thresholds=SAFETY_THRESHOLDS):
+    """Return (SES scores, safety rating labels) for every stop in one pass.
+
+    A StopCollection is scored in place; see score_collection for its rating codes.
+    """
+    from stops import StopCollection
+
+    if isinstance(data, StopCollection):
+        scores, codes = score_collection(data, weights, thresholds)
+        return scores, np.asarray(RATING_LABELS, dtype=object)[codes]
+    with span("scoring"):
+        scores = calculate_ses_batch(data, weights)
+        count("scoring.rows", len(scores))
+        return scores, classify_ses_batch(scores, thresholds)
+
+def score_collection(stops, weights=None, thresholds=SAFETY_THRESHOLDS):
+    """Score a StopCollection in place; returns (scores, int8 codes into RATING_LABELS)."""
+    with span("scoring"):
+        scores = stops.score(weights, thresholds)
+        count("scoring.rows", len(scores))
+        return scores, stops.data["rating"]